@@ -1,9 +1,7 @@
 // Global application state
 let appData = {
     logbooks: [],
-    boats: {},
-    persons: {},
-    destinations: {},
+    onwater: [],
     years: [],
     maxDist: 0,
     minYear: 0,
@@ -22,13 +20,12 @@ let tables = {
     rower: null
 };
 
-// Column indices in tables.logbook
-const YEAR_COLUMN = 0;
-const DATE_COLUMN = 1;
-const BOAT_COLUMN = 2;
-const CREW_COLUMN = 3;
-const DIST_COLUMN = 4;
-const DEST_COLUMN = 5;
+// Column indices in tables.logbook (rows are built by worker.js)
+const INDEX_COLUMN = 6; // Position in logbooks.json, as used by the search index
+
+// The data worker (worker.js) holds the dataset and does all filtering and
+// aggregation; the page only sends filter settings and renders the results.
+const dataWorker = new Worker('worker.js');
 
 // Entry point
 document.addEventListener('DOMContentLoaded', async () => {
@@ -43,86 +40,75 @@ document.addEventListener('DOMContentLoaded', async () => {
     }
 });
 
-async function loadData() {
-    try {
-        const [logbooksResponse, boatsResponse, personsResponse, destinationsResponse] = await Promise.all([
-            fetch('data/logbooks.json'),
-            fetch('data/boats.json'),
-            fetch('data/persons.json'),
-            fetch('data/destinations.json')
-        ]);
-
-        for (const r of [logbooksResponse, boatsResponse, personsResponse, destinationsResponse]) {
-            if (!r.ok) throw new Error(`Failed to fetch ${r.url}: ${r.status}`);
-        }
-
-        const logbooks = await logbooksResponse.json();
-        const boats = await boatsResponse.json();
-        const persons = await personsResponse.json();
-        const destinations = await destinationsResponse.json();
-
-        // Convert arrays to lookup objects
-        appData.boats = boats.reduce((acc, boat) => {
-            acc[boat.id] = boat;
-            return acc;
-        }, {});
-
-        appData.persons = persons.reduce((acc, person) => {
-            acc[person.id] = person;
-            return acc;
-        }, {});
-
-        appData.destinations = destinations.reduce((acc, dest) => {
-            acc[dest.id] = dest;
-            return acc;
-        }, {});
-
-        appData.logbooks = []
-        appData.onwater = []
-        const today = new Date();
-        logbooks.forEach(entry => {
-            // The logs are "dirty". There are old entries that are still
-            // marked as open and have no end time (t1) but are obviously
-            // not on the water. So we also check if the date is today.
-            if (entry.open && !('t1' in entry)) {
-                const isToday = (() => {
-                    const entryDate = parseDate(entry.date);
-                    return entryDate.getFullYear() === today.getFullYear() &&
-                           entryDate.getMonth() === today.getMonth() &&
-                           entryDate.getDate() === today.getDate();
-                })();
-                if (isToday) {
-                    appData.onwater.push([
-                        formatBoat(entry.boat),
-                        formatCrew(entry.crew),
-                    ]);
-                }
-            } else {
-                appData.logbooks.push([
-                    entry.year,
-                    parseDate(entry.date),
-                    formatBoat(entry.boat),
-                    formatCrew(entry.crew),
-                    entry.dist || 0,
-                    formatDestination(entry.dest)
-                ]);
+// Have the worker load the data files; keep the table rows it builds. Fails
+// if the worker reports an error, cannot be started or crashes, or sends a
+// message that cannot be read.
+function loadData() {
+    return new Promise((resolve, reject) => {
+        dataWorker.onerror = event => reject(workerError(event));
+        dataWorker.onmessageerror = () => reject(new Error('Unreadable message from the data worker'));
+        dataWorker.onmessage = ({ data: message }) => {
+            if (message.type === 'error') {
+                reject(new Error(message.message));
+                return;
             }
-        });
+            appData.logbooks = message.rows;
+            appData.onwater = message.onwater;
+            appData.years = message.years;
+            appData.maxDist = message.maxDist;
+            dataWorker.onmessage = handleWorkerMessage;
+            dataWorker.onerror = event => rejectPendingQueries(workerError(event));
+            dataWorker.onmessageerror = () => rejectPendingQueries(new Error('Unreadable message from the data worker'));
+            resolve();
+        };
+        dataWorker.postMessage({ type: 'load' });
+    });
+}
 
-        // Extract unique years and sort them
-        appData.years = [...new Set(logbooks.map(entry => entry.year))]
-            .filter(year => year >= 2011) /* Hack until we clean the data */
-            .sort((a, b) => b - a);
+// Queries waiting for an answer, by request id, and the latest request id
+// per channel. A new query on a channel supersedes the previous one: the
+// worker cancels it, and its promise resolves to null.
+const pendingQueries = new Map();
+const latestQuery = {};
+let nextQueryId = 1;
+
+function queryWorker(channel, params) {
+    const previous = latestQuery[channel];
+    if (pendingQueries.has(previous)) {
+        pendingQueries.get(previous).resolve(null);
+        pendingQueries.delete(previous);
+    }
+    const id = nextQueryId++;
+    latestQuery[channel] = id;
+    return new Promise((resolve, reject) => {
+        pendingQueries.set(id, { resolve, reject });
+        dataWorker.postMessage({ type: 'query', channel, id, params });
+    });
+}
 
-        // Calculate distance range
-        const distances = logbooks.map(entry => entry.dist || 0).filter(d => d > 0);
-        if (distances.length > 0) {
-            appData.maxDist = Math.max(...distances);
-        }
+// An error event of the worker: a script that failed to load (no message)
+// or an exception it did not handle.
+function workerError(event) {
+    return new Error(event.message ? `Data worker error: ${event.message}` : 'The data worker could not be started');
+}
 
-    } catch (error) {
-        console.error('Error loading data:', error);
-        throw error;
+// The worker cannot say which query an error belongs to, so all waiting
+// queries fail.
+function rejectPendingQueries(error) {
+    for (const pending of pendingQueries.values()) {
+        pending.reject(error);
+    }
+    pendingQueries.clear();
+}
+
+function handleWorkerMessage({ data: message }) {
+    const pending = pendingQueries.get(message.id);
+    if (!pending) return; // Superseded
+    pendingQueries.delete(message.id);
+    if (message.type === 'error') {
+        pending.reject(new Error(message.message));
+    } else {
+        pending.resolve(message.result);
     }
 }
 
@@ -258,54 +244,6 @@ function extractTerms(inputId) {
     });
 }
 
-function parseDate(date) {
-    // Parse european-style dates, DD.MM.YYYY
-    let d;
-    if (typeof date === 'string' && /^\d{2}\.\d{2}\.\d{4}$/.test(date)) {
-        const [day, month, year] = date.split('.').map(Number);
-        d = new Date(year, month - 1, day);
-    } else {
-        d = new Date(date);
-    }
-    return d;
-}
-
-function formatBoat(boatId) {
-    const boat = appData.boats[boatId];
-    if (!boat) return 'Unknown';
-    return boat.suffix ? `${boat.name} (${boat.suffix})` : boat.name;
-}
-
-function formatCrew(crewIds) {
-    return crewIds.map(personId => {
-        const person = appData.persons[personId];
-        if (!person) return 'Unknown';
-        return `${person.fn || ''} ${person.ln || ''}`.trim();
-    }).join(', ');
-}
-
-function formatDestination(destId) {
-    const dest = appData.destinations[destId];
-    return dest ? dest.name : 'Unknown';
-}
-
-function matchesSearchTerms(entry, terms) {
-    if (terms.length === 0) return true;
-    const boat = entry[BOAT_COLUMN].toLowerCase();
-    const crew = entry[CREW_COLUMN].toLowerCase();
-    const dest = entry[DEST_COLUMN].toLowerCase();
-    return terms.every(term => boat.includes(term) || crew.includes(term) || dest.includes(term));
-}
-
-function accumulateStats(entityStats, key, dist) {
-    if (!entityStats[key]) {
-        entityStats[key] = [0, 0, 0];
-    }
-    entityStats[key][0]++;
-    entityStats[key][1] += dist;
-    entityStats[key][2] = Math.round(10 * entityStats[key][1] / entityStats[key][0]) / 10;
-}
-
 ////////////////////////////////////////////////////////////////////////////
 // Logbook
 ////////////////////////////////////////////////////////////////////////////
@@ -380,36 +318,17 @@ function initializeTable() {
     });
 }
 
-let filterTimer = null;
-const FILTER_TIMEOUT_MS = 100;
-
-function applyLogbookFilters() {
-    if (filterTimer) {
-        clearTimeout(filterTimer);
+async function applyLogbookFilters() {
+    const yearSlider = document.getElementById('logbook-year-slider');
+    const distanceSlider = document.getElementById('logbook-dist-slider');
+    const mask = await queryWorker('logbook', {
+        yearRange: yearSlider.noUiSlider.get().map(Number),
+        distanceRange: distanceSlider.noUiSlider.get().map(Number),
+        terms: extractTerms('logbook-search-input')
+    });
+    if (mask) {
+        tables.logbook.filter(entry => mask[entry[INDEX_COLUMN]] === 1);
     }
-    filterTimer = setTimeout(() => {
-        const yearSlider = document.getElementById('logbook-year-slider');
-        const yearRange = yearSlider.noUiSlider.get().map(Number);
-        const distanceSlider = document.getElementById('logbook-dist-slider');
-        const distanceRange = distanceSlider.noUiSlider.get().map(Number);
-        const terms = extractTerms('logbook-search-input');
-
-        tables.logbook.filter(entry => {
-            // Year filter
-            const year = entry[YEAR_COLUMN];
-            if (year < yearRange[0] || year >= yearRange[1]) {
-                return false;
-            }
-
-            // Distance filter
-            const dist = entry[DIST_COLUMN] || 0;
-            if (dist < distanceRange[0] || dist > distanceRange[1]) {
-                return false;
-            }
-
-            return matchesSearchTerms(entry, terms);
-        })
-    }, FILTER_TIMEOUT_MS);
 }
 
 // Reset all filters to default state
@@ -505,20 +424,9 @@ function createBarChart(canvasId, title, xtitle, ytitle, labels, data, existingC
 
 const MAX_CHART_VALUES = 20;
 const MAX_LABEL_LENGTH = 30;
-function updateDistanceByEntity(yearRange, entityProcessor, labelFormatter, canvasId, tableContainer, existingChart, existingTable) {
-    const entityStats = {};
-
-    appData.logbooks.forEach(entry => {
-        const year = entry[YEAR_COLUMN];
-        if (year >= yearRange[0] && year < yearRange[1]) {
-            entityProcessor(entry, entityStats);
-        }
-    });
-
-    // Extract data, sort by distance
-    const sortedData = Object.entries(entityStats).map(([name, stats]) => [name, stats[0], stats[1], stats[2]]);
-    sortedData.sort((a, b) => b[2] - a[2]);
 
+// sortedData: [name, outings, km, avg km] rows sorted by km, descending
+function updateDistanceByEntity(sortedData, labelFormatter, canvasId, tableContainer, existingChart, existingTable) {
     // Chart shows top MAX_CHART_VALUES values
     const chartLabels = sortedData.slice(0, MAX_CHART_VALUES).map(([name, ]) => labelFormatter ? labelFormatter(name) : name);
     const chartData = sortedData.slice(0, MAX_CHART_VALUES).map(([, , km]) => km);
@@ -566,17 +474,13 @@ function updateDistanceByEntity(yearRange, entityProcessor, labelFormatter, canv
     return { chart, table };
 }
 
-function updateKmByBoat() {
+async function updateKmByBoat() {
     const yearSlider = document.getElementById('boat-year-slider');
-    const yearRange = yearSlider.noUiSlider.get().map(Number);
-
-    const boatProcessor = (entry, entityStats) => {
-        accumulateStats(entityStats, entry[BOAT_COLUMN], entry[DIST_COLUMN]);
-    };
+    const sortedData = await queryWorker('boat', { yearRange: yearSlider.noUiSlider.get().map(Number) });
+    if (!sortedData) return;
 
     const { chart, table } = updateDistanceByEntity(
-        yearRange,
-        boatProcessor,
+        sortedData,
         null,
         'boat-chart',
         '#boat-table',
@@ -588,52 +492,35 @@ function updateKmByBoat() {
     tables.boat = table;
 }
 
-function kcombinations(array, k) {
-    if (k === 0 || k > array.length) {
-        return [];
+// Format crew labels for chart labels. If the label is too long, replace first
+// names with initials. If the label is still too long, truncate and add ellipsis.
+function crewLabelFormatter(label) {
+    if (label.length <= MAX_LABEL_LENGTH) {
+        return label;
     }
-    return array.toSorted().reduce((acc, value, index, self) => {
-        if (k === 1) {
-            return acc.concat([[value]]);
-        }
-        return acc.concat(kcombinations(self.slice(index + 1), k - 1).map(combination => [value, ...combination]));
-    }, []);
+    const items = label.split(',').map(item => {
+        const parts = item.split(/\s+/);
+        if (parts.length === 1) { return item; }
+        return parts[0][0] + '.' + parts.slice(1).join(' ');
+    });
+    let res = items.join(', ');
+    if (res.length > MAX_LABEL_LENGTH) {
+        res = res.slice(0, MAX_LABEL_LENGTH - 3) + '...';
+    }
+    return res;
 }
 
-function updateKmByRower() {
+async function updateKmByRower() {
     const yearSlider = document.getElementById('rower-year-slider');
-    const yearRange = yearSlider.noUiSlider.get().map(Number);
     const crewSizeSlider = document.getElementById('rower-crew-size-slider');
-    const crewSize = Number(crewSizeSlider.noUiSlider.get());
-
-    const crewProcessor = (entry, entityStats) => {
-        const crewMembers = entry[CREW_COLUMN].split(',').map(name => name.trim());
-        for (const crew of kcombinations(crewMembers, crewSize)) {
-            accumulateStats(entityStats, crew, entry[DIST_COLUMN]);
-        }
-    };
-
-    // Format crew labels for chart labels. If the label is too long, replace first
-    // names with initials. If the label is still too long, truncate and add ellipsis.
-    const crewLabelFormatter = (label) => {
-        if (label.length <= MAX_LABEL_LENGTH) {
-            return label;
-        }
-        const items = label.split(',').map(item => {
-            const parts = item.split(/\s+/);
-            if (parts.length === 1) { return item; }
-            return parts[0][0] + '.' + parts.slice(1).join(' ');
-        });
-        let res = items.join(', ');
-        if (res.length > MAX_LABEL_LENGTH) {
-            res = res.slice(0, MAX_LABEL_LENGTH - 3) + '...';
-        }
-        return res;
-    };
+    const sortedData = await queryWorker('rower', {
+        yearRange: yearSlider.noUiSlider.get().map(Number),
+        crewSize: Number(crewSizeSlider.noUiSlider.get())
+    });
+    if (!sortedData) return;
 
     const { chart, table } = updateDistanceByEntity(
-        yearRange,
-        crewProcessor,
+        sortedData,
         crewLabelFormatter,
         'rower-chart',
         '#rower-table',
@@ -649,27 +536,13 @@ function updateKmByRower() {
 // Statistics: Monthly kilometers
 ////////////////////////////////////////////////////////////////////////////
 
-function updateKmOverTime() {
+async function updateKmOverTime() {
     const yearSlider = document.getElementById('time-year-slider');
     const yearRange = yearSlider.noUiSlider.get().map(Number);
     const terms = extractTerms('time-search-input');
 
-    const monthlyTotals = {};
-
-    appData.logbooks.forEach(entry => {
-        const year = entry[YEAR_COLUMN];
-        if (year < yearRange[0] || year >= yearRange[1]) {
-            return;
-        }
-
-        if (!matchesSearchTerms(entry, terms)) {
-            return;
-        }
-
-        const d = entry[DATE_COLUMN];
-        const monthKey = `${d.getFullYear()}-${(d.getMonth() + 1).toString().padStart(2, '0')}`;
-        monthlyTotals[monthKey] = (monthlyTotals[monthKey] || 0) + (entry[DIST_COLUMN] || 0);
-    });
+    const monthlyTotals = await queryWorker('time', { yearRange, terms });
+    if (!monthlyTotals) return;
 
     // Create sorted list of months in range
     const allMonths = [];
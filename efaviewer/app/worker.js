@@ -0,0 +1,698 @@
+// Data worker: loads the export once and runs all filtering and aggregation
+// off the main thread, so that slider drags and typing never block the UI.
+//
+// Messages from the page:
+//   { type: 'load' }
+//       -> { type: 'loaded', rows, onwater, years, maxDist, entries }
+//   { type: 'query', channel, id, params }
+//       -> { type: 'result', id, result } or { type: 'error', id, message }
+//
+// The parsed and indexed dataset is kept in IndexedDB, keyed by the version
+// in current.json (efa_importer.py --versioned). On load only current.json is
+// fetched when that version is cached. After an import published a new
+// version, the cached collections are brought up to date with the delta feed
+// (efa_delta.py) listed in current.json if it reaches back to them, and only
+// the derived files (search.json, crewpairs.json) are downloaded again;
+// otherwise all data files are.
+//
+// There is one query channel per view (see QUERIES). A new query on a channel
+// cancels the one still running there: scans yield to the event loop every
+// SCAN_CHUNK_ROWS rows and stop when superseded, and a cancelled query sends
+// no answer.
+
+// Column indices of logbook rows, as in app.js
+const YEAR_COLUMN = 0;
+const DATE_COLUMN = 1;
+const BOAT_COLUMN = 2;
+const CREW_COLUMN = 3;
+const DIST_COLUMN = 4;
+const DEST_COLUMN = 5;
+const INDEX_COLUMN = 6; // Position in logbooks.json, as used by the search index
+
+const SCAN_CHUNK_ROWS = 10000;
+
+let data = {
+    logbooks: [],
+    boats: {},
+    persons: {},
+    destinations: {},
+    search: null,
+    crewPairs: null,
+    notes: []
+};
+
+// Return the pointer manifest of a versioned export, or null. It lists the
+// content-hashed, immutable data files and is the only file that needs
+// revalidating; an unversioned export is read from the plain file names.
+async function loadPointer() {
+    try {
+        const response = await fetch('data/current.json', { cache: 'no-cache' });
+        if (response.ok) {
+            return await response.json();
+        }
+    } catch (error) {
+        console.warn('No current.json, using unversioned data files:', error);
+    }
+    return null;
+}
+
+function fileUrls(pointer) {
+    const names = ['logbooks.json', 'boats.json', 'persons.json', 'destinations.json', 'search.json', 'crewpairs.json'];
+    const urls = Object.fromEntries(names.map(name => [name, 'data/' + name]));
+    if (pointer) {
+        for (const name of names) {
+            if (pointer.files[name]) urls[name] = 'data/' + pointer.files[name];
+        }
+    }
+    return urls;
+}
+
+// Download the exported collections: arrays of boats, persons, destinations
+// and logbook entries, as written by efa_importer.py.
+async function downloadCollections(urls) {
+    const responses = await Promise.all(COLLECTIONS.map(name => fetch(urls[name + '.json'])));
+    for (const r of responses) {
+        if (!r.ok) throw new Error(`Failed to fetch ${r.url}: ${r.status}`);
+    }
+    const arrays = await Promise.all(responses.map(r => r.json()));
+    return Object.fromEntries(COLLECTIONS.map((name, i) => [name, arrays[i]]));
+}
+
+// Build the dataset from the collections: lookup maps, table rows and the
+// optional search index and crew-pair edges, which are downloaded here.
+async function buildDataset({ boats, persons, destinations, logbooks }, urls) {
+    const dataset = { entries: logbooks.length, search: null, crewPairs: null };
+
+    // The search index is optional: without it, search falls back to
+    // substring matching.
+    const searchResponse = await fetch(urls['search.json']);
+    if (searchResponse.ok) {
+        dataset.search = await searchResponse.json();
+    }
+
+    // Crew co-occurrence edge list (efa_crewpairs.py), optional as well:
+    // without it, crew pairs are enumerated per entry.
+    const crewPairsResponse = await fetch(urls['crewpairs.json']);
+    if (crewPairsResponse.ok) {
+        dataset.crewPairs = await crewPairsResponse.json();
+    }
+
+    // Convert arrays to lookup objects
+    data.boats = dataset.boats = boats.reduce((acc, boat) => {
+        acc[boat.id] = boat;
+        return acc;
+    }, {});
+
+    data.persons = dataset.persons = persons.reduce((acc, person) => {
+        acc[person.id] = person;
+        return acc;
+    }, {});
+
+    data.destinations = dataset.destinations = destinations.reduce((acc, dest) => {
+        acc[dest.id] = dest;
+        return acc;
+    }, {});
+
+    // The logs are "dirty". There are old entries that are still marked as
+    // open and have no end time (t1) but are obviously not on the water.
+    // Which of them are on the water is decided on load (see onWater).
+    dataset.rows = [];
+    dataset.open = [];
+    // Comments are not shown, but quoted phrases are matched in them.
+    dataset.notes = logbooks.map(entry => entry.note || '');
+    logbooks.forEach((entry, index) => {
+        if (entry.open && !('t1' in entry)) {
+            dataset.open.push([
+                parseDate(entry.date),
+                formatBoat(entry.boat),
+                formatCrew(entry.crew),
+            ]);
+        } else {
+            dataset.rows.push([
+                entry.year,
+                parseDate(entry.date),
+                formatBoat(entry.boat),
+                formatCrew(entry.crew),
+                entry.dist || 0,
+                formatDestination(entry.dest),
+                index
+            ]);
+        }
+    });
+
+    // Extract unique years and sort them
+    dataset.years = [...new Set(logbooks.map(entry => entry.year))]
+        .filter(year => year >= 2011) /* Hack until we clean the data */
+        .sort((a, b) => b - a);
+
+    // Calculate distance range
+    dataset.maxDist = 0;
+    for (const entry of logbooks) {
+        dataset.maxDist = Math.max(dataset.maxDist, entry.dist || 0);
+    }
+    return dataset;
+}
+
+// Open entries dated today, as [boat, crew] rows.
+function onWater(open) {
+    const today = new Date();
+    return open
+        .filter(([date]) => date.getFullYear() === today.getFullYear() &&
+                            date.getMonth() === today.getMonth() &&
+                            date.getDate() === today.getDate())
+        .map(([, boat, crew]) => [boat, crew]);
+}
+
+async function loadData() {
+    const pointer = await loadPointer();
+    const version = pointer ? pointer.version : null;
+    const cached = version ? await readCache() : null;
+    let dataset = cached && cached.version === version ? cached.dataset : null;
+    if (!dataset) {
+        const urls = fileUrls(pointer);
+        const manifest = pointer && pointer.deltas;
+        let collections = cached && manifest ? await applyDeltaFeed(cached, manifest) : null;
+        if (!collections) {
+            collections = await downloadCollections(urls);
+        }
+        dataset = await buildDataset(collections, urls);
+        if (version) {
+            await writeCache({ version, deltaVersion: manifest ? manifest.version : null, collections, dataset });
+        }
+    }
+
+    data = {
+        logbooks: dataset.rows,
+        boats: dataset.boats,
+        persons: dataset.persons,
+        destinations: dataset.destinations,
+        search: dataset.search,
+        crewPairs: dataset.crewPairs,
+        notes: dataset.notes
+    };
+    if (data.search) {
+        data.search.decoded = new Map();
+    }
+    return {
+        rows: dataset.rows,
+        onwater: onWater(dataset.open),
+        years: dataset.years,
+        maxDist: dataset.maxDist,
+        entries: dataset.entries
+    };
+}
+
+////////////////////////////////////////////////////////////////////////////
+// Delta feed
+////////////////////////////////////////////////////////////////////////////
+
+const COLLECTIONS = ['boats', 'persons', 'destinations', 'logbooks'];
+
+// Fetch and parse a .json.gz file. Servers may or may not decompress it on
+// the way (Content-Encoding), so the gzip magic number decides.
+async function fetchGzipJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Failed to fetch ${response.url}: ${response.status}`);
+    const bytes = new Uint8Array(await response.arrayBuffer());
+    if (bytes[0] === 0x1f && bytes[1] === 0x8b) {
+        const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        return await new Response(stream).json();
+    }
+    return JSON.parse(new TextDecoder().decode(bytes));
+}
+
+// Same as record_key() in efa_delta.py: the id, or for entries without one
+// their content as json.dumps(record, sort_keys=True, separators=(',', ':'))
+// (which escapes non-ASCII characters) would write it.
+function recordKey(record) {
+    if (record.id !== undefined && record.id !== null) {
+        return record.id;
+    }
+    const sorted = value => Array.isArray(value) ? value.map(sorted)
+        : value !== null && typeof value === 'object'
+            ? Object.fromEntries(Object.keys(value).sort().map(key => [key, sorted(value[key])]))
+            : value;
+    return JSON.stringify(sorted(record))
+        .replace(/[\u0080-\uffff]/g, c => '\\u' + c.charCodeAt(0).toString(16).padStart(4, '0'));
+}
+
+// Apply the changes of one collection to a record array, as
+// apply_changes() in efa_delta.py; records with duplicate keys cannot be.
+function applyChanges(records, changes) {
+    const removed = new Set(changes.removed || []);
+    const modified = new Map((changes.modified || []).map(record => [recordKey(record), record]));
+    const result = [];
+    const keys = new Set();
+    for (const record of records) {
+        const key = recordKey(record);
+        if (keys.has(key)) throw new Error(`Duplicate record ${key}`);
+        keys.add(key);
+        if (!removed.has(key)) {
+            result.push(modified.has(key) ? modified.get(key) : record);
+        }
+    }
+
+    if (changes.order) {
+        const byKey = new Map(result.map(record => [recordKey(record), record]));
+        for (const item of changes.added || []) {
+            byKey.set(recordKey(item.record), item.record);
+        }
+        return changes.order.map(key => {
+            if (!byKey.has(key)) throw new Error(`Unknown record ${key}`);
+            return byKey.get(key);
+        });
+    }
+
+    // Added records are listed in export order, so each "after" refers to a
+    // surviving record or to a record added before it.
+    const followers = new Map();
+    for (const item of changes.added || []) {
+        if (!followers.has(item.after)) followers.set(item.after, []);
+        followers.get(item.after).push(item.record);
+    }
+    if (followers.size === 0) {
+        return result;
+    }
+    const merged = [];
+    const stack = [...result].reverse().concat([...(followers.get(null) || [])].reverse());
+    followers.delete(null);
+    while (stack.length > 0) {
+        const record = stack.pop();
+        merged.push(record);
+        const key = recordKey(record);
+        if (followers.has(key)) {
+            stack.push(...[...followers.get(key)].reverse());
+            followers.delete(key);
+        }
+    }
+    if (followers.size > 0) throw new Error('Added records follow unknown records');
+    return merged;
+}
+
+// The cached collections brought up to the manifest's version by applying
+// the deltas published since, or null if the chain does not reach back to
+// them (or a delta cannot be fetched or applied).
+async function applyDeltaFeed(cached, manifest) {
+    const from = cached.deltaVersion;
+    if (!cached.collections || from == null || from < manifest.base || from > manifest.version) {
+        return null;
+    }
+    try {
+        const links = manifest.deltas.filter(link => link.from >= from);
+        const deltas = await Promise.all(links.map(link => fetchGzipJson('data/' + link.file)));
+        let collections = cached.collections;
+        let version = from;
+        for (const delta of deltas) {
+            if (delta.from !== version) throw new Error(`Delta from ${delta.from}, expected ${version}`);
+            collections = Object.fromEntries(COLLECTIONS.map(name =>
+                [name, delta.changes[name] ? applyChanges(collections[name], delta.changes[name]) : collections[name]]));
+            version = delta.to;
+        }
+        if (version !== manifest.version) throw new Error(`Delta feed ends at ${version}`);
+        return collections;
+    } catch (error) {
+        console.warn('Cannot apply the delta feed, downloading the full export:', error);
+        return null;
+    }
+}
+
+////////////////////////////////////////////////////////////////////////////
+// Dataset cache
+////////////////////////////////////////////////////////////////////////////
+
+// Bump when the layout of the cached dataset changes.
+const CACHE_FORMAT = 3;
+const CACHE_DB = 'efaviewer';
+const CACHE_STORE = 'dataset';
+const CACHE_KEY = 'current';
+
+function openCache() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(CACHE_DB, 1);
+        request.onupgradeneeded = () => request.result.createObjectStore(CACHE_STORE);
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function cacheRequest(mode, operation) {
+    return openCache().then(db => new Promise((resolve, reject) => {
+        const transaction = db.transaction(CACHE_STORE, mode);
+        const request = operation(transaction.objectStore(CACHE_STORE));
+        transaction.oncomplete = () => {
+            db.close();
+            resolve(request.result);
+        };
+        transaction.onerror = transaction.onabort = () => {
+            db.close();
+            reject(transaction.error);
+        };
+    }));
+}
+
+// The cache entry { version, deltaVersion, collections, dataset }, or null.
+// deltaVersion is the version of the delta feed (manifest.json) the
+// collections correspond to, if the export has one. A missing or unusable
+// IndexedDB (e.g. private browsing) just means no cache.
+async function readCache() {
+    try {
+        const cached = await cacheRequest('readonly', store => store.get(CACHE_KEY));
+        if (cached && cached.format === CACHE_FORMAT) {
+            return cached;
+        }
+    } catch (error) {
+        console.warn('Cannot read the dataset cache:', error);
+    }
+    return null;
+}
+
+// Replace the cache entry; only the latest version is kept.
+async function writeCache(entry) {
+    try {
+        await cacheRequest('readwrite', store => store.put({ format: CACHE_FORMAT, ...entry }, CACHE_KEY));
+    } catch (error) {
+        console.warn('Cannot write the dataset cache:', error);
+    }
+}
+
+////////////////////////////////////////////////////////////////////////////
+// Helpers
+////////////////////////////////////////////////////////////////////////////
+
+function parseDate(date) {
+    // Parse european-style dates, DD.MM.YYYY
+    let d;
+    if (typeof date === 'string' && /^\d{2}\.\d{2}\.\d{4}$/.test(date)) {
+        const [day, month, year] = date.split('.').map(Number);
+        d = new Date(year, month - 1, day);
+    } else {
+        d = new Date(date);
+    }
+    return d;
+}
+
+function formatBoat(boatId) {
+    const boat = data.boats[boatId];
+    if (!boat) return 'Unknown';
+    return boat.suffix ? `${boat.name} (${boat.suffix})` : boat.name;
+}
+
+function formatCrew(crewIds) {
+    return crewIds.map(personId => {
+        const person = data.persons[personId];
+        if (!person) return 'Unknown';
+        return `${person.fn || ''} ${person.ln || ''}`.trim();
+    }).join(', ');
+}
+
+function formatDestination(destId) {
+    const dest = data.destinations[destId];
+    return dest ? dest.name : 'Unknown';
+}
+
+function matchesSearchTerms(entry, terms) {
+    if (terms.length === 0) return true;
+    const boat = entry[BOAT_COLUMN].toLowerCase();
+    const crew = entry[CREW_COLUMN].toLowerCase();
+    const dest = entry[DEST_COLUMN].toLowerCase();
+    return terms.every(term => boat.includes(term) || crew.includes(term) || dest.includes(term));
+}
+
+// Same normalization as normalize_name() / tokenize() in efa_search.py.
+function tokenize(text) {
+    const folded = text.normalize('NFD').replace(/\p{M}/gu, '').toLowerCase();
+    return folded.match(/[\p{L}\p{N}_]+/gu) || [];
+}
+
+function searchPostings(termIndex) {
+    const search = data.search;
+    let postings = search.decoded.get(termIndex);
+    if (!postings) {
+        const encoded = search.postings[termIndex];
+        postings = new Int32Array(encoded.length);
+        let value = 0;
+        for (let i = 0; i < encoded.length; i++) {
+            value += encoded[i];
+            postings[i] = value;
+        }
+        search.decoded.set(termIndex, postings);
+    }
+    return postings;
+}
+
+// Set of entry indexes containing a token that starts with prefix.
+function lookupPrefix(prefix) {
+    const terms = data.search.terms;
+    let lo = 0, hi = terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >>> 1;
+        if (terms[mid] < prefix) lo = mid + 1; else hi = mid;
+    }
+    const result = new Set();
+    for (let i = lo; i < terms.length && terms[i].startsWith(prefix); i++) {
+        for (const index of searchPostings(i)) {
+            result.add(index);
+        }
+    }
+    return result;
+}
+
+// Whether the tokens of text contain the phrase tokens in order, the last
+// one as a prefix (phrase_in() in efa_search.py).
+function phraseIn(phrase, text) {
+    const tokens = tokenize(text);
+    const last = phrase.length - 1;
+    for (let k = 0; k + last < tokens.length; k++) {
+        let j = 0;
+        while (j < last && tokens[k + j] === phrase[j]) j++;
+        if (j === last && tokens[k + last].startsWith(phrase[last])) return true;
+    }
+    return false;
+}
+
+// Whether a multi-word term matches within the boat, one crew member, the
+// destination or the comment of a row: the fields the search index covers
+// (entry_texts() in efa_search.py).
+function rowHasPhrase(entry, phrase) {
+    return phraseIn(phrase, entry[BOAT_COLUMN]) ||
+        entry[CREW_COLUMN].split(', ').some(name => phraseIn(phrase, name)) ||
+        phraseIn(phrase, entry[DEST_COLUMN]) ||
+        phraseIn(phrase, data.notes[entry[INDEX_COLUMN]]);
+}
+
+// Return a predicate over logbook rows for the given search terms. Uses the
+// search index when available, so the work depends on the number of matches
+// rather than on the size of the logbook. Terms of several words (quoted
+// phrases) must also match as phrases, see efa_search.py.
+function searchMatcher(terms) {
+    if (terms.length === 0) return () => true;
+    if (!data.search) return entry => matchesSearchTerms(entry, terms);
+
+    const termTokens = terms.map(tokenize);
+    const tokens = termTokens.flat();
+    if (tokens.length === 0) return () => true;
+    const candidates = tokens.map(lookupPrefix).sort((a, b) => a.size - b.size);
+    let result = candidates[0];
+    for (const other of candidates.slice(1)) {
+        if (result.size === 0) break;
+        result = new Set([...result].filter(index => other.has(index)));
+    }
+    const phrases = termTokens.filter(phrase => phrase.length > 1);
+    if (phrases.length === 0) return entry => result.has(entry[INDEX_COLUMN]);
+    return entry => result.has(entry[INDEX_COLUMN]) && phrases.every(phrase => rowHasPhrase(entry, phrase));
+}
+
+function accumulateStats(entityStats, key, dist, count = 1) {
+    if (!entityStats[key]) {
+        entityStats[key] = [0, 0, 0];
+    }
+    entityStats[key][0] += count;
+    entityStats[key][1] += dist;
+    entityStats[key][2] = Math.round(10 * entityStats[key][1] / entityStats[key][0]) / 10;
+}
+
+function inYearRange(year, yearRange) {
+    return year >= yearRange[0] && year < yearRange[1];
+}
+
+////////////////////////////////////////////////////////////////////////////
+// Cancellable scans
+////////////////////////////////////////////////////////////////////////////
+
+const CANCELLED = Symbol('cancelled');
+
+// Let queued messages run (a zero-delay timeout would be clamped to 4ms).
+const yieldChannel = new MessageChannel();
+const yieldResolvers = [];
+yieldChannel.port1.onmessage = () => yieldResolvers.shift()();
+function yieldToMessages() {
+    return new Promise(resolve => {
+        yieldResolvers.push(resolve);
+        yieldChannel.port2.postMessage(null);
+    });
+}
+
+// Call visit(row) for every logbook row, in chunks. Throws CANCELLED once
+// a newer query arrived on the job's channel.
+async function scanRows(job, visit) {
+    const rows = data.logbooks;
+    for (let start = 0; start < rows.length; start += SCAN_CHUNK_ROWS) {
+        if (start > 0) {
+            await yieldToMessages();
+        }
+        if (job.cancelled) throw CANCELLED;
+        const end = Math.min(start + SCAN_CHUNK_ROWS, rows.length);
+        for (let k = start; k < end; k++) {
+            visit(rows[k]);
+        }
+    }
+}
+
+////////////////////////////////////////////////////////////////////////////
+// Queries
+////////////////////////////////////////////////////////////////////////////
+
+// Logbook table: 1 in the returned mask (indexed like logbooks.json) for
+// each row that passes the year, distance and search filters.
+async function filterLogbook({ yearRange, distanceRange, terms }, job) {
+    const matchesSearch = searchMatcher(terms);
+    const mask = new Uint8Array(job.entries);
+    await scanRows(job, entry => {
+        const dist = entry[DIST_COLUMN] || 0;
+        if (inYearRange(entry[YEAR_COLUMN], yearRange) &&
+            dist >= distanceRange[0] && dist <= distanceRange[1] &&
+            matchesSearch(entry)) {
+            mask[entry[INDEX_COLUMN]] = 1;
+        }
+    });
+    return mask;
+}
+
+// [name, outings, km, avg km] rows sorted by km, descending.
+function sortedEntityStats(entityStats) {
+    const sortedData = Object.entries(entityStats).map(([name, stats]) => [name, stats[0], stats[1], stats[2]]);
+    sortedData.sort((a, b) => b[2] - a[2]);
+    return sortedData;
+}
+
+async function collectEntityStats(yearRange, entityProcessor, job) {
+    const entityStats = {};
+    await scanRows(job, entry => {
+        if (inYearRange(entry[YEAR_COLUMN], yearRange)) {
+            entityProcessor(entry, entityStats);
+        }
+    });
+    return entityStats;
+}
+
+async function kmByBoat({ yearRange }, job) {
+    const boatProcessor = (entry, entityStats) => {
+        accumulateStats(entityStats, entry[BOAT_COLUMN], entry[DIST_COLUMN]);
+    };
+    return sortedEntityStats(await collectEntityStats(yearRange, boatProcessor, job));
+}
+
+function kcombinations(array, k) {
+    if (k === 0 || k > array.length) {
+        return [];
+    }
+    return array.toSorted().reduce((acc, value, index, self) => {
+        if (k === 1) {
+            return acc.concat([[value]]);
+        }
+        return acc.concat(kcombinations(self.slice(index + 1), k - 1).map(combination => [value, ...combination]));
+    }, []);
+}
+
+// Sum outings and km of each crew pair over the years in range. Keys are the
+// sorted member names, as for the pairs enumerated by kcombinations.
+function crewPairStats(yearRange) {
+    const { persons, edges } = data.crewPairs;
+    const names = persons.map(personId => formatCrew([personId]));
+    const entityStats = {};
+    for (let k = 0; k < edges.year.length; k++) {
+        if (inYearRange(edges.year[k], yearRange)) {
+            const key = [names[edges.a[k]], names[edges.b[k]]].toSorted().join(',');
+            accumulateStats(entityStats, key, edges.km[k], edges.count[k]);
+        }
+    }
+    return entityStats;
+}
+
+async function kmByRower({ yearRange, crewSize }, job) {
+    const crewProcessor = (entry, entityStats) => {
+        const crewMembers = entry[CREW_COLUMN].split(',').map(name => name.trim());
+        for (const crew of kcombinations(crewMembers, crewSize)) {
+            accumulateStats(entityStats, crew, entry[DIST_COLUMN]);
+        }
+    };
+
+    // Pairs are looked up in the precomputed edge list if there is one.
+    const entityStats = crewSize === 2 && data.crewPairs
+        ? crewPairStats(yearRange)
+        : await collectEntityStats(yearRange, crewProcessor, job);
+    return sortedEntityStats(entityStats);
+}
+
+// Kilometers per month ("YYYY-MM") of the rows matching the search terms.
+async function kmOverTime({ yearRange, terms }, job) {
+    const matchesSearch = searchMatcher(terms);
+    const monthlyTotals = {};
+    await scanRows(job, entry => {
+        if (!inYearRange(entry[YEAR_COLUMN], yearRange) || !matchesSearch(entry)) {
+            return;
+        }
+        const d = entry[DATE_COLUMN];
+        const monthKey = `${d.getFullYear()}-${(d.getMonth() + 1).toString().padStart(2, '0')}`;
+        monthlyTotals[monthKey] = (monthlyTotals[monthKey] || 0) + (entry[DIST_COLUMN] || 0);
+    });
+    return monthlyTotals;
+}
+
+const QUERIES = {
+    logbook: filterLogbook,
+    boat: kmByBoat,
+    rower: kmByRower,
+    time: kmOverTime
+};
+
+////////////////////////////////////////////////////////////////////////////
+// Messages
+////////////////////////////////////////////////////////////////////////////
+
+const runningJobs = {};
+let entries = 0;
+
+self.onmessage = async ({ data: message }) => {
+    if (message.type === 'load') {
+        try {
+            const loaded = await loadData();
+            entries = loaded.entries;
+            self.postMessage({ type: 'loaded', ...loaded });
+        } catch (error) {
+            self.postMessage({ type: 'error', message: String(error) });
+        }
+        return;
+    }
+
+    const { channel, id, params } = message;
+    if (runningJobs[channel]) {
+        runningJobs[channel].cancelled = true;
+    }
+    const job = { id, entries, cancelled: false };
+    runningJobs[channel] = job;
+    try {
+        const result = await QUERIES[channel](params, job);
+        if (!job.cancelled) {
+            self.postMessage({ type: 'result', id, result }, result instanceof Uint8Array ? [result.buffer] : []);
+        }
+    } catch (error) {
+        if (error !== CANCELLED) {
+            self.postMessage({ type: 'error', id, message: String(error) });
+        }
+    } finally {
+        if (runningJobs[channel] === job) {
+            delete runningJobs[channel];
+        }
+    }
+};
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Replay throughput benchmark for the EFA event log (bin/efa_events.py).
+
+Generates a synthetic backup with make_backup.py, imports it once, and turns
+the result into a club history: one batch of create events per year (entities
+first, then that year's outings), each followed by updates and deletes of a
+few percent of the outings logged so far. It then measures appending, replay
+from event zero, replay from the latest snapshot and replay up to a point in
+the middle of the history.
+
+Examples:
+  bench/bench_events.py --preset club
+  bench/bench_events.py --preset large --snapshot-interval 50000 --output events-bench.json
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from make_backup import CLUB, PRESETS, BackupGenerator
+
+HERE = Path(__file__).resolve().parent
+BIN = HERE.parent / "bin"
+sys.path.insert(0, str(BIN))
+
+from efa_delta import load_export  # noqa: E402
+from efa_events import SNAPSHOT_INTERVAL, EventLog, empty_state  # noqa: E402
+
+
+def make_export(preset: str, work: Path) -> Dict[str, List[dict]]:
+    persons, boats, destinations, years, entries = PRESETS[preset]
+    generator = BackupGenerator(persons, boats, destinations, years, entries,
+                                last_year=2025, former_ratio=0.03, seed=1)
+    data = work / "data" / CLUB
+    data.mkdir(parents=True)
+    (data / "persons.efa2persons").write_text(generator.make_persons(), encoding="utf-8")
+    (data / "boats.efa2boats").write_text(generator.make_boats(), encoding="utf-8")
+    (data / "destinations.efa2destinations").write_text(generator.make_destinations(), encoding="utf-8")
+    for year in generator.years:
+        (data / f"{year}.efa2logbook").write_text(generator.make_logbook(year), encoding="utf-8")
+    subprocess.run([
+        sys.executable, str(BIN / "efa_importer.py"), "--max-distance", "5000", "--no-cache",
+        "--boats", str(data / "boats.efa2boats"),
+        "--persons", str(data / "persons.efa2persons"),
+        "--destinations", str(data / "destinations.efa2destinations"),
+        "--logbooks", str(data / "*.efa2logbook"),
+        "--output", str(work / "out"),
+    ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return load_export(str(work / "out"))
+
+
+def history(export: Dict[str, List[dict]], churn: float, rng: random.Random):
+    """Yield (timestamp, events) batches, one per logbook year."""
+    by_year: Dict[int, List[dict]] = {}
+    for entry in export["logbooks"]:
+        by_year.setdefault(entry["year"] or 0, []).append(entry)
+    logged: List[dict] = []
+    first = True
+    for year in sorted(by_year):
+        events = []
+        if first:
+            for name, kind in (("persons", "athlete"), ("boats", "boat"), ("destinations", "destination")):
+                events += [("create", kind, record["id"], record) for record in export[name]]
+            first = False
+        events += [("create", "outing", entry["id"], entry) for entry in by_year[year]]
+        logged += by_year[year]
+        for entry in rng.sample(logged, int(len(logged) * churn)):
+            events.append(("update", "outing", entry["id"], dict(entry, note="corrected")))
+        deleted = {entry["id"] for entry in rng.sample(logged, int(len(logged) * churn / 4))}
+        events += [("delete", "outing", key, None) for key in deleted]
+        logged = [entry for entry in logged if entry["id"] not in deleted]
+        yield f"{year}-12-31T00:00:00", events
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event log append and replay")
+    parser.add_argument("--preset", choices=PRESETS, default="club", help="Size preset (default: club)")
+    parser.add_argument("--snapshot-interval", type=int, default=SNAPSHOT_INTERVAL,
+                        help=f"Events between snapshots (default: {SNAPSHOT_INTERVAL})")
+    parser.add_argument("--churn", type=float, default=0.02,
+                        help="Share of logged outings updated per year (default: 0.02)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        print(f"Importing synthetic '{args.preset}' backup...")
+        export = make_export(args.preset, work)
+
+        log = EventLog(str(work / "events"), snapshot_interval=args.snapshot_interval)
+        state = empty_state()
+        timestamps = []
+        append_wall = 0.0
+        for timestamp, events in history(export, args.churn, random.Random(1)):
+            _, wall = timed(lambda: log.append(events, timestamp, state))
+            append_wall += wall
+            timestamps.append(timestamp)
+        n_events = log.last_seq()
+
+        (full, _), full_wall = timed(lambda: log.replay(use_snapshots=False))
+        (snap, _), snap_wall = timed(lambda: log.replay())
+        assert full == snap == state
+        middle = timestamps[len(timestamps) // 2]
+        (_, mid_seq), mid_wall = timed(lambda: log.replay(until=middle))
+
+        log_bytes = sum(p.stat().st_size for p in log.segments())
+        snapshot_bytes = sum(p.stat().st_size for p in log.snapshots())
+        n_snapshots = len(log.snapshots())
+
+    results = {
+        "preset": args.preset,
+        "events": n_events,
+        "outings": len(state["outing"]),
+        "log_bytes": log_bytes,
+        "snapshots": n_snapshots,
+        "snapshot_bytes": snapshot_bytes,
+        "append": {"wall": append_wall, "events_per_sec": n_events / append_wall},
+        "replay_full": {"wall": full_wall, "events_per_sec": n_events / full_wall},
+        "replay_snapshot": {"wall": snap_wall},
+        "replay_until_middle": {"until": middle, "events": mid_seq, "wall": mid_wall},
+    }
+    print(f"  events:           {n_events} ({log_bytes / 1024 / 1024:.1f} MiB log, "
+          f"{n_snapshots} snapshots, {snapshot_bytes / 1024 / 1024:.1f} MiB)")
+    print(f"  append:           {append_wall:.2f}s ({n_events / append_wall:.0f} events/s)")
+    print(f"  replay from zero: {full_wall:.2f}s ({n_events / full_wall:.0f} events/s)")
+    print(f"  replay snapshot:  {snap_wall:.2f}s")
+    print(f"  replay to {middle[:4]}:  {mid_wall:.2f}s ({mid_seq} events)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Parse throughput benchmark for the XML backends of efa_parser.
+
+Generates a synthetic backup with make_backup.py and, for each available
+backend (see efa_parser.XML_BACKENDS), measures streaming all logbook
+records with iter_records() and the importer's process_logbooks() on top
+of it. Speedups are relative to the ElementTree reference backend.
+
+Examples:
+  bench/bench_parse.py --preset club
+  bench/bench_parse.py --preset large --repeat 3 --output parse-bench.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from make_backup import PRESETS, BackupGenerator
+
+HERE = Path(__file__).resolve().parent
+BIN = HERE.parent / "bin"
+sys.path.insert(0, str(BIN))
+
+from efa_importer import EfaImporter  # noqa: E402
+from efa_parser import (  # noqa: E402
+    XML_BACKENDS, iter_records, parse_boats, parse_destinations, parse_persons, set_cache_dir, set_xml_backend,
+)
+
+
+def make_logbooks(preset: str, data: Path):
+    persons, boats, destinations, years, entries = PRESETS[preset]
+    generator = BackupGenerator(persons, boats, destinations, years, entries,
+                                last_year=2025, former_ratio=0.03, seed=1)
+    data.mkdir(parents=True)
+    (data / "persons.efa2persons").write_text(generator.make_persons(), encoding="utf-8")
+    (data / "boats.efa2boats").write_text(generator.make_boats(), encoding="utf-8")
+    (data / "destinations.efa2destinations").write_text(generator.make_destinations(), encoding="utf-8")
+    for year in generator.years:
+        (data / f"{year}.efa2logbook").write_text(generator.make_logbook(year), encoding="utf-8")
+
+
+def best_of(repeat: int, fn) -> float:
+    walls = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        walls.append(time.perf_counter() - start)
+    return min(walls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the efa_parser XML backends")
+    parser.add_argument("--preset", choices=PRESETS, default="club", help="Size preset (default: club)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement, best is reported (default: 1)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    set_cache_dir(None)
+
+    results = {"preset": args.preset, "backends": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        data = Path(tmp) / "data"
+        print(f"Generating synthetic '{args.preset}' backup...")
+        make_logbooks(args.preset, data)
+        logbooks = sorted(str(p) for p in data.glob("*.efa2logbook"))
+        size = sum(Path(p).stat().st_size for p in logbooks)
+        records = sum(1 for p in logbooks for _ in iter_records(p, "etree"))
+        results.update(records=records, bytes=size)
+        print(f"  {len(logbooks)} logbooks, {records} records, {size / 1024 / 1024:.1f} MiB")
+
+        for backend in XML_BACKENDS:
+            set_xml_backend(backend)
+
+            def stream():
+                for path in logbooks:
+                    for _ in iter_records(path):
+                        pass
+
+            def process():
+                importer = EfaImporter(5000)
+                importer.boats = parse_boats(str(data / "boats.efa2boats"))
+                importer.persons = parse_persons(str(data / "persons.efa2persons"))
+                importer.destinations = parse_destinations(str(data / "destinations.efa2destinations"))
+                importer.process_logbooks(logbooks)
+
+            results["backends"][backend] = {"records": best_of(args.repeat, stream),
+                                            "process_logbooks": best_of(args.repeat, process)}
+
+    reference = results["backends"]["etree"]
+    print(f"  {'backend':8} {'records':>22} {'process_logbooks':>22}")
+    for backend, walls in results["backends"].items():
+        cells = [f"{walls[k]:6.2f}s ({reference[k] / walls[k]:4.2f}x)" for k in ("records", "process_logbooks")]
+        print(f"  {backend:8} {cells[0]:>22} {cells[1]:>22}")
+        walls["records_per_sec"] = records / walls["records"]
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
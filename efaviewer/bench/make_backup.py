@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Synthetic EFA backup generator.
+
+Writes an efaBackup-style zip (data/<club>/boats.efa2boats, persons.efa2persons,
+destinations.efa2destinations and one YYYY.efa2logbook per year) filled with
+random but plausible data: persons with accented names, boats with several
+variants, and logbooks mixing ID-referenced and name-only (former) boats,
+crew members and destinations. Output is deterministic for a given seed.
+
+Synthetic data only -- no real club/member data.
+"""
+
+import argparse
+import random
+import zipfile
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+CLUB = "BelvoirRC"
+
+# Presets: (persons, boats, destinations, years, entries per year)
+PRESETS = {
+    "small": (300, 40, 30, 3, 1000),
+    "club": (2500, 200, 120, 20, 6000),
+    "large": (10000, 500, 300, 30, 15000),
+}
+
+FIRST_NAMES = [
+    "Anna", "Andrea", "Beat", "Bruno", "Cécile", "Christian", "Claudia", "Daniel", "Doris", "Élodie",
+    "Eva", "Fabian", "Franziska", "Gabriel", "Hanna", "Hans", "Iris", "Jürg", "Jonas", "Karin",
+    "Laura", "Lukas", "Marc", "Maria", "Martina", "Noël", "Nina", "Oliver", "Patrick", "Regula",
+    "René", "Sabine", "Simon", "Sophie", "Stefan", "Thomas", "Ursula", "Urs", "Verena", "Zoë",
+]
+LAST_NAMES = [
+    "Ammann", "Bachmann", "Baumann", "Brunner", "Bühler", "Egli", "Fischer", "Frei", "Gerber", "Graf",
+    "Hess", "Huber", "Keller", "Kälin", "Koch", "Kunz", "Lehmann", "Meier", "Moser", "Müller",
+    "Neuhaus", "Roth", "Schmid", "Schneider", "Schürch", "Steiner", "Suter", "Vogel", "Weber", "Wyss",
+    "Zbinden", "Zürcher", "Zwahlen", "Lüthi", "Béguin", "Perrin", "Rochat", "Favre", "Mäder", "Odermatt",
+]
+BOAT_WORDS = [
+    "Albis", "Uto", "Limmat", "Sihl", "Rigi", "Pilatus", "Säntis", "Tödi", "Glärnisch", "Leviathan",
+    "Möwe", "Falke", "Adler", "Schwan", "Reiher", "Kormoran", "Forelle", "Hecht", "Felchen", "Egli",
+]
+PLACES = [
+    "Zürichhorn", "Rüschlikon", "Thalwil", "Küsnacht", "Erlenbach", "Meilen", "Kilchberg", "Wädenswil",
+    "Au", "Richterswil", "Männedorf", "Stäfa", "Halbinsel Au", "Ufenau", "Rapperswil", "Seebecken",
+]
+# (TypeSeats, TypeRigging, TypeCoxing) variant sets; several boats have two
+# or three variants (e.g. sculling and sweep rigging).
+BOAT_TYPES = [
+    ["1"], ["2"], ["2", "2"], ["4"], ["4", "4"], ["4", "4", "4"], ["8"], ["3"],
+]
+COXED = {"1": "NONE", "2": "NONE", "3": "COXED", "4": "COXED", "8": "COXED"}
+
+
+def _uuid(rng: random.Random) -> str:
+    h = "%032x" % rng.getrandbits(128)
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _record(fields: List[tuple]) -> str:
+    inner = "".join(f"<{tag}>{escape(str(value))}</{tag}>" if value != "" else f"<{tag}/>"
+                    for tag, value in fields)
+    return f"  <record>{inner}</record>\n"
+
+
+def _document(root: str, records: List[str]) -> str:
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<{root}><data>\n{"".join(records)}</data></{root}>\n'
+
+
+def _misspell(rng: random.Random, name: str) -> str:
+    """Return a plausible free-text variant of a name (typo, swapped order, case)."""
+    first, _, last = name.partition(" ")
+    choice = rng.randrange(4)
+    if choice == 0 and len(last) > 3:
+        i = rng.randrange(1, len(last) - 1)
+        return f"{first} {last[:i]}{last[i + 1:]}"
+    if choice == 1:
+        return f"{last} {first}"
+    if choice == 2:
+        return name.lower()
+    return f"{first[0]}. {last}"
+
+
+class BackupGenerator:
+    def __init__(self, persons: int, boats: int, destinations: int, years: int,
+                 entries_per_year: int, last_year: int, former_ratio: float, seed: int):
+        self.rng = random.Random(seed)
+        self.n_persons = persons
+        self.n_boats = boats
+        self.n_destinations = destinations
+        self.years = list(range(last_year - years + 1, last_year + 1))
+        self.entries_per_year = entries_per_year
+        self.former_ratio = former_ratio
+        self.persons: List[Dict] = []
+        self.boats: List[Dict] = []
+        self.destinations: List[Dict] = []
+
+    def make_persons(self) -> str:
+        rng = self.rng
+        records = []
+        for _ in range(self.n_persons):
+            person = {
+                "id": _uuid(rng),
+                "fn": rng.choice(FIRST_NAMES),
+                "ln": rng.choice(LAST_NAMES),
+                # Each person is active for a span of years
+                "first_year": rng.choice(self.years),
+            }
+            person["last_year"] = min(self.years[-1], person["first_year"] + rng.randrange(1, 15))
+            self.persons.append(person)
+            fields = [("Id", person["id"]), ("FirstName", person["fn"]), ("LastName", person["ln"]),
+                      ("Gender", rng.choice(["MALE", "FEMALE"]))]
+            if rng.random() < 0.05:
+                fields.append(("Deleted", "true"))
+            if rng.random() < 0.05:
+                fields.append(("Invisible", "true"))
+            records.append(_record(fields))
+        return _document("efa2persons", records)
+
+    def make_boats(self) -> str:
+        rng = self.rng
+        records = []
+        for i in range(self.n_boats):
+            seats = rng.choice(BOAT_TYPES)
+            rigging = ["SCULL" if j % 2 == 0 else "RIEMEN" for j in range(len(seats))]
+            coxing = [COXED[s] for s in seats]
+            boat = {
+                "id": _uuid(rng),
+                "name": f"{rng.choice(BOAT_WORDS)} {i + 1}",
+                "seats": [int(s) for s in seats],
+                "coxed": [c == "COXED" for c in coxing],
+            }
+            self.boats.append(boat)
+            fields = [("Id", boat["id"]), ("Name", boat["name"])]
+            if rng.random() < 0.1:
+                fields.append(("NameAffix", rng.choice(["Gig", "Renn", "neu"])))
+            fields += [("TypeSeats", ";".join(seats)), ("TypeRigging", ";".join(rigging)),
+                       ("TypeCoxing", ";".join(coxing)), ("LastVariant", len(seats))]
+            records.append(_record(fields))
+        return _document("efa2boats", records)
+
+    def make_destinations(self) -> str:
+        rng = self.rng
+        records = []
+        for i in range(self.n_destinations):
+            dest = {"id": _uuid(rng), "name": f"{rng.choice(PLACES)} {i + 1}", "dist": rng.randrange(4, 40)}
+            self.destinations.append(dest)
+            records.append(_record([("Id", dest["id"]), ("Name", dest["name"]), ("Distance", f"{dest['dist']} km")]))
+        return _document("efa2destinations", records)
+
+    def make_logbook(self, year: int) -> str:
+        rng = self.rng
+        active = [p for p in self.persons if p["first_year"] <= year <= p["last_year"]] or self.persons
+        former = self.former_ratio
+        records = []
+        for entry_id in range(1, self.entries_per_year + 1):
+            day = rng.randrange(1, 29)
+            month = rng.choice([3, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 11])
+            date_year = year + 1 if rng.random() < 0.001 else year  # Occasional typo
+            start = rng.randrange(6 * 60, 19 * 60)
+            end = min(start + rng.randrange(45, 180), 23 * 60 + 59)
+            fields = [("EntryId", entry_id), ("Date", f"{day:02d}.{month:02d}.{date_year}"),
+                      ("StartTime", f"{start // 60:02d}:{start % 60:02d}:00"),
+                      ("EndTime", f"{end // 60:02d}:{end % 60:02d}:00")]
+
+            boat = rng.choice(self.boats)
+            variant = rng.randrange(len(boat["seats"]))
+            if rng.random() < former:
+                fields.append(("BoatName", f"Gastboot {rng.randrange(50)}"))
+            else:
+                fields += [("BoatId", boat["id"]), ("BoatVariant", variant + 1)]
+
+            crew = rng.sample(active, min(boat["seats"][variant], len(active)))
+            for i, person in enumerate(crew, 1):
+                name = f"{person['fn']} {person['ln']}"
+                if rng.random() < former:
+                    fields.append((f"Crew{i}Name", _misspell(rng, name)))
+                else:
+                    fields.append((f"Crew{i}Id", person["id"]))
+            if boat["coxed"][variant]:
+                cox = rng.choice(active)
+                if rng.random() < former:
+                    fields.append(("CoxName", f"{cox['fn']} {cox['ln']}"))
+                else:
+                    fields.append(("CoxId", cox["id"]))
+
+            dest = rng.choice(self.destinations)
+            if rng.random() < former:
+                fields.append(("DestinationName", f"{rng.choice(PLACES)} (Ausfahrt)"))
+                distance = rng.randrange(4, 40)
+            else:
+                fields.append(("DestinationId", dest["id"]))
+                distance = dest["dist"]
+            if rng.random() < 0.001:
+                distance *= 100  # Occasional excessive distance
+            fields.append(("Distance", f"{distance} km"))
+            fields.append(("SessionType", rng.choice(["NORMAL", "NORMAL", "NORMAL", "TRAINING", "REGATTA"])))
+            if rng.random() < 0.05:
+                fields.append(("Comments", rng.choice(["Schöne Ausfahrt", "Wind", "Steuer defekt", "Nebel"])))
+            fields.append(("Open", "false"))
+            records.append(_record(fields))
+        return _document("efa2logbook", records)
+
+    def write_zip(self, zip_path: str):
+        prefix = f"data/{CLUB}/"
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr(prefix + "persons.efa2persons", self.make_persons())
+            z.writestr(prefix + "boats.efa2boats", self.make_boats())
+            z.writestr(prefix + "destinations.efa2destinations", self.make_destinations())
+            for year in self.years:
+                z.writestr(prefix + f"{year}.efa2logbook", self.make_logbook(year))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic EFA backup zip")
+    parser.add_argument("output", help="Output zip file (e.g. efaBackup_20240101_000000.zip)")
+    parser.add_argument("--preset", choices=PRESETS, default="club", help="Size preset (default: club)")
+    parser.add_argument("--persons", type=int, help="Number of persons")
+    parser.add_argument("--boats", type=int, help="Number of boats")
+    parser.add_argument("--destinations", type=int, help="Number of destinations")
+    parser.add_argument("--years", type=int, help="Number of logbook years")
+    parser.add_argument("--entries-per-year", type=int, help="Logbook entries per year")
+    parser.add_argument("--last-year", type=int, default=2025, help="Last logbook year (default: 2025)")
+    parser.add_argument("--former-ratio", type=float, default=0.03,
+                        help="Fraction of boat/crew/destination references given by name only (default: 0.03)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed (default: 1)")
+    args = parser.parse_args()
+
+    persons, boats, destinations, years, entries = PRESETS[args.preset]
+    generator = BackupGenerator(
+        persons=args.persons or persons,
+        boats=args.boats or boats,
+        destinations=args.destinations or destinations,
+        years=args.years or years,
+        entries_per_year=args.entries_per_year or entries,
+        last_year=args.last_year,
+        former_ratio=args.former_ratio,
+        seed=args.seed,
+    )
+    generator.write_zip(args.output)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
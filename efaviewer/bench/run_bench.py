@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the EFA importer and viewer.
+
+Generates a synthetic backup with make_backup.py (or uses a given one), runs
+efa_importer.py and efa_viewer.py --analyze-names against it, and reports
+wall time, CPU time, peak RSS and throughput for each. Results can be stored
+as a baseline; later runs that are more than --tolerance slower or larger
+than the baseline are flagged as regressions and make the script exit 1.
+
+Examples:
+  bench/run_bench.py --preset small --save-baseline
+  bench/run_bench.py --preset small
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+from make_backup import CLUB, PRESETS
+
+HERE = Path(__file__).resolve().parent
+BIN = HERE.parent / "bin"
+
+
+def run_measured(cmd: List[str], log_path: Path) -> Dict:
+    """Run cmd and return its wall time, CPU time and peak RSS (KiB)."""
+    with open(log_path, "wb") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        sys.stderr.write(log_path.read_text(errors="replace")[-2000:])
+        raise SystemExit(f"Command failed ({proc.returncode}): {' '.join(cmd)}")
+    rss = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {"wall": wall, "cpu": usage.ru_utime + usage.ru_stime, "peak_rss_kb": rss}
+
+
+def bench_importer(data: Path, work: Path) -> Dict:
+    metrics_file = work / "import-metrics.json"
+    result = run_measured([
+        sys.executable, str(BIN / "efa_importer.py"), "--max-distance", "500",
+        "--boats", str(data / "boats.efa2boats"),
+        "--persons", str(data / "persons.efa2persons"),
+        "--destinations", str(data / "destinations.efa2destinations"),
+        "--logbooks", str(data / "*.efa2logbook"),
+        "--output", str(work / "out"),
+        "--metrics", str(metrics_file),
+    ], work / "importer.log")
+    metrics = json.loads(metrics_file.read_text())
+    records = sum(lb["records"] for lb in metrics["logbooks"])
+    result["records"] = records
+    result["records_per_sec"] = records / result["wall"]
+    result["phases"] = {p["name"]: p["wall"] for p in metrics["phases"]}
+    return result
+
+
+def bench_viewer(data: Path, work: Path) -> Dict:
+    logbook = sorted(glob.glob(str(data / "*.efa2logbook")))[-1]
+    return run_measured([
+        sys.executable, str(BIN / "efa_viewer.py"), "--analyze-names",
+        "--boats", str(data / "boats.efa2boats"),
+        "--persons", str(data / "persons.efa2persons"),
+        "--destinations", str(data / "destinations.efa2destinations"),
+        "--logbook", logbook,
+    ], work / "viewer.log")
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return descriptions of measurements that regressed against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for key in ("wall", "peak_rss_kb"):
+            if base.get(key) and result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {result[key]:.2f} vs baseline {base[key]:.2f} "
+                                   f"(+{(result[key] / base[key] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark efa_importer.py and efa_viewer.py")
+    parser.add_argument("--backup", help="Existing efaBackup zip to use instead of a generated one")
+    parser.add_argument("--preset", choices=PRESETS, default="small", help="Generated backup size (default: small)")
+    parser.add_argument("--seed", type=int, default=1, help="Generator seed (default: 1)")
+    parser.add_argument("--skip-viewer", action="store_true", help="Only benchmark the importer")
+    parser.add_argument("--baseline", help="Baseline file (default: bench/baseline-<preset>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown/growth relative to the baseline (default: 0.25)")
+    parser.add_argument("--json", help="Also write results as JSON to this file")
+    args = parser.parse_args()
+
+    baseline_file = Path(args.baseline or HERE / f"baseline-{args.preset}.json")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        work = Path(tmp)
+        backup = args.backup
+        if not backup:
+            backup = str(work / "efaBackup.zip")
+            subprocess.run([sys.executable, str(HERE / "make_backup.py"), backup,
+                            "--preset", args.preset, "--seed", str(args.seed)],
+                           check=True, stdout=subprocess.DEVNULL)
+        with zipfile.ZipFile(backup) as z:
+            z.extractall(work / "backup")
+        data = work / "backup" / "data" / CLUB
+        # Start from a cold reference-data cache on every run
+        os.environ["EFA_CACHE_DIR"] = str(work / "cache")
+
+        results = {"importer": bench_importer(data, work)}
+        if not args.skip_viewer:
+            results["viewer_analyze_names"] = bench_viewer(data, work)
+
+    for name, result in results.items():
+        line = f"{name}: {result['wall']:.2f}s wall, {result['cpu']:.2f}s cpu, {result['peak_rss_kb'] / 1024:.0f} MiB peak rss"
+        if "records_per_sec" in result:
+            line += f", {result['records']} records ({result['records_per_sec']:.0f}/s)"
+        print(line)
+        for phase, wall in result.get("phases", {}).items():
+            print(f"  {phase}: {wall:.2f}s")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+    if args.save_baseline:
+        baseline_file.write_text(json.dumps(results, indent=2))
+        print(f"Saved baseline to {baseline_file}")
+        return 0
+
+    if baseline_file.exists():
+        regressions = compare(results, json.loads(baseline_file.read_text()), args.tolerance)
+        if regressions:
+            print("REGRESSIONS against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions against {baseline_file} (tolerance {args.tolerance * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
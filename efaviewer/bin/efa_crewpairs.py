@@ -0,0 +1,71 @@
+"""
+Sparse crew co-occurrence edge list.
+
+For every two persons who were in a crew together, the importer counts the
+outings and the kilometers they shared, per year. Only pairs that actually
+rowed together are stored, as a column-oriented edge list sorted by year and
+person pair (crewpairs.json):
+
+    {"version": 1,
+     "persons": ["<person id>", ...],   # crew members, sorted by ID
+     "edges": {"a": [0, 0, ...],        # person indexes, a < b
+               "b": [1, 1, ...],
+               "year": [2023, 2024, ...],
+               "count": [12, 3, ...],
+               "km": [96, 30, ...]}}
+
+"Who rowed most with whom" and crew-pair tables are then sums over edges in a
+year range instead of enumerating crew combinations per entry (app.js
+updateKmByRower). Entries the viewer does not count as outings (open entries
+without an end time) are left out, as are entries without a year.
+"""
+
+from array import array
+from collections import defaultdict
+from typing import Dict
+
+from efa_store import LogbookStore, NONE
+
+CREWPAIRS_VERSION = 1
+
+
+def build_crew_pairs(logbooks: LogbookStore) -> dict:
+    """Build the crew co-occurrence edge list (see module docstring).
+
+    Years are counted one at a time, with pairs packed into single integer
+    keys, so that memory stays bounded by the pairs of the busiest year.
+    """
+    strings = logbooks.strings
+    members, offsets = logbooks.crew_members, logbooks.crew_offsets
+    entries_by_year: Dict[int, array] = defaultdict(lambda: array("i"))
+    for i, (year, is_open, t1) in enumerate(zip(logbooks.year, logbooks.open, logbooks.t1)):
+        if offsets[i + 1] - offsets[i] >= 2 and year != NONE and not (is_open and t1 == NONE):
+            entries_by_year[year].append(i)
+
+    # Persons are indexed in order of their IDs, independent of interning order.
+    handles = sorted({h for entries in entries_by_year.values() for i in entries
+                      for h in members[offsets[i]:offsets[i + 1]]}, key=lambda h: strings[h])
+    index = {h: k for k, h in enumerate(handles)}
+    n = len(handles)
+
+    edges = {"a": [], "b": [], "year": [], "count": [], "km": []}
+    for year in sorted(entries_by_year):
+        counts: Dict[int, int] = {}
+        kms: Dict[int, int] = {}
+        for i in entries_by_year[year]:
+            dist = logbooks.dist[i]
+            km = 0 if dist == NONE else dist
+            crew = sorted({index[h] for h in members[offsets[i]:offsets[i + 1]]})
+            for x, a in enumerate(crew):
+                for b in crew[x + 1:]:
+                    key = a * n + b
+                    counts[key] = counts.get(key, 0) + 1
+                    kms[key] = kms.get(key, 0) + km
+        for key in sorted(counts):
+            a, b = divmod(key, n)
+            edges["a"].append(a)
+            edges["b"].append(b)
+            edges["year"].append(year)
+            edges["count"].append(counts[key])
+            edges["km"].append(kms[key])
+    return {"version": CREWPAIRS_VERSION, "persons": [strings[h] for h in handles], "edges": edges}
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Indexed queries over an efa_importer.py export.
+
+EfaDataset loads an export directory lazily (each collection on first use,
+from the version current.json named when the dataset was opened, for
+versioned exports) and keeps the logbook in a LogbookStore with secondary
+indexes:
+
+    person -> entries, boat -> entries, destination -> entries   (posting arrays)
+    date -> entries                                              (sorted by date ordinal)
+
+Queries combine filters; the most selective one picks the candidate entries
+from its index and the others are checked per candidate on the store's
+columns, so a query costs O(smallest match) instead of a scan.
+
+    dataset = EfaDataset("app/data")
+    query = dataset.query().person(person_id).years(2020, 2024)
+    query.count(), query.distance(), query.group_by("boat")
+
+Examples:
+  efa_dataset.py app/data --person "Anna Muster" --year 2024 --group-by boat
+  efa_dataset.py app/data --boat Seeadler --since 01.05.2024 --until 31.05.2024 --list
+"""
+
+import argparse
+import bisect
+import gzip
+import json
+import logging
+import sys
+from array import array
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from efa_parser import format_person_name, normalize_name, parse_date_ordinal
+from efa_publish import load_pointer, pointer_path
+from efa_store import LogbookStore, NONE
+
+logger = logging.getLogger(__name__)
+
+GROUP_KEYS = ("boat", "person", "dest", "year")
+
+
+class EfaDataset:
+    """An export directory with lazily built logbook indexes (see module docstring)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Collections load lazily; all come from the version current now.
+        self._pointer = load_pointer(path)
+        self._collections: Dict[str, dict] = {}
+        self._logbooks: Optional[LogbookStore] = None
+        self._postings: Dict[str, Dict[int, array]] = {}
+        self._ordinals: Optional[array] = None
+        self._date_order: Optional[array] = None
+        self._date_keys: Optional[array] = None
+
+    def _load(self, name: str):
+        with gzip.open(pointer_path(self.path, self._pointer, f"{name}.json.gz"), "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _collection(self, name: str) -> dict:
+        if name not in self._collections:
+            self._collections[name] = {record["id"]: record for record in self._load(name)}
+        return self._collections[name]
+
+    @property
+    def boats(self) -> dict:
+        return self._collection("boats")
+
+    @property
+    def persons(self) -> dict:
+        return self._collection("persons")
+
+    @property
+    def destinations(self) -> dict:
+        return self._collection("destinations")
+
+    @property
+    def logbooks(self) -> LogbookStore:
+        if self._logbooks is None:
+            store = LogbookStore()
+            for entry in self._load("logbooks"):
+                store.append(entry)
+            self._logbooks = store
+        return self._logbooks
+
+    def postings(self, key: str) -> Dict[int, array]:
+        """Return the index of "person", "boat" or "dest" handles to sorted entry indexes."""
+        if key not in self._postings:
+            logbooks = self.logbooks
+            index: Dict[int, array] = defaultdict(lambda: array("i"))
+            if key == "person":
+                members, offsets = logbooks.crew_members, logbooks.crew_offsets
+                for i in range(len(logbooks)):
+                    for h in set(members[offsets[i]:offsets[i + 1]]):
+                        index[h].append(i)
+            else:
+                for i, h in enumerate(getattr(logbooks, key)):
+                    if h != NONE:
+                        index[h].append(i)
+            self._postings[key] = dict(index)
+        return self._postings[key]
+
+    @property
+    def ordinals(self) -> array:
+        """Return the date ordinal of each entry (0 if invalid)."""
+        if self._ordinals is None:
+            logbooks = self.logbooks
+            days = {h: parse_date_ordinal(logbooks.strings[h]) for h in set(logbooks.date)}
+            self._ordinals = array("i", (days[h] for h in logbooks.date))
+        return self._ordinals
+
+    def date_range(self, first: int, last: int) -> array:
+        """Return the entries dated first..last (ordinals, inclusive) in date order."""
+        if self._date_order is None:
+            ordinals = self.ordinals
+            self._date_order = array("i", sorted(range(len(ordinals)), key=ordinals.__getitem__))
+            self._date_keys = array("i", (ordinals[i] for i in self._date_order))
+        lo = bisect.bisect_left(self._date_keys, first)
+        hi = bisect.bisect_right(self._date_keys, last)
+        return self._date_order[lo:hi]
+
+    def handle(self, entity_id: str) -> int:
+        return self.logbooks.strings.lookup(entity_id)
+
+    def find(self, kind: str, name_or_id: str) -> List[str]:
+        """Return the IDs of the boats, persons or destinations with this ID or (normalized) name."""
+        entities = {"boat": self.boats, "person": self.persons, "dest": self.destinations}[kind]
+        if name_or_id in entities:
+            return [name_or_id]
+        wanted = normalize_name(name_or_id)
+        return [entity_id for entity_id, entity in entities.items() if normalize_name(self.label(kind, entity_id)) == wanted]
+
+    def label(self, kind: str, entity_id: str) -> str:
+        """Return the display name of a boat, person or destination."""
+        if kind == "person":
+            person = self.persons.get(entity_id)
+            return format_person_name(person.get("fn"), person.get("ln")) if person else entity_id
+        entity = (self.boats if kind == "boat" else self.destinations).get(entity_id)
+        return entity["name"] if entity and entity.get("name") else entity_id
+
+    def query(self) -> "Query":
+        return Query(self)
+
+
+class Query:
+    """Conjunction of filters over the entries of an EfaDataset.
+
+    Filter methods return a new Query, so queries can be built up and reused.
+    """
+
+    def __init__(self, dataset: EfaDataset, filters: Tuple[tuple, ...] = ()):
+        self.dataset = dataset
+        self.filters = filters
+
+    def _with(self, *filter_: object) -> "Query":
+        return Query(self.dataset, self.filters + (filter_,))
+
+    def _entities(self, kind: str, ids: Tuple[str, ...]) -> "Query":
+        return self._with(kind, frozenset(self.dataset.handle(entity_id) for entity_id in ids))
+
+    def person(self, *person_ids: str) -> "Query":
+        """Entries with any of these persons in the crew (call again to require several persons)."""
+        return self._entities("person", person_ids)
+
+    def boat(self, *boat_ids: str) -> "Query":
+        """Entries in any of these boats (e.g. all variants of a boat)."""
+        return self._entities("boat", boat_ids)
+
+    def dest(self, *dest_ids: str) -> "Query":
+        return self._entities("dest", dest_ids)
+
+    def named(self, kind: str, name_or_id: str) -> "Query":
+        """Filter by "person", "boat" or "dest" given by ID or name; a name may match several."""
+        ids = self.dataset.find(kind, name_or_id)
+        if not ids:
+            raise ValueError(f"No {kind} named '{name_or_id}'")
+        return getattr(self, kind)(*ids)
+
+    def between(self, since: Optional[str] = None, until: Optional[str] = None) -> "Query":
+        """Entries dated since..until (DD.MM.YYYY or YYYY-MM-DD, inclusive)."""
+        first = parse_date_ordinal(since) if since else 1
+        last = parse_date_ordinal(until) if until else date.max.toordinal()
+        return self._with("date", first, last)
+
+    def years(self, first: int, last: Optional[int] = None) -> "Query":
+        """Entries in the years first..last (inclusive; default: just first)."""
+        return self.between(f"01.01.{first}", f"31.12.{last if last is not None else first}")
+
+    def _candidates(self) -> Tuple[Optional[array], tuple]:
+        """Return the entries of the most selective filter and the remaining filters."""
+        dataset = self.dataset
+        best, best_filter = None, None
+        for filter_ in self.filters:
+            if filter_[0] == "date":
+                matches = dataset.date_range(filter_[1], filter_[2])
+            else:
+                postings = dataset.postings(filter_[0])
+                lists = [postings[h] for h in filter_[1] if h in postings]
+                matches = lists[0] if len(lists) == 1 else array("i", sorted(set().union(*lists)))
+            if best is None or len(matches) < len(best):
+                best, best_filter = matches, filter_
+        rest = tuple(filter_ for filter_ in self.filters if filter_ is not best_filter)
+        return best, rest
+
+    def indexes(self) -> Iterator[int]:
+        """Yield the indexes of matching entries (in date order if a date filter drives the query)."""
+        candidates, rest = self._candidates()
+        logbooks = self.dataset.logbooks
+        if candidates is None:
+            candidates = range(len(logbooks))
+        checks = []
+        for filter_ in rest:
+            kind = filter_[0]
+            if kind == "person":
+                members, offsets, handles = logbooks.crew_members, logbooks.crew_offsets, filter_[1]
+                checks.append(lambda i, handles=handles: not handles.isdisjoint(members[offsets[i]:offsets[i + 1]]))
+            elif kind == "date":
+                ordinals, first, last = self.dataset.ordinals, filter_[1], filter_[2]
+                checks.append(lambda i, first=first, last=last: first <= ordinals[i] <= last)
+            else:
+                column, handles = getattr(logbooks, kind), filter_[1]
+                checks.append(lambda i, column=column, handles=handles: column[i] in handles)
+        for i in candidates:
+            if all(check(i) for check in checks):
+                yield i
+
+    def entries(self) -> Iterator[dict]:
+        logbooks = self.dataset.logbooks
+        for i in self.indexes():
+            yield logbooks.entry(i)
+
+    def count(self) -> int:
+        return sum(1 for _ in self.indexes())
+
+    def distance(self) -> int:
+        dist = self.dataset.logbooks.dist
+        return sum(dist[i] for i in self.indexes() if dist[i] != NONE)
+
+    def group_by(self, key: str) -> Dict[object, List[int]]:
+        """Return {boat, person, destination ID or year: [outings, km]} of the matching entries."""
+        if key not in GROUP_KEYS:
+            raise ValueError(f"Cannot group by {key!r} (expected one of {', '.join(GROUP_KEYS)})")
+        logbooks = self.dataset.logbooks
+        strings, dist = logbooks.strings, logbooks.dist
+        groups: Dict[object, List[int]] = defaultdict(lambda: [0, 0])
+        for i in self.indexes():
+            if key == "person":
+                keys = {strings[h] for h in logbooks.crew(i)}
+            elif key == "year":
+                keys = [logbooks.year[i]]
+            else:
+                h = getattr(logbooks, key)[i]
+                keys = [strings[h]] if h != NONE else []
+            for group in keys:
+                stats = groups[group]
+                stats[0] += 1
+                stats[1] += max(dist[i], 0)
+        return dict(groups)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query an efa_importer.py export")
+    parser.add_argument("export", help="Export directory")
+    parser.add_argument("--person", action="append", default=[], help="Person name or ID (repeatable: all of them)")
+    parser.add_argument("--boat", help="Boat name (all variants) or ID")
+    parser.add_argument("--destination", help="Destination name or ID")
+    parser.add_argument("--year", type=int, help="Only entries of this year")
+    parser.add_argument("--since", help="Only entries on or after this date (DD.MM.YYYY or YYYY-MM-DD)")
+    parser.add_argument("--until", help="Only entries on or before this date (DD.MM.YYYY or YYYY-MM-DD)")
+    parser.add_argument("--group-by", choices=GROUP_KEYS, help="Print outings and km per group")
+    parser.add_argument("--list", action="store_true", help="Print the matching entries as JSON lines")
+    parser.add_argument("--limit", "-n", type=int, default=20, help="Groups to print with --group-by (default: 20)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    for date_arg in ("since", "until"):
+        value = getattr(args, date_arg)
+        if value and not parse_date_ordinal(value):
+            parser.error(f"--{date_arg}: invalid date '{value}' (expected DD.MM.YYYY or YYYY-MM-DD)")
+
+    dataset = EfaDataset(args.export)
+    query = dataset.query()
+    try:
+        for kind, values in (("person", args.person), ("boat", [args.boat] if args.boat else []),
+                             ("dest", [args.destination] if args.destination else [])):
+            for value in values:
+                query = query.named(kind, value)
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+    if args.year:
+        query = query.years(args.year)
+    if args.since or args.until:
+        query = query.between(args.since, args.until)
+
+    if args.list:
+        for entry in query.entries():
+            print(json.dumps(entry, ensure_ascii=False))
+    elif args.group_by:
+        # Groups with the same name (e.g. the variants of a boat) are printed as one.
+        totals: Dict[object, List[int]] = defaultdict(lambda: [0, 0])
+        for group, (count, km) in query.group_by(args.group_by).items():
+            label = group if args.group_by == "year" else dataset.label(args.group_by, group)
+            totals[label][0] += count
+            totals[label][1] += km
+        for label, (count, km) in sorted(totals.items(), key=lambda item: -item[1][1])[:args.limit]:
+            print(f"{label}\t{count}\t{km}")
+    else:
+        print(f"{query.count()} outings, {query.distance()} km")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Versioned delta feed between successive JSON exports.
+
+After each import the new export is compared with the previous one (still
+on disk in the output directory) and the differences are written to
+deltas/delta-NNNNNN.json.gz. manifest.json lists the current version and the
+chain of deltas leading up to it:
+
+    {"version": 7, "base": 4,
+     "deltas": [{"from": 4, "to": 5, "file": "deltas/delta-000005.json.gz", "bytes": 812}, ...]}
+
+A client holding version v >= base fetches the deltas with from >= v and
+applies them in order; a client with an older (or no) version downloads the
+full snapshot. The chain is cut from the front when it has more than
+max_chain links or its deltas together are larger than the snapshot, and
+started anew (its delta files deleted) when there is no previous export to
+diff against or either export has two records with the same key. The viewer's data worker (app/worker.js) is such a client; it
+finds the manifest in current.json (efa_publish.py).
+
+Each delta holds, per collection (boats, persons, destinations, logbooks):
+
+    "added":    [{"after": id or null, "record": {...}}, ...]
+    "modified": [{...}, ...]      full new records
+    "removed":  [id, ...]
+    "order":    [id, ...]         only if surviving records were reordered
+
+Records are keyed by their "id" field (see record_key), which must be unique
+within a collection; a duplicate (e.g. an EntryId used twice in one
+logbook) cannot be addressed by a delta. "after" is the ID of the record
+preceding an added one in the new export, so that applying a delta
+reproduces the export's order (search.json postings refer to positions in
+logbooks.json). search.json itself is derived data and is not part of the
+feed; clients refetch it.
+"""
+
+import gzip
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from efa_publish import load_pointer, pointer_path
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = ("boats", "persons", "destinations", "logbooks")
+MANIFEST = "manifest.json"
+DELTA_DIR = "deltas"
+DELTA_VERSION = 1
+MAX_DELTA_CHAIN = 30
+
+
+def record_key(record: dict) -> str:
+    """Return the key a record is diffed by.
+
+    Logbook entries without an EntryId have no "id"; they are keyed by their
+    content, so a change to one shows up as a removal plus an addition.
+    """
+    key = record.get("id")
+    return key if key is not None else json.dumps(record, sort_keys=True, separators=(',', ':'))
+
+
+def load_export(output_dir: str) -> Optional[Dict[str, List[dict]]]:
+    """Load the collections of an export directory, or None if there is none."""
+    export = {}
+    pointer = load_pointer(output_dir)
+    for name in COLLECTIONS:
+        path = pointer_path(output_dir, pointer, f"{name}.json.gz")
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            export[name] = json.load(f)
+    return export
+
+
+def diff_records(old: Iterable[dict], new: Iterable[dict]) -> Dict[str, Any]:
+    """Compute the changes turning the record sequence old into new.
+
+    new is consumed in a single pass, so it may be a LogbookStore or any
+    other iterable that materializes records lazily. Raises ValueError if
+    old or new holds two records with the same key.
+    """
+    old_by_key = {}
+    for record in old:
+        key = record_key(record)
+        if key in old_by_key:
+            raise ValueError(f"duplicate record key {key} in the previous export")
+        old_by_key[key] = record
+    added, modified, survivors, order = [], [], [], []
+    new_keys = set()
+    prev = None
+    for record in new:
+        key = record_key(record)
+        if key in new_keys:
+            raise ValueError(f"duplicate record key {key} in the new export")
+        new_keys.add(key)
+        order.append(key)
+        old_record = old_by_key.get(key)
+        if old_record is None:
+            added.append({"after": prev, "record": record})
+        else:
+            survivors.append(key)
+            if old_record != record:
+                modified.append(record)
+        prev = key
+
+    changes: Dict[str, Any] = {}
+    if added:
+        changes["added"] = added
+    if modified:
+        changes["modified"] = modified
+    removed = [key for key in old_by_key if key not in new_keys]
+    if removed:
+        changes["removed"] = removed
+    if survivors != [key for key in old_by_key if key in new_keys]:
+        changes["order"] = order
+    return changes
+
+
+def diff_exports(old: Dict[str, List[dict]], new: Dict[str, Iterable[dict]]) -> Dict[str, Dict[str, Any]]:
+    """Diff every collection; collections without changes are left out."""
+    delta = {}
+    for name in COLLECTIONS:
+        changes = diff_records(old.get(name, []), new[name])
+        if changes:
+            delta[name] = changes
+    return delta
+
+
+def apply_changes(records: List[dict], changes: Dict[str, Any]) -> List[dict]:
+    """Apply the changes of one collection (see diff_records) to a record list.
+
+    Raises ValueError if records holds two records with the same key.
+    """
+    removed = set(changes.get("removed", ()))
+    modified = {record_key(record): record for record in changes.get("modified", ())}
+    result = []
+    keys = set()
+    for record in records:
+        key = record_key(record)
+        if key in keys:
+            raise ValueError(f"duplicate record key {key}")
+        keys.add(key)
+        if key not in removed:
+            result.append(modified.get(key, record))
+
+    if "order" in changes:
+        by_key = {record_key(record): record for record in result}
+        by_key.update((record_key(item["record"]), item["record"]) for item in changes.get("added", ()))
+        return [by_key[key] for key in changes["order"]]
+
+    # Added records are listed in export order, so each "after" refers to a
+    # surviving record or to a record added before it.
+    followers: Dict[Optional[str], List[dict]] = {}
+    for item in changes.get("added", ()):
+        followers.setdefault(item["after"], []).append(item["record"])
+    if not followers:
+        return result
+
+    merged = []
+    stack = list(reversed(result)) + list(reversed(followers.pop(None, [])))
+    while stack:
+        record = stack.pop()
+        merged.append(record)
+        stack.extend(reversed(followers.pop(record_key(record), [])))
+    return merged
+
+
+def apply_delta(export: Dict[str, List[dict]], delta: dict) -> Dict[str, List[dict]]:
+    """Return export with a delta (as written by publish_delta) applied."""
+    return {name: apply_changes(export.get(name, []), delta["changes"].get(name, {}))
+            if name in delta["changes"] else export.get(name, [])
+            for name in COLLECTIONS}
+
+
+def load_manifest(output_dir: str) -> Optional[dict]:
+    path = Path(output_dir) / MANIFEST
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(output_dir: str, manifest: dict):
+    """Write manifest.json via a temporary file so readers never see a partial one."""
+    path = Path(output_dir) / MANIFEST
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    tmp.replace(path)
+
+
+def snapshot_size(output_dir: str) -> int:
+    """Return the size of the compressed full export of all collections."""
+    pointer = load_pointer(output_dir)
+    return sum(pointer_path(output_dir, pointer, f"{name}.json.gz").stat().st_size for name in COLLECTIONS)
+
+
+def publish_delta(output_dir: str, previous: Optional[Dict[str, List[dict]]], current: Dict[str, Iterable[dict]],
+                  max_chain: int = MAX_DELTA_CHAIN) -> dict:
+    """Diff current against the previous export and extend the delta chain.
+
+    Must be called after the current export has been written to output_dir.
+    Returns the new manifest.
+    """
+    output_path = Path(output_dir)
+    manifest = load_manifest(output_dir)
+    if manifest is None or previous is None:
+        # No known client can hold a version of an unversioned export.
+        return _restart_chain(output_dir, manifest)
+
+    try:
+        changes = diff_exports(previous, current)
+    except ValueError as e:
+        # Clients download the full export instead.
+        logger.warning(f"Delta feed: {e}, cannot publish a delta")
+        return _restart_chain(output_dir, manifest)
+    if not changes:
+        logger.info(f"Delta feed: no changes, staying at version {manifest['version']}")
+        return manifest
+
+    version = manifest["version"] + 1
+    delta_file = f"{DELTA_DIR}/delta-{version:06d}.json.gz"
+    (output_path / DELTA_DIR).mkdir(exist_ok=True)
+    with gzip.open(output_path / delta_file, "wt", encoding="utf-8") as f:
+        json.dump({"version": DELTA_VERSION, "from": manifest["version"], "to": version, "changes": changes},
+                  f, separators=(',', ':'))
+
+    deltas = manifest["deltas"] + [{
+        "from": manifest["version"],
+        "to": version,
+        "file": delta_file,
+        "bytes": (output_path / delta_file).stat().st_size,
+    }]
+    # Beyond this point a full download is cheaper than replaying the chain.
+    limit = snapshot_size(output_dir)
+    while deltas and (len(deltas) > max_chain or sum(d["bytes"] for d in deltas) > limit):
+        (output_path / deltas.pop(0)["file"]).unlink(missing_ok=True)
+
+    manifest = {"version": version, "base": deltas[0]["from"] if deltas else version, "deltas": deltas}
+    write_manifest(output_dir, manifest)
+    summary = ", ".join(f"{name} +{len(c.get('added', ()))}/~{len(c.get('modified', ()))}/-{len(c.get('removed', ()))}"
+                        for name, c in changes.items())
+    logger.info(f"Delta feed: version {version} ({summary}), chain of {len(deltas)} from version {manifest['base']}")
+    return manifest
+
+
+def _restart_chain(output_dir: str, manifest: Optional[dict]) -> dict:
+    """Start a new chain at the next version, which clients can only download in full."""
+    version = manifest["version"] + 1 if manifest else 1
+    manifest = {"version": version, "base": version, "deltas": []}
+    write_manifest(output_dir, manifest)
+    # The deltas of the previous chain lead to none of the new versions.
+    for delta_file in (Path(output_dir) / DELTA_DIR).glob("delta-*.json.gz"):
+        delta_file.unlink()
+    logger.info(f"Delta feed: started at version {version}")
+    return manifest
+
+
+def load_delta(output_dir: str, delta_file: str) -> dict:
+    with gzip.open(Path(output_dir) / delta_file, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def former_ids(export: Dict[str, List[dict]]) -> Dict[tuple, str]:
+    """Map (entity type, name) of an export's former entities to their IDs.
+
+    Names are reconstructed the way the importer derived the entities from
+    them, so that re-importing keeps former IDs stable across exports.
+    """
+    ids = {}
+    for entity_type, collection in (("boat", "boats"), ("person", "persons"), ("destination", "destinations")):
+        for entity in export.get(collection, ()):
+            if not entity.get("fmr") or not str(entity.get("id", "")).startswith("former-"):
+                continue
+            if entity_type == "person":
+                name = " ".join(part for part in (entity.get("fn"), entity.get("ln")) if part)
+            else:
+                name = entity.get("name")
+            if name:
+                ids[(entity_type, name)] = entity["id"]
+    return ids
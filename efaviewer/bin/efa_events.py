@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Append-only event log of EFA state changes, with snapshot-based replay.
+
+Successive imports are turned into timestamped create/update/delete events
+for athletes, boats, destinations and outings (see efa_delta.diff_records
+for how records are matched). Events are appended as JSON lines to segment
+files; every SNAPSHOT_INTERVAL events the full state is written as a
+snapshot, so replay starts from the latest snapshot instead of event zero.
+
+Layout of a log directory:
+
+    events-000000000001.jsonl   segment, named after its first sequence number
+    events-000000050001.jsonl
+    snapshot-000000100000.json.gz   state after event 100000 (a header line
+                                    with seq and ts, then the state)
+
+Event format (one per line):
+
+    {"seq": 17, "ts": "2024-06-15T00:00:00", "op": "update", "kind": "outing",
+     "id": "2024:12", "data": {...full record...}}
+
+delete events have no "data". Segments and snapshots are never rewritten;
+state is {kind: {id: record}}. The one exception is an incomplete last
+line of the newest segment, left by an append that was interrupted: it is
+skipped when reading and cut off before the next append.
+
+Examples:
+  efa_events.py append --export app/data --timestamp 2024-06-15T00:00:00 events/
+  efa_events.py replay events/
+  efa_events.py replay --until 2024-01-01 events/
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from efa_delta import COLLECTIONS, diff_records, load_export, record_key
+
+logger = logging.getLogger(__name__)
+
+# Export collection -> event kind (Elbar data model names)
+KINDS = {"persons": "athlete", "boats": "boat", "destinations": "destination", "logbooks": "outing"}
+SEGMENT_EVENTS = 50000
+SNAPSHOT_INTERVAL = 100000
+
+State = Dict[str, Dict[str, dict]]
+
+
+def empty_state() -> State:
+    return {kind: {} for kind in KINDS.values()}
+
+
+def apply_event(state: State, event: dict):
+    records = state[event["kind"]]
+    if event["op"] == "delete":
+        records.pop(event["id"], None)
+    else:
+        records[event["id"]] = event["data"]
+
+
+def diff_events(state: State, collections: Dict[str, Iterable[dict]]) -> Iterator[Tuple[str, str, str, Optional[dict]]]:
+    """Yield (op, kind, id, record) events turning state into the given collections."""
+    for name in COLLECTIONS:
+        kind = KINDS[name]
+        changes = diff_records(state[kind].values(), collections[name])
+        for item in changes.get("added", ()):
+            yield "create", kind, record_key(item["record"]), item["record"]
+        for record in changes.get("modified", ()):
+            yield "update", kind, record_key(record), record
+        for key in changes.get("removed", ()):
+            yield "delete", kind, key, None
+
+
+class EventLog:
+    """An event log directory (see module docstring)."""
+
+    def __init__(self, path: str, segment_events: int = SEGMENT_EVENTS, snapshot_interval: int = SNAPSHOT_INTERVAL):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_events = segment_events
+        self.snapshot_interval = snapshot_interval
+
+    @staticmethod
+    def _seq(path: Path) -> int:
+        return int(path.name.split("-")[1].split(".")[0])
+
+    def segments(self) -> List[Path]:
+        return sorted(self.path.glob("events-*.jsonl"), key=self._seq)
+
+    def snapshots(self) -> List[Path]:
+        return sorted(self.path.glob("snapshot-*.json.gz"), key=self._seq)
+
+    def last_seq(self) -> int:
+        """Return the sequence number of the last complete event, 0 for an empty log."""
+        segments = self.segments()
+        if not segments:
+            return 0
+        with open(segments[-1], "rb") as f:
+            lines = sum(1 for line in f if line.endswith(b"\n"))
+        return self._seq(segments[-1]) + lines - 1
+
+    @staticmethod
+    def _incomplete_tail(segment: Path) -> int:
+        """Return the length of the incomplete last line (no newline) of a segment, 0 if none."""
+        with open(segment, "rb") as f:
+            end = pos = f.seek(0, os.SEEK_END)
+            while pos > 0:
+                step = min(pos, 1 << 16)
+                f.seek(pos - step)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    return end - (pos - step + newline + 1)
+                pos -= step
+            return end
+
+    def read(self, after: int = 0) -> Iterator[dict]:
+        """Yield events with a sequence number greater than after, in order."""
+        segments = self.segments()
+        for i, segment in enumerate(segments):
+            # Skip whole segments that end before the requested position.
+            if i + 1 < len(segments) and self._seq(segments[i + 1]) <= after + 1:
+                continue
+            seq = self._seq(segment)
+            with open(segment, encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        logger.warning(f"{segment}: ignoring incomplete event {seq} (interrupted append)")
+                        break
+                    if seq > after:
+                        yield json.loads(line)
+                    seq += 1
+
+    def append(self, events: Iterable[Tuple[str, str, str, Optional[dict]]], timestamp: str,
+               state: Optional[State] = None) -> int:
+        """Append (op, kind, id, record) events with a common timestamp.
+
+        If the current state is passed, it is updated and snapshots are
+        written every snapshot_interval events. Returns the number of events
+        appended.
+        """
+        segments = self.segments()
+        if segments:
+            tail = self._incomplete_tail(segments[-1])
+            if tail:
+                logger.warning(f"{segments[-1]}: removing incomplete last event ({tail} bytes)")
+                os.truncate(segments[-1], segments[-1].stat().st_size - tail)
+        seq = self.last_seq()
+        in_segment = seq - self._seq(segments[-1]) + 1 if segments else self.segment_events
+        f = None
+        count = 0
+        try:
+            for op, kind, key, record in events:
+                seq += 1
+                if in_segment >= self.segment_events:
+                    if f:
+                        self._close(f)
+                    f = open(self.path / f"events-{seq:012d}.jsonl", "a", encoding="utf-8")
+                    in_segment = 0
+                elif f is None:
+                    f = open(segments[-1], "a", encoding="utf-8")
+                event = {"seq": seq, "ts": timestamp, "op": op, "kind": kind, "id": key}
+                if record is not None:
+                    event["data"] = record
+                f.write(json.dumps(event, separators=(',', ':'), ensure_ascii=False) + "\n")
+                in_segment += 1
+                count += 1
+                if state is not None:
+                    apply_event(state, event)
+                    if seq % self.snapshot_interval == 0:
+                        self._close(f)
+                        f = open(f.name, "a", encoding="utf-8")
+                        self.write_snapshot(state, seq, timestamp)
+        finally:
+            if f:
+                self._close(f)
+        return count
+
+    @staticmethod
+    def _close(f):
+        f.flush()
+        os.fsync(f.fileno())
+        f.close()
+
+    def write_snapshot(self, state: State, seq: int, timestamp: str):
+        path = self.path / f"snapshot-{seq:012d}.json.gz"
+        tmp = path.with_suffix(".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"seq": seq, "ts": timestamp}) + "\n")
+            json.dump(state, f, separators=(',', ':'), ensure_ascii=False)
+        tmp.replace(path)
+
+    def load_snapshot(self, until: Optional[str] = None) -> Tuple[State, int]:
+        """Return the latest snapshot (taken at or before until) and its sequence number."""
+        for path in reversed(self.snapshots()):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                if until is None or header["ts"] <= until:
+                    return json.load(f), header["seq"]
+        return empty_state(), 0
+
+    def replay(self, until: Optional[str] = None, use_snapshots: bool = True) -> Tuple[State, int]:
+        """Rebuild the state from the log, optionally only up to a timestamp.
+
+        Returns the state and the sequence number of the last applied event.
+        """
+        state, seq = self.load_snapshot(until) if use_snapshots else (empty_state(), 0)
+        for event in self.read(after=seq):
+            if until is not None and event["ts"] > until:
+                break
+            apply_event(state, event)
+            seq = event["seq"]
+        return state, seq
+
+    def record(self, collections: Dict[str, Iterable[dict]], timestamp: str) -> int:
+        """Append the events turning the logged state into the given collections."""
+        state, _ = self.replay()
+        return self.append(list(diff_events(state, collections)), timestamp, state)
+
+
+def state_collections(state: State) -> Dict[str, List[dict]]:
+    """Return a state in the collection format of an export (see efa_delta.load_export)."""
+    return {name: list(state[kind].values()) for name, kind in KINDS.items()}
+
+
+def cmd_append(args) -> int:
+    export = load_export(args.export)
+    if export is None:
+        logger.error(f"No export found in {args.export}")
+        return 1
+    timestamp = args.timestamp or datetime.now().isoformat(timespec="seconds")
+    count = EventLog(args.log).record(export, timestamp)
+    logger.info(f"Appended {count} events at {timestamp}")
+    return 0
+
+
+def cmd_replay(args) -> int:
+    start = time.perf_counter()
+    state, seq = EventLog(args.log).replay(until=args.until, use_snapshots=not args.no_snapshots)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Replayed to event {seq} in {elapsed:.2f}s")
+    for kind, records in state.items():
+        logger.info(f"  {kind}: {len(records)}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Append-only event log of EFA state changes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    append = subparsers.add_parser("append", help="Append the changes of an export (efa_importer.py output) to the log")
+    append.add_argument("log", help="Event log directory")
+    append.add_argument("--export", required=True, help="Export directory (with boats.json.gz etc.)")
+    append.add_argument("--timestamp", help="Event timestamp, ISO 8601 (default: now)")
+    append.set_defaults(func=cmd_append)
+
+    replay = subparsers.add_parser("replay", help="Rebuild the state from the log and print its size")
+    replay.add_argument("log", help="Event log directory")
+    replay.add_argument("--until", help="Only apply events up to this ISO 8601 timestamp")
+    replay.add_argument("--no-snapshots", action="store_true", help="Replay from event zero")
+    replay.set_defaults(func=cmd_replay)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
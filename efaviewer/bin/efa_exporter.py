@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+EFA Backup Exporter
+
+Converts imported data (an efa_importer.py export directory) back to an EFA
+backup zip: data/<club>/boats.efa2boats, persons.efa2persons,
+destinations.efa2destinations and one <logbook>.efa2logbook per logbook.
+
+Records are written one at a time with a SAX XMLGenerator straight into the
+zip members, so no ElementTree of a whole file is ever built. Importing the
+resulting backup gives the same JSON as the data it was exported from.
+
+Former (name-only) boats, persons and destinations are not written to the
+reference files; logbook entries refer to them by name, as in EFA.
+"""
+
+import argparse
+import logging
+import sys
+import zipfile
+from contextlib import contextmanager
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import XMLGenerator
+
+from efa_delta import load_export
+from efa_parser import format_person_name
+
+logger = logging.getLogger(__name__)
+
+GENDERS = {"m": "MALE", "f": "FEMALE"}
+
+
+class RecordWriter:
+    """Writes <record> elements of one EFA data file to a binary stream."""
+
+    def __init__(self, stream, root: str):
+        self.xml = XMLGenerator(stream, encoding="UTF-8", short_empty_elements=True)
+        self.root = root
+        self.count = 0
+
+    def __enter__(self) -> "RecordWriter":
+        self.xml.startDocument()
+        self.xml.startElement(self.root, {})
+        self.xml.startElement("data", {})
+        self.xml.ignorableWhitespace("\n")
+        return self
+
+    def __exit__(self, *exc):
+        self.xml.endElement("data")
+        self.xml.endElement(self.root)
+        self.xml.ignorableWhitespace("\n")
+        self.xml.endDocument()
+
+    def write(self, fields: Iterable[tuple]):
+        """Write one record from (tag, value) pairs; None values are left out."""
+        xml = self.xml
+        xml.ignorableWhitespace("  ")
+        xml.startElement("record", {})
+        for tag, value in fields:
+            if value is None:
+                continue
+            xml.startElement(tag, {})
+            xml.characters(str(value))
+            xml.endElement(tag)
+        xml.endElement("record")
+        xml.ignorableWhitespace("\n")
+        self.count += 1
+
+
+class EfaExporter:
+    def __init__(self, boats: List[dict], persons: List[dict], destinations: List[dict]):
+        self.boats = {boat["id"]: boat for boat in boats}
+        self.persons = {person["id"]: person for person in persons}
+        self.destinations = {dest["id"]: dest for dest in destinations}
+
+    @staticmethod
+    def is_former(entity: dict) -> bool:
+        return bool(entity.get("fmr")) or entity["id"].startswith("former-")
+
+    def boat_records(self) -> Iterator[List[tuple]]:
+        """Yield one record per boat, with its variants joined as in EFA."""
+        variants: Dict[str, List[dict]] = {}
+        for boat in self.boats.values():
+            if not self.is_former(boat):
+                variants.setdefault(boat["oid"], []).append(boat)
+        for oid, boats in variants.items():
+            boats.sort(key=lambda b: int(b["id"].rpartition("-v")[2]))
+            first = boats[0]
+            yield [
+                ("Id", oid),
+                ("Name", first["name"] or ""),
+                ("NameAffix", first.get("suffix")),
+                ("TypeSeats", ";".join(str(b["size"]) for b in boats)),
+                ("TypeRigging", ";".join(b["rig"].upper() for b in boats)),
+                ("TypeCoxing", ";".join(b["cox"].upper() for b in boats)),
+                ("LastVariant", len(boats)),
+            ]
+
+    def person_records(self) -> Iterator[List[tuple]]:
+        for person in self.persons.values():
+            if self.is_former(person):
+                continue
+            yield [
+                ("Id", person["id"]),
+                ("FirstName", person.get("fn")),
+                ("LastName", person.get("ln")),
+                ("Gender", GENDERS.get(person["sex"], "OTHER")),
+                ("Deleted", "true" if person.get("del") else None),
+                ("Invisible", "true" if person.get("hid") else None),
+            ]
+
+    def destination_records(self) -> Iterator[List[tuple]]:
+        for dest in self.destinations.values():
+            if self.is_former(dest):
+                continue
+            dist = dest.get("dist")
+            yield [("Id", dest["id"]), ("Name", dest["name"] or ""), ("Distance", None if dist is None else f"{dist} km")]
+
+    def person_ref(self, role: str, person_id: str) -> tuple:
+        person = self.persons.get(person_id)
+        if person is None or not self.is_former(person):
+            return (f"{role}Id", person_id)
+        return (f"{role}Name", format_person_name(person.get("fn"), person.get("ln")))
+
+    def logbook_record(self, entry: dict) -> List[tuple]:
+        entry_id = entry.get("id")
+        fields = [
+            ("EntryId", entry_id.rpartition(":")[2] if entry_id else None),
+            ("Date", entry["date"]),
+            ("StartTime", f"{entry['t0']}:00" if "t0" in entry else None),
+            ("EndTime", f"{entry['t1']}:00" if "t1" in entry else None),
+        ]
+
+        boat = self.boats.get(entry.get("boat"))
+        if boat is not None and self.is_former(boat):
+            fields.append(("BoatName", boat["name"]))
+        elif "boat" in entry:
+            oid, _, variant = entry["boat"].rpartition("-v")
+            fields += [("BoatId", oid), ("BoatVariant", variant)]
+
+        # The cox, if any, comes first in the crew.
+        crew = entry.get("crew", [])
+        cox = None
+        if entry.get("cox") and crew:
+            cox, crew = crew[0], crew[1:]
+        fields += [self.person_ref(f"Crew{i}", person_id) for i, person_id in enumerate(crew, 1)]
+        if cox is not None:
+            fields.append(self.person_ref("Cox", cox))
+
+        dest = self.destinations.get(entry.get("dest"))
+        if dest is not None and self.is_former(dest):
+            fields.append(("DestinationName", dest["name"]))
+        elif "dest" in entry:
+            fields.append(("DestinationId", entry["dest"]))
+
+        fields += [
+            ("Distance", f"{entry['dist']} km" if "dist" in entry else None),
+            ("SessionType", entry["type"].upper() if "type" in entry else None),
+            # An empty <Comments/> is imported as note null
+            ("Comments", (entry["note"] or "") if "note" in entry else None),
+            ("Open", "true" if entry.get("open") else None),
+        ]
+        return fields
+
+
+def logbook_names(entries: Iterable[dict]) -> Iterator[Tuple[str, dict]]:
+    """Yield (logbook name, entry); entries without an ID stay in the current logbook."""
+    name = None
+    for entry in entries:
+        entry_id = entry.get("id")
+        if entry_id:
+            name = entry_id.rpartition(":")[0]
+        elif name is None:
+            name = str(entry["year"])
+        yield name, entry
+
+
+@contextmanager
+def zip_writer(archive: zipfile.ZipFile, name: str, root: str) -> Iterator[RecordWriter]:
+    with archive.open(name, "w", force_zip64=True) as stream:
+        with RecordWriter(stream, root) as writer:
+            yield writer
+
+
+def export_backup(export: Dict[str, List[dict]], zip_path: str, club: str):
+    """Write an EFA backup zip from the collections of an export."""
+    exporter = EfaExporter(export["boats"], export["persons"], export["destinations"])
+    prefix = f"data/{club}/"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, root, records in (
+            ("boats.efa2boats", "efa2boats", exporter.boat_records()),
+            ("persons.efa2persons", "efa2persons", exporter.person_records()),
+            ("destinations.efa2destinations", "efa2destinations", exporter.destination_records()),
+        ):
+            with zip_writer(archive, prefix + filename, root) as writer:
+                for fields in records:
+                    writer.write(fields)
+            logger.info(f"Wrote {writer.count} records to {filename}")
+
+        # Entries are exported grouped by logbook, in import order.
+        written = set()
+        for name, group in groupby(logbook_names(export["logbooks"]), key=itemgetter(0)):
+            if name in written:
+                raise ValueError(f"Entries of logbook {name} are not contiguous")
+            written.add(name)
+            with zip_writer(archive, f"{prefix}{name}.efa2logbook", "efa2logbook") as writer:
+                for _, entry in group:
+                    writer.write(exporter.logbook_record(entry))
+            logger.info(f"Wrote {writer.count} records to {name}.efa2logbook")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert imported EFA data back to an EFA backup zip")
+    parser.add_argument("--input", "-i", required=True, help="Export directory written by efa_importer.py")
+    parser.add_argument("--output", "-o", required=True, help="Backup zip to write (e.g. efaBackup_20240101_000000.zip)")
+    parser.add_argument("--club", default="BelvoirRC", help="Club directory name inside the zip (default: BelvoirRC)")
+    parser.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(levelname)s: %(message)s")
+
+    export = load_export(args.input)
+    if export is None:
+        logger.error(f"No export found in {args.input}")
+        return 1
+    export_backup(export, args.output, args.club)
+    logger.info(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
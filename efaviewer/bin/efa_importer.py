@@ -7,21 +7,71 @@ for web viewing.
 """
 
 import argparse
-import glob
+import cProfile
 import gzip
+import hashlib
 import json
 import logging
+import os
 import re
-import xml.etree.ElementTree as ET
-from collections import defaultdict
+import time
+from bisect import bisect_right
+from collections import Counter, defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional
-
-from efa_parser import parse_boats, parse_persons, parse_destinations, parse_distance
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from efa_crewpairs import build_crew_pairs
+from efa_delta import MAX_DELTA_CHAIN, former_ids, load_export, publish_delta
+from efa_events import EventLog, diff_events, state_collections
+from efa_intervals import build_occupancy, day_intervals, find_overlaps, overlap_samples
+from efa_metrics import Metrics, Stopwatch
+from efa_npy import export_npy
+from efa_publish import KEEP_VERSIONS, hashed_name, new_version_dir, prune, publish
+from efa_parser import (
+    XML_BACKENDS, PersonNameIndex, expand_globs, format_person_name, iter_records, parse_boats, parse_persons,
+    parse_destinations, parse_distance, set_cache_dir, set_xml_backend,
+)
+from efa_search import build_search_index
+from efa_store import LogbookStore, NONE
 
 logger = logging.getLogger(__name__)
 
+# Errors listed per consistency-report category unless running verbosely
+REPORT_SAMPLES = 5
+# Logbook entries serialized per chunk when writing logbooks.json
+EXPORT_CHUNK_ENTRIES = 1000
+
+
+def _positions(column: Iterable[int], handles: set) -> Iterator[int]:
+    """Yield positions in column whose value is in handles"""
+    for i, h in enumerate(column):
+        if h in handles:
+            yield i
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(path.name + ".tmp")
+
+
+def _json_chunks(data: Any) -> Iterator[str]:
+    """Yield the compact JSON encoding of data in pieces.
+
+    A LogbookStore is encoded EXPORT_CHUNK_ENTRIES entries at a time rather
+    than materialized as one big list.
+    """
+    if isinstance(data, LogbookStore):
+        yield "["
+        for start in range(0, len(data), EXPORT_CHUNK_ENTRIES):
+            end = min(start + EXPORT_CHUNK_ENTRIES, len(data))
+            chunk = ",".join(json.dumps(data.entry(i), separators=(',', ':')) for i in range(start, end))
+            yield "," + chunk if start else chunk
+        yield "]"
+    else:
+        yield json.dumps(data, separators=(',', ':'))
+
+
 class EfaImporter:
     def __init__(self, max_distance: int):
         self.stats = {
@@ -33,18 +83,35 @@ class EfaImporter:
         self.boats = {}
         self.persons = {}
         self.destinations = {}
-        self.logbooks = []
+        self.logbooks = LogbookStore()
         self.former_counter = 0
         # Track former entities by name to avoid duplicates
         self.former_boats_by_name = {}  # name -> id
         self.former_persons_by_name = {}  # name -> id
         self.former_destinations_by_name = {}  # name -> id
+        # Former IDs of the previous export, reused to keep delta feeds small
+        self.previous_former_ids = {}  # (entity type, name) -> id
+        # Optional matching of name-only crew entries to known persons
+        self.person_matcher = None
+        self.matched_person_names = {}  # name -> person id or None
+        self.name_decisions = []  # (name, person id or None, reason)
+        self.metrics = Metrics()
+        self._day_intervals = None
 
     def generate_former_id(self) -> str:
         """Generate pseudo-ID for former entities"""
         self.former_counter += 1
         return f"former-{self.former_counter:06d}"
 
+    def seed_former_ids(self, former_ids: Dict[tuple, str]):
+        """Reuse the former IDs of a previous export for the same names.
+
+        New former entities are numbered after the highest reused ID.
+        """
+        self.previous_former_ids = former_ids
+        for former_id in former_ids.values():
+            self.former_counter = max(self.former_counter, int(former_id.rpartition("-")[2]))
+
     def parse_date(self, date_str: str) -> Dict[str, Any]:
         """Parse DD.MM.YYYY date and extract year"""
         try:
@@ -73,6 +140,24 @@ class EfaImporter:
         logger.info("Processing destinations...")
         self.destinations = parse_destinations(xml_file)
 
+    def enable_name_matching(self):
+        """Link name-only crew/cox references to known persons when unambiguous.
+
+        Must be called after process_persons() so that only persons from
+        persons.efa2persons can be matched.
+        """
+        self.person_matcher = PersonNameIndex(self.persons)
+
+    def match_person_name(self, name: str) -> Optional[str]:
+        """Return the ID of the person a free-text name unambiguously refers to"""
+        if name in self.matched_person_names:
+            return self.matched_person_names[name]
+        person_id, reason = self.person_matcher.match(name)
+        self.matched_person_names[name] = person_id
+        if reason != "unknown":
+            self.name_decisions.append((name, person_id, reason))
+        return person_id
+
     def resolve_or_create_entity(self, entity_id: str, entity_type: str, name: str = None) -> str:
         """Resolve entity ID or create former entity if referenced by name"""
         entity_dict = getattr(self, f"{entity_type}s")
@@ -87,8 +172,13 @@ class EfaImporter:
         if entity_id in former_lookup:
             return former_lookup[entity_id]
 
+        if entity_type == "person" and self.person_matcher and not self.uuid_regexp.match(entity_id):
+            person_id = self.match_person_name(entity_id)
+            if person_id:
+                return person_id
+
         # Create new former entity
-        former_id = self.generate_former_id()
+        former_id = self.previous_former_ids.get((entity_type, entity_id)) or self.generate_former_id()
         former_lookup[entity_id] = former_id
 
         if entity_type == "person":
@@ -132,14 +222,17 @@ class EfaImporter:
 
         for xml_file in sorted(xml_files):
             logger.info(f"Processing {xml_file}...")
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-
+            file_start, file_entries = time.perf_counter(), len(self.logbooks)
+            logbook_name = Path(xml_file).name.split(".")[0]
             years = defaultdict(int)
-            for record in root.findall(".//record"):
+            for record in iter_records(xml_file):
                 entry = {}
 
-                date_info = self.parse_date(record.find("Date").text)
+                entry_id = record.get("EntryId")
+                if entry_id:
+                    entry["id"] = f"{logbook_name}:{entry_id.strip()}"
+
+                date_info = self.parse_date(record["Date"])
                 entry["year"] = date_info["year"]
                 entry["date"] = date_info["date"]
                 years[entry["year"]] += 1
@@ -152,24 +245,20 @@ class EfaImporter:
                     entry["date"] = f"{entry['date'][:6]}{most_common_year}"
                     self.stats["future_years"] += 1
                     logger.debug(f"Found entry with future year ({entry['date']}), adjusting to {most_common_year}")
-                    logger.debug(f"Full XML record: {ET.tostring(record, encoding='utf-8').decode('utf-8')}")
+                    logger.debug(f"Full XML record: {record}")
 
-                start_time = record.find("StartTime")
-                if start_time is not None:
-                    entry["t0"] = ':'.join(start_time.text.split(":", 2)[:2])
+                if "StartTime" in record:
+                    entry["t0"] = ':'.join(record["StartTime"].split(":", 2)[:2])
 
-                end_time = record.find("EndTime")
-                if end_time is not None:
-                    entry["t1"] = ':'.join(end_time.text.split(":", 2)[:2])
+                if "EndTime" in record:
+                    entry["t1"] = ':'.join(record["EndTime"].split(":", 2)[:2])
 
                 # Boat - can be referenced by ID or name
-                boat_id_elem = record.find("BoatId")
-                boat_name_elem = record.find("BoatName")
+                boat_id = record.get("BoatId")
+                boat_name = record.get("BoatName")
 
-                if boat_id_elem is not None and boat_id_elem.text:
-                    boat_id = boat_id_elem.text
-                    boat_variant_elem = record.find("BoatVariant")
-                    boat_variant = int(boat_variant_elem.text) if boat_variant_elem is not None else 1
+                if boat_id:
+                    boat_variant = int(record["BoatVariant"]) if "BoatVariant" in record else 1
                     # Construct the full variant ID and check if it exists
                     full_boat_id = f"{boat_id}-v{boat_variant}"
                     if full_boat_id in self.boats:
@@ -184,145 +273,274 @@ class EfaImporter:
                                 break
                             boat_variant -= 1
                         if boat_variant == 0:
-                            if boat_name_elem is not None:
-                                entry["boat"] = self.resolve_or_create_entity(boat_name_elem.text, "boat")
+                            if "BoatName" in record:
+                                entry["boat"] = self.resolve_or_create_entity(boat_name, "boat")
                             else:
                                 logger.warning(f"Found no variant or name of boat {boat_id} in boats.efa2boats")
-                                logger.debug(f"Full XML record: {ET.tostring(record, encoding='utf-8').decode('utf-8')}")
-                elif boat_name_elem is not None and boat_name_elem.text:
-                    entry["boat"] = self.resolve_or_create_entity(boat_name_elem.text, "boat")
+                                logger.debug(f"Full XML record: {record}")
+                elif boat_name:
+                    entry["boat"] = self.resolve_or_create_entity(boat_name, "boat")
 
                 # Crew - can be referenced by ID or name
                 crew = []
                 for i in range(1, 20):
-                    crew_id_elem = record.find(f"Crew{i}Id")
-                    crew_name_elem = record.find(f"Crew{i}Name")
-
-                    if crew_id_elem is not None and crew_id_elem.text:
-                        person_id = self.resolve_or_create_entity(crew_id_elem.text, "person")
-                        crew.append(person_id)
-                    elif crew_name_elem is not None and crew_name_elem.text:
-                        person_id = self.resolve_or_create_entity(crew_name_elem.text, "person")
-                        crew.append(person_id)
+                    crew_ref = record.get(f"Crew{i}Id") or record.get(f"Crew{i}Name")
+                    if crew_ref:
+                        crew.append(self.resolve_or_create_entity(crew_ref, "person"))
 
                 # Cox - can also be referenced by ID or name
-                cox_id_elem = record.find("CoxId")
-                cox_name_elem = record.find("CoxName")
-
-                if cox_id_elem is not None and cox_id_elem.text:
-                    cox_id = self.resolve_or_create_entity(cox_id_elem.text, "person")
-                    crew.insert(0, cox_id)  # Cox goes first
-                elif cox_name_elem is not None and cox_name_elem.text:
-                    cox_id = self.resolve_or_create_entity(cox_name_elem.text, "person")
-                    crew.insert(0, cox_id)  # Cox goes first
+                cox_ref = record.get("CoxId") or record.get("CoxName")
+                if cox_ref:
+                    crew.insert(0, self.resolve_or_create_entity(cox_ref, "person"))  # Cox goes first
+                    entry["cox"] = True
 
                 entry["crew"] = crew
 
                 # Destination
-                dest_id_elem = record.find("DestinationId")
-                dest_name_elem = record.find("DestinationName")
-
-                if dest_id_elem is not None and dest_id_elem.text:
-                    entry["dest"] = self.resolve_or_create_entity(dest_id_elem.text, "destination")
-                elif dest_name_elem is not None and dest_name_elem.text:
-                    entry["dest"] = self.resolve_or_create_entity(dest_name_elem.text, "destination")
+                dest_ref = record.get("DestinationId") or record.get("DestinationName")
+                if dest_ref:
+                    entry["dest"] = self.resolve_or_create_entity(dest_ref, "destination")
 
                 # Distance
-                distance_elem = record.find("Distance")
-                if distance_elem is not None:
-                    distance = parse_distance(distance_elem.text)
+                if "Distance" in record:
+                    distance = parse_distance(record["Distance"])
                     if distance > self.max_distance:
                         self.stats["excessive_distances"] += 1
                         logger.warning(f"Found entry with distance {distance}km, skipping")
-                        logger.debug(f"Full XML record: {ET.tostring(record, encoding='utf-8').decode('utf-8')}")
+                        logger.debug(f"Full XML record: {record}")
                         continue
                     entry["dist"] = distance
 
-                if record.find("Open") is not None and record.find("Open").text == "true":
+                if record.get("Open") == "true":
                     entry["open"] = True
 
                 # Session type
-                session_type = record.find("SessionType")
-                if session_type is not None:
-                    entry["type"] = session_type.text.lower()
+                if "SessionType" in record:
+                    entry["type"] = record["SessionType"].lower()
 
                 # Comments
-                comments = record.find("Comments")
-                if comments is not None:
-                    entry["note"] = comments.text
+                if "Comments" in record:
+                    entry["note"] = record["Comments"]
 
                 self.logbooks.append(entry)
 
-    def check_consistency(self) -> List[str]:
-        """Check consistency of the imported data and return list of errors"""
+            self.metrics.add_logbook(xml_file, len(self.logbooks) - file_entries, time.perf_counter() - file_start)
+
+    def day_intervals(self) -> Dict[int, list]:
+        """Return the per-day interval index of timed logbook entries (see efa_intervals)"""
+        if self._day_intervals is None:
+            self._day_intervals = day_intervals(self.logbooks)
+        return self._day_intervals
+
+    def check_consistency(self, verbose: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Check consistency of the imported data and return an error report.
+
+        The report maps each error category to {"count": n, "samples": [...]},
+        plus {"ids": {id: n}} for references to unknown entities.
+        References are checked by diffing the set of IDs used in logbook
+        entries against the entity keys, so only erroneous entries are looked
+        at individually. Unless verbose is set, only the first REPORT_SAMPLES
+        errors of each category are formatted.
+        """
         logger.info("Checking consistency...")
-        errors = []
+        report = {}
+        limit = None if verbose else REPORT_SAMPLES
+        logbooks = self.logbooks
+        strings = logbooks.strings
+
+        def add(category: str, count: int, samples: Iterable[str], id_counts: Optional[Dict[str, int]] = None):
+            if count:
+                report[category] = {"count": count, "samples": list(islice(samples, limit))}
+                if id_counts:
+                    # Most frequently referenced unknown IDs first
+                    top = sorted(id_counts.items(), key=lambda item: -item[1])
+                    report[category]["ids"] = dict(islice(top, limit))
+
+        add("missing_boat", logbooks.boat.count(NONE),
+            (f"Logbook entry {i}: no boat ID ({logbooks.entry(i)})"
+             for i in _positions(logbooks.boat, {NONE})))
 
         # Check that all IDs in logbooks can be found in respective entity dicts
-        for i, entry in enumerate(self.logbooks):
-            if "boat" not in entry:
-                errors.append(f"Logbook entry {i}: no boat ID ({entry})")
-            elif entry["boat"] not in self.boats:
-                errors.append(f"Logbook entry {i}: boat ID '{entry['boat']}' not found in boats")
-
-            if "crew" not in entry:
-                errors.append(f"Logbook entry {i}: no crew IDs")
-            else:
-                for j, person_id in enumerate(entry["crew"]):
-                    if person_id not in self.persons:
-                        errors.append(f"Logbook entry {i}: crew[{j}] ID '{person_id}' not found in persons")
-
-            # Check destination ID
-            if "dest" in entry and entry["dest"] not in self.destinations:
-                errors.append(f"Logbook entry {i}: destination ID '{entry['dest']}' not found in destinations")
+        for category, column, entities, kind in (
+                ("unknown_boat", logbooks.boat, self.boats, "boat"),
+                ("unknown_destination", logbooks.dest, self.destinations, "destination")):
+            unknown = {h for h in set(column) if h != NONE and strings[h] not in entities}
+            if unknown:
+                counts = Counter(column)
+                add(category, sum(counts[h] for h in unknown),
+                    (f"Logbook entry {i}: {kind} ID '{strings[column[i]]}' not found in {kind}s"
+                     for i in _positions(column, unknown)),
+                    {strings[h]: counts[h] for h in unknown})
+
+        members, offsets = logbooks.crew_members, logbooks.crew_offsets
+        unknown = {h for h in set(members) if strings[h] not in self.persons}
+        if unknown:
+            def crew_samples():
+                for k in _positions(members, unknown):
+                    i = bisect_right(offsets, k) - 1
+                    yield f"Logbook entry {i}: crew[{k - offsets[i]}] ID '{strings[members[k]]}' not found in persons"
+            counts = Counter(members)
+            add("unknown_person", sum(counts[h] for h in unknown), crew_samples(),
+                {strings[h]: counts[h] for h in unknown})
 
         # Check that different variants of the same boat have the same name
         # and that the original ID is the same for all variants
+        oid_mismatches, name_mismatches = [], []
         boats_by_oid = {}
         for boat_id, boat in self.boats.items():
             if boat["fmr"]:
                 continue
-            oid1, oid2 = boat["oid"], boat_id[:-3]
-            if oid1 != oid2:
-                errors.append(f"Boat {boat_id} has oid {oid1} but original ID {oid2} (name {boat['name']})")
-            if oid1 not in boats_by_oid:
-                boats_by_oid[oid1] = boat["name"]
-            elif boats_by_oid[oid1] != boat["name"]:
-                errors.append(f"Boat {boat_id} has name '{boat['name']}' but a different variant with oid {oid1} has name '{boats_by_oid[oid1]}'")
+            oid = boat["oid"]
+            if oid != boat_id[:-3]:
+                oid_mismatches.append(boat)
+            if oid not in boats_by_oid:
+                boats_by_oid[oid] = boat["name"]
+            elif boats_by_oid[oid] != boat["name"]:
+                name_mismatches.append(boat)
+        add("boat_oid_mismatch", len(oid_mismatches),
+            (f"Boat {boat['id']} has oid {boat['oid']} but original ID {boat['id'][:-3]} (name {boat['name']})"
+             for boat in oid_mismatches))
+        add("boat_name_mismatch", len(name_mismatches),
+            (f"Boat {boat['id']} has name '{boat['name']}' but a different variant with oid {boat['oid']} "
+             f"has name '{boats_by_oid[boat['oid']]}'" for boat in name_mismatches))
+
+        # Check that no boat or person is on two outings at once
+        boat_oids = {boat_id: boat["oid"] for boat_id, boat in self.boats.items()}
+        boat_overlaps, person_overlaps = find_overlaps(logbooks, self.day_intervals(), boat_oids)
+        add("boat_overlap", len(boat_overlaps), overlap_samples(logbooks, "boat", boat_overlaps))
+        add("person_overlap", len(person_overlaps), overlap_samples(logbooks, "person", person_overlaps))
 
         # Check that every person has at least first or last name
-        for person_id, person in self.persons.items():
-            has_first = "fn" in person and person["fn"] is not None and person["fn"].strip()
-            has_last = "ln" in person and person["ln"] is not None and person["ln"].strip()
-            if not has_first and not has_last:
-                errors.append(f"Person '{person_id}' has neither first name nor last name")
-
-        return errors
+        unnamed = [person_id for person_id, person in self.persons.items()
+                   if not (person.get("fn") or "").strip() and not (person.get("ln") or "").strip()]
+        add("person_without_name", len(unnamed),
+            (f"Person '{person_id}' has neither first name nor last name" for person_id in unnamed))
+
+        return report
+
+    def write_report(self, report_file: str, report: Dict[str, Dict[str, Any]]):
+        """Write the consistency report as JSON"""
+        logger.info(f"Writing consistency report to {report_file}...")
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump({
+                "total": sum(category["count"] for category in report.values()),
+                "entries": len(self.logbooks),
+                "categories": report,
+                "name_matches": [{"name": name, "person": person_id, "reason": reason}
+                                 for name, person_id, reason in self.name_decisions],
+            }, f, indent=2, ensure_ascii=False)
+
+    def collections(self) -> Dict[str, Iterable[dict]]:
+        """Return the exported collections, as written to <name>.json"""
+        return {
+            "boats": list(self.boats.values()),
+            "persons": list(self.persons.values()),
+            "destinations": list(self.destinations.values()),
+            "logbooks": self.logbooks,
+        }
 
-    def export_json(self, output_dir: str):
-        """Export all data to JSON files"""
-        logger.info(f"Exporting to {output_dir}/...")
+    def load_collections(self, collections: Dict[str, Iterable[dict]]):
+        """Replace the imported data with exported collections (e.g. a merged state), for export_json"""
+        self.boats = {boat["id"]: boat for boat in collections["boats"]}
+        self.persons = {person["id"]: person for person in collections["persons"]}
+        self.destinations = {destination["id"]: destination for destination in collections["destinations"]}
+        self.logbooks = LogbookStore()
+        for entry in collections["logbooks"]:
+            self.logbooks.append(entry)
+        self._day_intervals = None
+
+    def export_json(self, output_dir: str, plain: bool = False, version_dir: Optional[Path] = None) -> Dict[str, str]:
+        """Export all data to gzipped JSON files, and optionally uncompressed ones too.
+
+        With version_dir, files are written there under content-hashed names
+        (see efa_publish). Returns the written files, relative to output_dir,
+        by export name (e.g. "boats.json"; the .gz file has the same path plus
+        ".gz").
+        """
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
+        target = version_dir or output_path
+        logger.info(f"Exporting to {target}/...")
 
-        # Convert to lists for JSON export
-        exports = {
-            "boats.json": list(self.boats.values()),
-            "persons.json": list(self.persons.values()),
-            "destinations.json": list(self.destinations.values()),
-            "logbooks.json": self.logbooks
-        }
+        with self.metrics.phase("build_search_index"):
+            search_index = build_search_index(self.logbooks, self.boats, self.persons, self.destinations)
+
+        with self.metrics.phase("build_occupancy"):
+            occupancy = build_occupancy(self.logbooks, self.day_intervals())
+
+        with self.metrics.phase("build_crew_pairs"):
+            crew_pairs = build_crew_pairs(self.logbooks)
+
+        exports = {f"{name}.json": data for name, data in self.collections().items()}
+        exports["search.json"] = search_index
+        exports["occupancy.json"] = occupancy
+        exports["crewpairs.json"] = crew_pairs
 
+        # Serialization and compression are interleaved chunk by chunk, so
+        # time them with accumulating stopwatches.
+        serialize, compress, write_plain = Stopwatch(), Stopwatch(), Stopwatch()
+        files = {}
         for filename, data in exports.items():
-            gz_filename = filename + ".gz"
-            with gzip.open(output_path / gz_filename, 'wt', encoding='utf-8') as f:
-                f.write(json.dumps(data, separators=(',', ':')))
+            # Files are written under a temporary name and renamed when
+            # complete, so that readers never see a partial file.
+            tmp_paths = [_tmp_path(target / (filename + ".gz"))]
+            plain_file = None
+            if plain:
+                tmp_paths.append(_tmp_path(target / filename))
+                plain_file = open(tmp_paths[-1], 'w', encoding='utf-8')
+            digest = hashlib.sha256()
+            with gzip.open(tmp_paths[0], 'wt', encoding='utf-8') as f:
+                chunks = _json_chunks(data)
+                while True:
+                    serialize.start()
+                    chunk = next(chunks, None)
+                    if chunk is not None and version_dir:
+                        digest.update(chunk.encode('utf-8'))
+                    serialize.stop()
+                    if chunk is None:
+                        break
+                    compress.start()
+                    f.write(chunk)
+                    compress.stop()
+                    if plain_file:
+                        write_plain.start()
+                        plain_file.write(chunk)
+                        write_plain.stop()
+            if plain_file:
+                plain_file.close()
+            path = target / (hashed_name(filename, digest.hexdigest()) if version_dir else filename)
+            files[filename] = path.relative_to(output_path).as_posix()
+            for tmp_path, final_path in zip(tmp_paths, (path.with_name(path.name + ".gz"), path)):
+                os.replace(tmp_path, final_path)
+                self.metrics.add_output(str(final_path), final_path.stat().st_size)
+
+        self.metrics.add_phase("serialize", serialize.wall, serialize.cpu)
+        self.metrics.add_phase("compress", compress.wall, compress.cpu)
+        if plain:
+            self.metrics.add_phase("write_plain", write_plain.wall, write_plain.cpu)
+        return files
+
+    def log_name_decisions(self):
+        """Log how name-only person references were resolved by the matcher"""
+        if not self.name_decisions:
+            return
+        logger.info("Name matching decisions:")
+        for name, person_id, reason in sorted(self.name_decisions, key=lambda d: d[0]):
+            if person_id:
+                person = self.persons[person_id]
+                logger.info(f"  '{name}' -> {format_person_name(person.get('fn'), person.get('ln'))} ({person_id}) [{reason}]")
+            else:
+                logger.info(f"  '{name}' -> former person [{reason}]")
 
-    def print_stats(self, errors: List[str]):
-        if errors:
+    def print_stats(self, report: Dict[str, Dict[str, Any]]):
+        if report:
             logger.info(f"Consistency errors:")
-            for error in errors:
-                logger.info(f"  {error}")
+            for category, info in report.items():
+                logger.info(f"  {category}: {info['count']}")
+                for sample in info["samples"]:
+                    logger.info(f"    {sample}")
+                if info["count"] > len(info["samples"]):
+                    logger.info(f"    ... ({info['count'] - len(info['samples'])} more, use -v to list all)")
 
         logger.info("")
         logger.info(f"Export completed")
@@ -333,23 +551,129 @@ class EfaImporter:
         logger.info(f"  Exported logbook entries: {len(self.logbooks)}")
         logger.info(f"  Logbook entries corrected (bad year): {self.stats['future_years']}")
         logger.info(f"  Logbook entries skipped (excessive distance): {self.stats['excessive_distances']}")
-        logger.info(f"  Consistency errors: {len(errors)}")
-
-        errs = self.stats['excessive_distances'] + len(errors)
+        if self.person_matcher:
+            matched = sum(1 for _, person_id, _ in self.name_decisions if person_id)
+            logger.info(f"  Name-only persons matched to known persons: {matched}")
+            logger.info(f"  Name-only persons left as former (ambiguous): {len(self.name_decisions) - matched}")
+        n_errors = sum(info["count"] for info in report.values())
+        logger.info(f"  Consistency errors: {n_errors}")
+
+        errs = self.stats['excessive_distances'] + n_errors
         logger.info(f"Percentage errors: {errs / (errs + len(self.logbooks)) * 100:.2f}%")
 
 
-def main():
+def run(args) -> int:
+    metrics_external = []
+    for phase_time in args.phase_time:
+        name, _, seconds = phase_time.partition("=")
+        metrics_external.append((name, float(seconds)))
+
+    logbook_files = expand_globs(args.logbooks)
+    if not logbook_files:
+        logger.error("No logbook files found")
+        return 1
+
+    importer = EfaImporter(args.max_distance)
+    metrics = importer.metrics
+    for name, seconds in metrics_external:
+        metrics.add_phase(name, seconds)
+
+    previous = None
+    if args.deltas:
+        with metrics.phase("load_previous_export"):
+            previous = load_export(args.output)
+    event_log = event_state = None
+    if args.events:
+        event_log = EventLog(args.events)
+        with metrics.phase("replay_events"):
+            event_state, _ = event_log.replay()
+    if previous:
+        importer.seed_former_ids(former_ids(previous))
+    elif event_state:
+        importer.seed_former_ids(former_ids(state_collections(event_state)))
+
+    with metrics.phase("parse_boats"):
+        importer.process_boats(args.boats)
+    with metrics.phase("parse_persons"):
+        importer.process_persons(args.persons)
+    if args.match_names:
+        importer.enable_name_matching()
+    with metrics.phase("parse_destinations"):
+        importer.process_destinations(args.destinations)
+    with metrics.phase("process_logbooks"):
+        importer.process_logbooks(logbook_files)
+    with metrics.phase("check_consistency"):
+        report = importer.check_consistency(verbose=args.verbose >= 1)
+    if args.report:
+        importer.write_report(args.report, report)
+    version = version_dir = None
+    if args.versioned:
+        version, version_dir = new_version_dir(args.output)
+    files = importer.export_json(args.output, plain=args.plain, version_dir=version_dir)
+    if args.npy:
+        with metrics.phase("export_npy"):
+            export_npy(importer.logbooks, list(importer.boats), list(importer.persons),
+                       list(importer.destinations), args.npy)
+    manifest = None
+    if args.deltas:
+        with metrics.phase("deltas"):
+            manifest = publish_delta(args.output, previous, importer.collections(), args.max_delta_chain)
+    if args.versioned:
+        publish(args.output, version, files, manifest)
+        prune(args.output, args.keep_versions)
+    if event_log:
+        timestamp = args.timestamp or datetime.now().isoformat(timespec="seconds")
+        with metrics.phase("append_events"):
+            count = event_log.append(diff_events(event_state, importer.collections()), timestamp, event_state)
+        logger.info(f"Appended {count} events to {args.events}")
+    importer.log_name_decisions()
+    importer.print_stats(report)
+    metrics.log_summary()
+    if args.metrics:
+        metrics.write(args.metrics)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Convert EFA backup files to JSON")
     parser.add_argument("--boats", required=True, help="Boats file (boats.efa2boats)")
     parser.add_argument("--persons", required=True, help="Persons file (persons.efa2persons)")
     parser.add_argument("--destinations", required=True, help="Destinations file (destinations.efa2destinations)")
     parser.add_argument("--logbooks", required=True, nargs="+", help="Logbook files (supports globs like *.efa2logbook)")
     parser.add_argument("--output", "-o", default="output", help="Output directory (default: output)")
+    parser.add_argument("--plain", action="store_true", help="Also write uncompressed JSON files")
     parser.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity")
+    parser.add_argument("--report", help="Write consistency report as JSON to this file")
+    parser.add_argument("--metrics", help="Write phase timings and resource usage as JSON to this file")
+    parser.add_argument("--profile", help="Write cProfile stats for the whole run to this file")
+    parser.add_argument("--phase-time", action="append", default=[], metavar="NAME=SECONDS",
+                        help="Include an externally timed phase (e.g. unzip) in the metrics")
     parser.add_argument("--max-distance", type=int, default=100, help="Maximum distance to import (default: 100)")
+    parser.add_argument("--match-names", action="store_true",
+                        help="Link name-only crew/cox entries to known persons when the match is unambiguous")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the parsed reference-data cache")
+    parser.add_argument("--xml-backend", choices=sorted(XML_BACKENDS),
+                        help="XML parser (default: lxml if installed, else etree; expat streams in constant memory)")
+    parser.add_argument("--npy", metavar="DIR",
+                        help="Also write the logbook as memory-mappable NumPy columns (.npy) to this directory")
+    parser.add_argument("--deltas", action="store_true",
+                        help="Diff against the previous export in the output directory and publish a delta feed "
+                             "(manifest.json, deltas/)")
+    parser.add_argument("--max-delta-chain", type=int, default=MAX_DELTA_CHAIN,
+                        help=f"Maximum number of deltas kept in the feed (default: {MAX_DELTA_CHAIN})")
+    parser.add_argument("--versioned", action="store_true",
+                        help="Write each export to a new versions/<version>/ directory with content-hashed "
+                             "file names and switch current.json to it when complete")
+    parser.add_argument("--keep-versions", type=int, default=KEEP_VERSIONS,
+                        help=f"Number of versions kept with --versioned (default: {KEEP_VERSIONS})")
+    parser.add_argument("--events", help="Append create/update/delete events for the changes since the last "
+                                         "import to this event log directory")
+    parser.add_argument("--timestamp", help="Timestamp of the backup for --events, ISO 8601 (default: now)")
+    return parser
 
-    args = parser.parse_args()
+
+def main():
+    args = build_parser().parse_args()
 
     # Set up logging
     log_level = logging.INFO
@@ -357,33 +681,18 @@ def main():
         log_level = logging.DEBUG
     logging.basicConfig(level=log_level, format="%(levelname)s: %(message)s")
 
-    # Expand globs for logbooks
-    logbook_files = []
-    for pattern in args.logbooks:
-        matches = glob.glob(pattern)
-        if matches:
-            logbook_files.extend(matches)
-        else:
-            # If no glob matches, try as literal filename
-            if Path(pattern).exists():
-                logbook_files.append(pattern)
-            else:
-                logger.warning(f"No files found matching pattern: {pattern}")
-
-    if not logbook_files:
-        logger.error("No logbook files found")
-        return 1
-
-    importer = EfaImporter(args.max_distance)
-
-    importer.process_boats(args.boats)
-    importer.process_persons(args.persons)
-    importer.process_destinations(args.destinations)
-    importer.process_logbooks(logbook_files)
-    errors = importer.check_consistency()
-    importer.export_json(args.output)
-    importer.print_stats(errors)
-    return 0
+    if args.no_cache:
+        set_cache_dir(None)
+    if args.xml_backend:
+        set_xml_backend(args.xml_backend)
+
+    if args.profile:
+        profiler = cProfile.Profile()
+        status = profiler.runcall(run, args)
+        profiler.dump_stats(args.profile)
+        logger.info(f"Profile written to {args.profile} (inspect with: python3 -m pstats {args.profile})")
+        return status
+    return run(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+"""
+Per-day interval index over logbook entry times.
+
+Entries with a start and end time (t0 < t1) on the same date are grouped by
+date and swept in start order, which gives, in O(n log n) per day instead of
+comparing all pairs:
+
+- overlaps: the same boat or the same person on two outings at once
+  (reported by EfaImporter.check_consistency), and
+- boathouse occupancy: boats on the water per SLOT_MINUTES slot and peak
+  concurrency per day and per weekday, exported as occupancy.json.
+
+Outings that merely touch (one ends when the next starts) do not overlap.
+Entries without times, or ending before they start, are left out.
+
+occupancy.json is column-oriented:
+
+    {"version": 1, "slot": 15,
+     "days": {"date": ["15.06.2024", ...], "weekday": [5, ...], "peak": [3, ...],
+              "first": [32, ...],            # first slot with a boat out
+              "slots": [[1, 2, 3, 3, 1], ...]},  # boats out from slot "first" on
+     "weekdays": {"days": [...7], "peak": [...7],
+                  "slots": [[...96], ...7]}}     # boats out per slot, summed over days
+
+Weekdays count from Monday = 0.
+"""
+
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from efa_store import LogbookStore, NONE
+
+OCCUPANCY_VERSION = 1
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# (start minute, end minute, entry index)
+Interval = Tuple[int, int, int]
+
+
+def parse_minutes(time: str) -> Optional[int]:
+    """Return the minute of the day of an "HH:MM" time, or None if invalid."""
+    hours, _, minutes = time.partition(":")
+    if not (hours.isdigit() and minutes.isdigit()):
+        return None
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_weekday(day: str) -> Optional[int]:
+    """Return the weekday (Monday = 0) of a "DD.MM.YYYY" date, or None if invalid."""
+    try:
+        d, m, y = (int(part) for part in day.split("."))
+        return date(y, m, d).weekday()
+    except ValueError:
+        return None
+
+
+def day_intervals(logbooks: LogbookStore) -> Dict[int, List[Interval]]:
+    """Return the timed entries of each date handle as intervals sorted by start."""
+    strings = logbooks.strings
+    minutes: Dict[int, Optional[int]] = {}
+
+    def to_minutes(handle: int) -> Optional[int]:
+        if handle == NONE:
+            return None
+        if handle not in minutes:
+            minutes[handle] = parse_minutes(strings[handle])
+        return minutes[handle]
+
+    days: Dict[int, List[Interval]] = defaultdict(list)
+    for i, (day, t0, t1) in enumerate(zip(logbooks.date, logbooks.t0, logbooks.t1)):
+        start, end = to_minutes(t0), to_minutes(t1)
+        if start is not None and end is not None and start < end:
+            days[day].append((start, end, i))
+    for intervals in days.values():
+        intervals.sort()
+    return days
+
+
+def find_overlaps(logbooks: LogbookStore, days: Dict[int, List[Interval]],
+                  boat_oids: Optional[Dict[str, str]] = None) -> Tuple[List[tuple], List[tuple]]:
+    """Return (boat overlaps, person overlaps) as (handle, entry i, entry j) triples.
+
+    For each boat and person the sweep keeps the outing that ends last
+    among those started so far; an outing starting before that end overlaps
+    it. Each overlapping outing is reported once per boat or person, paired
+    with the outing it collides with.
+
+    boat_oids maps boat variant IDs to the boat's original ID, so that two
+    variants of one boat (e.g. rigged as a double and as a pair) out at once
+    count as an overlap. Boats not in it are compared by their logbook value.
+    """
+    boat_overlaps, person_overlaps = [], []
+    boats, members, offsets = logbooks.boat, logbooks.crew_members, logbooks.crew_offsets
+    strings = logbooks.strings
+    boat_oids = boat_oids or {}
+    oid_keys: Dict[int, str] = {}
+
+    def boat_key(handle: int) -> str:
+        if handle not in oid_keys:
+            oid_keys[handle] = boat_oids.get(strings[handle], strings[handle])
+        return oid_keys[handle]
+    for intervals in days.values():
+        if len(intervals) < 2:
+            continue
+        # boat oid or person handle -> (end, entry index) of the latest-ending outing
+        boat_out: Dict[str, Tuple[int, int]] = {}
+        person_out: Dict[int, Tuple[int, int]] = {}
+        for start, end, i in intervals:
+            resources = [(boats[i], boat_key(boats[i]), boat_out, boat_overlaps)] if boats[i] != NONE else []
+            # A person listed twice in one entry is not an overlap of two outings.
+            resources += [(h, h, person_out, person_overlaps) for h in set(members[offsets[i]:offsets[i + 1]])]
+            for handle, key, out, overlaps in resources:
+                previous = out.get(key)
+                if previous is not None and start < previous[0]:
+                    overlaps.append((handle, previous[1], i))
+                if previous is None or end > previous[0]:
+                    out[key] = (end, i)
+    return boat_overlaps, person_overlaps
+
+
+def day_occupancy(intervals: List[Interval], boats) -> Tuple[int, List[int]]:
+    """Return (peak, counts per slot) of the outings with a boat on one day.
+
+    A boat counts in every slot it is out for at least part of.
+    """
+    diff = [0] * (SLOTS_PER_DAY + 1)
+    points = []
+    for start, end, i in intervals:
+        if boats[i] == NONE:
+            continue
+        diff[start // SLOT_MINUTES] += 1
+        diff[min((end - 1) // SLOT_MINUTES + 1, SLOTS_PER_DAY)] -= 1
+        points.append((start, 1))
+        points.append((end, -1))
+    counts, current = [], 0
+    for delta in diff[:SLOTS_PER_DAY]:
+        current += delta
+        counts.append(current)
+    # Ends sort before starts at the same minute, so touching outings do not add up.
+    peak = current = 0
+    for _, delta in sorted(points):
+        current += delta
+        peak = max(peak, current)
+    return peak, counts
+
+
+def build_occupancy(logbooks: LogbookStore, days: Dict[int, List[Interval]]) -> dict:
+    """Build the occupancy tables (see module docstring)."""
+    strings = logbooks.strings
+    table = {"date": [], "weekday": [], "peak": [], "first": [], "slots": []}
+    weekday_days = [0] * 7
+    weekday_peak = [0] * 7
+    weekday_slots = [[0] * SLOTS_PER_DAY for _ in range(7)]
+    for day in sorted(days, key=lambda h: _date_key(strings[h])):
+        peak, counts = day_occupancy(days[day], logbooks.boat)
+        if not peak:
+            continue
+        weekday = parse_weekday(strings[day])
+        first = next(k for k, count in enumerate(counts) if count)
+        last = max(k for k, count in enumerate(counts) if count)
+        table["date"].append(strings[day])
+        table["weekday"].append(weekday)
+        table["peak"].append(peak)
+        table["first"].append(first)
+        table["slots"].append(counts[first:last + 1])
+        if weekday is not None:
+            weekday_days[weekday] += 1
+            weekday_peak[weekday] = max(weekday_peak[weekday], peak)
+            slots = weekday_slots[weekday]
+            for k in range(first, last + 1):
+                slots[k] += counts[k]
+    return {
+        "version": OCCUPANCY_VERSION,
+        "slot": SLOT_MINUTES,
+        "days": table,
+        "weekdays": {"days": weekday_days, "peak": weekday_peak, "slots": weekday_slots},
+    }
+
+
+def _date_key(day: str) -> tuple:
+    return tuple(reversed(day.split(".")))
+
+
+def overlap_samples(logbooks: LogbookStore, kind: str, overlaps: List[tuple]) -> Iterator[str]:
+    """Format overlaps for the consistency report."""
+    strings = logbooks.strings
+    for handle, i, j in overlaps:
+        yield (f"Logbook entries {i} and {j}: {kind} '{strings[handle]}' out twice on {strings[logbooks.date[i]]} "
+               f"({strings[logbooks.t0[i]]}-{strings[logbooks.t1[i]]}, {strings[logbooks.t0[j]]}-{strings[logbooks.t1[j]]})")
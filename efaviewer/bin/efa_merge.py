@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Merge an EFA backup into existing exported state and report conflicts.
+
+The state is either an export directory (boats.json.gz etc., as written by
+efa_importer.py) or an SQLite database. Records are matched by their EFA ID
+("id"; logbook entries: "<logbook>:<EntryId>"). For every record the state
+remembers a hash of the version last taken from a backup, so a merge is a
+three-way comparison per record:
+
+    backup unchanged since last merge           -> keep state (local edits win)
+    backup changed, state unchanged             -> take backup version
+    backup changed, state changed too           -> conflict "both_modified"
+    removed from backup, state unchanged        -> delete
+    removed from backup, state changed          -> conflict "removed_in_backup"
+    changed in backup, deleted from state       -> conflict "deleted_locally"
+
+Outings taken from the backup whose boat, crew or destination is missing in
+the merged state are reported as "dangling_reference". Conflicts are kept at
+the state version unless --prefer backup is given.
+
+Only the base hashes are loaded in full; records are read and written only
+where the backup differs from the previous merge. With an SQLite state the
+work after parsing the backup is thus proportional to the size of the
+change. An export directory has to be read and rewritten as a whole: after a
+change, all export files (including the plain *.json files if present and
+the derived search.json, occupancy.json and crewpairs.json) are rebuilt by
+EfaImporter.export_json, with the records in the order of the backup, and a
+delta is published if the directory has a delta feed (manifest.json).
+
+Examples:
+  efa_merge.py --state app/data --boats ... --persons ... --destinations ... --logbooks '*.efa2logbook'
+  efa_merge.py --state elbar.sqlite --conflicts conflicts.json ...
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from efa_delta import COLLECTIONS, MANIFEST, former_ids, publish_delta, record_key
+from efa_importer import EfaImporter
+from efa_metrics import Metrics
+from efa_parser import expand_globs, set_cache_dir
+from efa_publish import POINTER
+
+logger = logging.getLogger(__name__)
+
+BASE_FILE = "merge-base.json"
+
+
+def record_hash(record: dict) -> str:
+    return hashlib.sha1(json.dumps(record, sort_keys=True, separators=(',', ':')).encode("utf-8")).hexdigest()
+
+
+class JsonState:
+    """State kept as an export directory plus the base hashes in merge-base.json."""
+
+    def __init__(self, path: str, metrics: Optional[Metrics] = None):
+        self.path = Path(path)
+        self.metrics = metrics
+        if (self.path / POINTER).exists():
+            # Rewriting files in place would modify published, immutable versions.
+            raise ValueError(f"{path} is a versioned export (efa_importer.py --versioned); use an SQLite state")
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.records: Dict[str, Dict[str, dict]] = {}
+        for name in COLLECTIONS:
+            file = self.path / f"{name}.json.gz"
+            records = []
+            if file.exists():
+                with gzip.open(file, "rt", encoding="utf-8") as f:
+                    records = json.load(f)
+            self.records[name] = {record_key(record): record for record in records}
+        base_file = self.path / BASE_FILE
+        self.base: Dict[str, Dict[str, str]] = {name: {} for name in COLLECTIONS}
+        if base_file.exists():
+            with open(base_file, encoding="utf-8") as f:
+                self.base.update(json.load(f))
+        self.changed = set()
+        self.order: Dict[str, List[str]] = {}
+        # The export before the merge, to diff against for the delta feed
+        self.previous = None
+        if (self.path / MANIFEST).exists():
+            self.previous = {name: list(records.values()) for name, records in self.records.items()}
+
+    def base_hashes(self, name: str) -> Dict[str, str]:
+        return self.base[name]
+
+    def get(self, name: str, keys: Iterable[str]) -> Dict[str, dict]:
+        records = self.records[name]
+        return {key: records[key] for key in keys if key in records}
+
+    def put(self, name: str, records: Dict[str, dict]):
+        self.records[name].update(records)
+        self.changed.add(name)
+
+    def delete(self, name: str, keys: Iterable[str]):
+        for key in keys:
+            self.records[name].pop(key, None)
+        self.changed.add(name)
+
+    def set_base(self, name: str, hashes: Dict[str, Optional[str]]):
+        base = self.base[name]
+        for key, value in hashes.items():
+            if value is None:
+                base.pop(key, None)
+            else:
+                base[key] = value
+
+    def set_order(self, name: str, keys: List[str]):
+        self.order[name] = keys
+
+    def exists(self, name: str, key: str) -> bool:
+        return key in self.records[name]
+
+    def former_records(self, name: str) -> List[dict]:
+        return [record for key, record in self.records[name].items() if key.startswith("former-")]
+
+    def ordered(self, name: str) -> List[dict]:
+        """Return the records of a collection in backup order, followed by those only in the state."""
+        records = self.records[name]
+        keys = [key for key in self.order.get(name, ()) if key in records]
+        in_backup = set(keys)
+        keys += [key for key in records if key not in in_backup]
+        return [records[key] for key in keys]
+
+    def commit(self):
+        if self.changed:
+            collections = {name: self.ordered(name) for name in COLLECTIONS}
+            importer = EfaImporter(max_distance=0)  # Nothing is parsed, only exported
+            if self.metrics:
+                importer.metrics = self.metrics
+            importer.load_collections(collections)
+            importer.export_json(self.path, plain=(self.path / "logbooks.json").exists())
+            if self.previous is not None:
+                publish_delta(self.path, self.previous, collections)
+                self.previous = collections
+        tmp = self.path / (BASE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.base, f, separators=(',', ':'))
+        tmp.replace(self.path / BASE_FILE)
+        self.changed.clear()
+
+    def close(self):
+        pass
+
+
+class SqliteState:
+    """State kept in an SQLite database, one row per record."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS records (
+            collection TEXT NOT NULL,
+            id TEXT NOT NULL,
+            data TEXT,
+            base_hash TEXT,
+            PRIMARY KEY (collection, id)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.execute(self.SCHEMA)
+
+    def base_hashes(self, name: str) -> Dict[str, str]:
+        return dict(self.db.execute(
+            "SELECT id, base_hash FROM records WHERE collection = ? AND base_hash IS NOT NULL", (name,)))
+
+    def get(self, name: str, keys: Iterable[str]) -> Dict[str, dict]:
+        result = {}
+        for key in keys:
+            row = self.db.execute("SELECT data FROM records WHERE collection = ? AND id = ? AND data IS NOT NULL",
+                                  (name, key)).fetchone()
+            if row:
+                result[key] = json.loads(row[0])
+        return result
+
+    def put(self, name: str, records: Dict[str, dict]):
+        self.db.executemany(
+            "INSERT INTO records (collection, id, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (collection, id) DO UPDATE SET data = excluded.data",
+            ((name, key, json.dumps(record, separators=(',', ':'))) for key, record in records.items()))
+
+    def delete(self, name: str, keys: Iterable[str]):
+        # Rows are kept while they still carry a base hash.
+        self.db.executemany("UPDATE records SET data = NULL WHERE collection = ? AND id = ?",
+                            ((name, key) for key in keys))
+
+    def set_base(self, name: str, hashes: Dict[str, Optional[str]]):
+        self.db.executemany(
+            "INSERT INTO records (collection, id, base_hash) VALUES (?, ?, ?) "
+            "ON CONFLICT (collection, id) DO UPDATE SET base_hash = excluded.base_hash",
+            ((name, key, value) for key, value in hashes.items() if value is not None))
+        self.db.executemany(
+            "DELETE FROM records WHERE collection = ? AND id = ? AND data IS NULL",
+            ((name, key) for key, value in hashes.items() if value is None))
+        self.db.executemany(
+            "UPDATE records SET base_hash = NULL WHERE collection = ? AND id = ?",
+            ((name, key) for key, value in hashes.items() if value is None))
+
+    def set_order(self, name: str, keys: List[str]):
+        pass  # Rows are keyed, not ordered
+
+    def exists(self, name: str, key: str) -> bool:
+        return self.db.execute("SELECT 1 FROM records WHERE collection = ? AND id = ? AND data IS NOT NULL",
+                               (name, key)).fetchone() is not None
+
+    def former_records(self, name: str) -> List[dict]:
+        # Range scan on the primary key ("." sorts right after "-").
+        return [json.loads(data) for data, in self.db.execute(
+            "SELECT data FROM records WHERE collection = ? AND id >= 'former-' AND id < 'former.' "
+            "AND data IS NOT NULL", (name,))]
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def open_state(path: str, metrics: Optional[Metrics] = None):
+    """Open an SQLite state for *.sqlite/*.db paths, an export directory otherwise."""
+    if Path(path).suffix in (".sqlite", ".sqlite3", ".db"):
+        return SqliteState(path)
+    return JsonState(path, metrics)
+
+
+def merge_collection(state, name: str, records: Iterable[dict], prefer: str, conflicts: List[dict]) -> Dict[str, int]:
+    """Merge one collection of a freshly imported backup into state."""
+    base = state.base_hashes(name)
+    incoming: Dict[str, dict] = {}
+    incoming_hashes: Dict[str, str] = {}
+    seen: Dict[str, None] = {}  # Ordered set
+    for record in records:
+        key = record_key(record)
+        seen[key] = None
+        digest = record_hash(record)
+        if base.get(key) != digest:
+            incoming[key] = record
+            incoming_hashes[key] = digest
+    removed = [key for key in base if key not in seen]
+
+    # Only records that changed in the backup are looked at in the state.
+    current = state.get(name, list(incoming) + removed)
+    put, delete, new_base = {}, [], dict(incoming_hashes)
+    stats = {"added": 0, "updated": 0, "removed": 0, "conflicts": 0}
+
+    def conflict(kind: str, key: str, local: Optional[dict], backup: Optional[dict]):
+        stats["conflicts"] += 1
+        conflicts.append({"type": kind, "collection": name, "id": key, "local": local, "backup": backup,
+                          "resolution": "backup" if prefer == "backup" else "local"})
+
+    for key, record in incoming.items():
+        local = current.get(key)
+        if local == record:
+            continue
+        if key not in base:
+            if local is not None:
+                conflict("both_modified", key, local, record)
+                if prefer != "backup":
+                    continue
+            put[key] = record
+            stats["added" if local is None else "updated"] += 1
+        elif local is None:
+            conflict("deleted_locally", key, None, record)
+            if prefer == "backup":
+                put[key] = record
+        elif record_hash(local) == base[key]:
+            put[key] = record
+            stats["updated"] += 1
+        else:
+            conflict("both_modified", key, local, record)
+            if prefer == "backup":
+                put[key] = record
+
+    for key in removed:
+        local = current.get(key)
+        new_base[key] = None
+        if local is None:
+            continue
+        if record_hash(local) != base[key]:
+            conflict("removed_in_backup", key, local, None)
+            if prefer != "backup":
+                continue
+        delete.append(key)
+        stats["removed"] += 1
+
+    if put:
+        state.put(name, put)
+    if delete:
+        state.delete(name, delete)
+    state.set_base(name, new_base)
+    state.set_order(name, list(seen))
+    if name == "logbooks":
+        check_references(state, put, conflicts)
+    return stats
+
+
+def check_references(state, entries: Dict[str, dict], conflicts: List[dict]):
+    """Report merged outings that refer to boats, persons or destinations missing from the state."""
+    for key, entry in entries.items():
+        missing = [("boats", entry["boat"])] if "boat" in entry else []
+        missing += [("persons", person_id) for person_id in entry.get("crew", ())]
+        if "dest" in entry:
+            missing.append(("destinations", entry["dest"]))
+        missing = [f"{name}:{ref}" for name, ref in missing if not state.exists(name, ref)]
+        if missing:
+            conflicts.append({"type": "dangling_reference", "collection": "logbooks", "id": key,
+                              "missing": missing, "resolution": "local"})
+
+
+def merge(state, collections: Dict[str, Iterable[dict]], prefer: str = "local"):
+    """Merge imported collections into state; returns (stats per collection, conflicts)."""
+    conflicts: List[dict] = []
+    stats = {}
+    for name in COLLECTIONS:
+        stats[name] = merge_collection(state, name, collections[name], prefer, conflicts)
+    state.commit()
+    return stats, conflicts
+
+
+def run(args) -> int:
+    logbook_files = expand_globs(args.logbooks)
+    if not logbook_files:
+        logger.error("No logbook files found")
+        return 1
+
+    metrics = Metrics()
+    state = open_state(args.state, metrics)
+    try:
+        importer = EfaImporter(args.max_distance)
+        importer.metrics = metrics
+        with metrics.phase("load_state"):
+            # Keep former entity IDs stable across merges.
+            importer.seed_former_ids(former_ids(
+                {name: state.former_records(name) for name in ("boats", "persons", "destinations")}))
+        with metrics.phase("parse_boats"):
+            importer.process_boats(args.boats)
+        with metrics.phase("parse_persons"):
+            importer.process_persons(args.persons)
+        if args.match_names:
+            importer.enable_name_matching()
+        with metrics.phase("parse_destinations"):
+            importer.process_destinations(args.destinations)
+        with metrics.phase("process_logbooks"):
+            importer.process_logbooks(logbook_files)
+        with metrics.phase("merge"):
+            stats, conflicts = merge(state, importer.collections(), args.prefer)
+    finally:
+        state.close()
+
+    logger.info(f"Merged into {args.state}:")
+    for name, counts in stats.items():
+        logger.info(f"  {name}: " + ", ".join(f"{count} {what}" for what, count in counts.items()))
+    for conflict in conflicts[:args.max_listed]:
+        logger.info(f"  conflict {conflict['type']}: {conflict['collection']} {conflict['id']}")
+    if len(conflicts) > args.max_listed:
+        logger.info(f"  ... ({len(conflicts) - args.max_listed} more conflicts)")
+    if args.conflicts:
+        with open(args.conflicts, "w", encoding="utf-8") as f:
+            json.dump({"stats": stats, "conflicts": conflicts}, f, indent=2, ensure_ascii=False)
+    metrics.log_summary()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge an EFA backup into existing state and report conflicts")
+    parser.add_argument("--state", required=True,
+                        help="State to merge into: export directory, or SQLite database (*.sqlite, *.db)")
+    parser.add_argument("--boats", required=True, help="Boats file (boats.efa2boats)")
+    parser.add_argument("--persons", required=True, help="Persons file (persons.efa2persons)")
+    parser.add_argument("--destinations", required=True, help="Destinations file (destinations.efa2destinations)")
+    parser.add_argument("--logbooks", required=True, nargs="+", help="Logbook files (supports globs like *.efa2logbook)")
+    parser.add_argument("--conflicts", help="Write merge statistics and the conflict list as JSON to this file")
+    parser.add_argument("--prefer", choices=("local", "backup"), default="local",
+                        help="Which version to keep on conflict (default: local)")
+    parser.add_argument("--max-listed", type=int, default=20, help="Conflicts to list in the log (default: 20)")
+    parser.add_argument("--max-distance", type=int, default=100, help="Maximum distance to import (default: 100)")
+    parser.add_argument("--match-names", action="store_true",
+                        help="Link name-only crew/cox entries to known persons when the match is unambiguous")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the parsed reference-data cache")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if args.no_cache:
+        set_cache_dir(None)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Phase timing and resource metrics for the EFA import pipeline.
+
+Records wall-clock and CPU time per phase, peak resident set size,
+per-logbook throughput and output sizes, for printing next to the import
+stats and for writing as JSON (efa_importer.py --metrics).
+"""
+
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Return peak resident set size of this process in KiB, if known."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB on Linux
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+class Stopwatch:
+    """Accumulates wall and CPU time over several start/stop intervals."""
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._start = None
+
+    def start(self):
+        self._start = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        wall0, cpu0 = self._start
+        self.wall += time.perf_counter() - wall0
+        self.cpu += time.process_time() - cpu0
+        self._start = None
+
+
+class Metrics:
+    def __init__(self):
+        self.phases: List[Dict] = []
+        self.logbooks: List[Dict] = []
+        self.outputs: Dict[str, int] = {}
+
+    def add_phase(self, name: str, wall: float, cpu: Optional[float] = None):
+        """Record a phase timed elsewhere (e.g. by a Stopwatch or a shell script)."""
+        self.phases.append({"name": name, "wall": wall, "cpu": cpu, "peak_rss_kb": peak_rss_kb()})
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as a named phase."""
+        watch = Stopwatch()
+        watch.start()
+        try:
+            yield
+        finally:
+            watch.stop()
+            self.add_phase(name, watch.wall, watch.cpu)
+
+    def add_logbook(self, path: str, records: int, wall: float):
+        self.logbooks.append({
+            "file": path,
+            "records": records,
+            "wall": wall,
+            "records_per_sec": records / wall if wall > 0 else None,
+        })
+
+    def add_output(self, path: str, size: int):
+        self.outputs[path] = size
+
+    def to_dict(self) -> Dict:
+        return {
+            "phases": self.phases,
+            "logbooks": self.logbooks,
+            "outputs": self.outputs,
+            "total_wall": sum(p["wall"] for p in self.phases),
+            "peak_rss_kb": peak_rss_kb(),
+        }
+
+    def write(self, metrics_file: str):
+        with open(metrics_file, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def log_summary(self):
+        logger.info("Timing:")
+        for p in self.phases:
+            cpu = f", cpu {p['cpu']:.2f}s" if p["cpu"] is not None else ""
+            rss = f", peak rss {p['peak_rss_kb'] / 1024:.0f} MiB" if p["peak_rss_kb"] else ""
+            logger.info(f"  {p['name']}: {p['wall']:.2f}s{cpu}{rss}")
+        for lb in self.logbooks:
+            rate = f"{lb['records_per_sec']:.0f} records/s" if lb["records_per_sec"] else "n/a"
+            logger.info(f"  {lb['file']}: {lb['records']} records in {lb['wall']:.2f}s ({rate})")
+        if self.outputs:
+            logger.info(f"  Output: {sum(self.outputs.values()) / 1024:.0f} KiB in {len(self.outputs)} files")
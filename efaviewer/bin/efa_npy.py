@@ -0,0 +1,153 @@
+"""
+NumPy export of the logbook for analytics.
+
+efa_importer.py --npy DIR writes the logbook as fixed-width columns in .npy
+format (version 1.0), one file per column, which numpy.load can memory-map.
+Writing needs no NumPy: the typed arrays of LogbookStore are dumped behind a
+hand-written header. Reading (LogbookArrays) needs NumPy.
+
+Columns, one value per logbook entry in export order (-1 if absent):
+
+    day.npy           int32   date as proleptic Gregorian ordinal (date.toordinal())
+    t0.npy, t1.npy    int16   start/end as minute of the day
+    boat.npy          int32   index into meta.json "boats"
+    dest.npy          int32   index into meta.json "destinations"
+    dist.npy          int32   distance in km
+    crew_offsets.npy  uint32  crew of entry i is crew_members[offsets[i]:offsets[i + 1]]
+    crew_members.npy  int32   index into meta.json "persons" (cox first, if any)
+
+meta.json holds the format version, the number of entries and the IDs
+behind the indexes, in the order of boats.json, persons.json and
+destinations.json.
+"""
+
+import json
+import os
+import sys
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import Dict, List
+
+from efa_store import LogbookStore, NONE
+
+try:
+    import numpy
+except ImportError:  # Only needed for reading
+    numpy = None
+
+NPY_VERSION = 1
+META = "meta.json"
+
+# array typecode -> little-endian NumPy dtype
+DTYPES = {"h": "<i2", "i": "<i4", "I": "<u4"}
+
+
+def npy_header(descr: str, length: int) -> bytes:
+    """Return a .npy version 1.0 header for a 1-d array."""
+    header = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({length},), }}"
+    # Magic (6) + version (2) + header length (2) + header, padded with
+    # spaces and a newline to a multiple of 64 bytes.
+    padding = -(10 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode("latin1")
+    return b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header
+
+
+def write_npy(path: Path, values: array):
+    """Write a typed array as a .npy file (renamed into place when complete)."""
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(npy_header(DTYPES[values.typecode], len(values)))
+        f.write(values.tobytes())
+    os.replace(tmp, path)
+
+
+def _remap(column: array, mapping: Dict[int, int], typecode: str = "i") -> array:
+    return array(typecode, (mapping.get(h, NONE) for h in column))
+
+
+def export_npy(logbooks: LogbookStore, boats: List[str], persons: List[str], destinations: List[str], path: str):
+    """Write the logbook columns and meta.json to directory path.
+
+    boats, persons and destinations are the exported IDs in export order.
+    """
+    output = Path(path)
+    output.mkdir(parents=True, exist_ok=True)
+    strings = logbooks.strings
+
+    def indexes(ids: List[str]) -> Dict[int, int]:
+        return {h: k for k, h in enumerate(strings.lookup(entity_id) for entity_id in ids) if h != NONE}
+
+    def ordinal(day: str) -> int:
+        try:
+            d, m, y = (int(part) for part in day.split("."))
+            return date(y, m, d).toordinal()
+        except ValueError:
+            return NONE
+
+    def minutes(time: str) -> int:
+        hours, _, mins = time.partition(":")
+        return int(hours) * 60 + int(mins) if hours.isdigit() and mins.isdigit() else NONE
+
+    days = {h: ordinal(strings[h]) for h in set(logbooks.date)}
+    times = {h: minutes(strings[h]) for h in set(logbooks.t0) | set(logbooks.t1) if h != NONE}
+    columns = {
+        "day": _remap(logbooks.date, days),
+        "t0": _remap(logbooks.t0, times, "h"),
+        "t1": _remap(logbooks.t1, times, "h"),
+        "boat": _remap(logbooks.boat, indexes(boats)),
+        "dest": _remap(logbooks.dest, indexes(destinations)),
+        "dist": logbooks.dist,
+        "crew_offsets": logbooks.crew_offsets,
+        "crew_members": _remap(logbooks.crew_members, indexes(persons)),
+    }
+    for name, values in columns.items():
+        write_npy(output / f"{name}.npy", values)
+
+    meta = {"version": NPY_VERSION, "entries": len(logbooks),
+            "boats": boats, "persons": persons, "destinations": destinations}
+    tmp = output / (META + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp, output / META)
+
+
+class LogbookArrays:
+    """Columns written by export_npy(), loaded as (by default memory-mapped) NumPy arrays.
+
+    Example:
+        log = LogbookArrays("npy")
+        km_per_boat = numpy.bincount(log.boat[log.boat >= 0], weights=log.dist[log.boat >= 0])
+    """
+
+    COLUMNS = ("day", "t0", "t1", "boat", "dest", "dist", "crew_offsets", "crew_members")
+
+    def __init__(self, path: str, mmap: bool = True):
+        if numpy is None:
+            raise ImportError("LogbookArrays requires numpy")
+        path = Path(path)
+        with open(path / META, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != NPY_VERSION:
+            raise ValueError(f"Unsupported NumPy export version: {self.meta.get('version')}")
+        self.boats: List[str] = self.meta["boats"]
+        self.persons: List[str] = self.meta["persons"]
+        self.destinations: List[str] = self.meta["destinations"]
+        for name in self.COLUMNS:
+            setattr(self, name, numpy.load(path / f"{name}.npy", mmap_mode="r" if mmap else None))
+
+    def __len__(self) -> int:
+        return self.meta["entries"]
+
+    def crew(self, i: int):
+        """Return the person indexes of entry i."""
+        return self.crew_members[self.crew_offsets[i]:self.crew_offsets[i + 1]]
+
+    def dates(self):
+        """Return the day column as numpy datetime64[D] (NaT where absent)."""
+        epoch = date(1970, 1, 1).toordinal()
+        days = numpy.where(self.day >= 0, self.day.astype("int64") - epoch, numpy.iinfo("int64").min)
+        return days.astype("datetime64[D]")
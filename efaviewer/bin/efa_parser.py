@@ -3,15 +3,283 @@ Shared EFA XML parsing utilities.
 
 Common parsing logic for boats, persons, destinations, seats, and distances
 used by both efa_importer.py and efa_viewer.py.
+
+Parsed reference files are cached on disk (see load_cached), so repeated
+runs over the same backup skip the XML parsing.
+
+EFA files are flat lists of <record> elements whose children are simple
+text fields. iter_records() yields them as {tag: text} dicts, so callers
+look fields up in a dict instead of scanning the children with find(). The
+XML backend is pluggable (see set_xml_backend):
+
+- "etree": ElementTree builds the whole tree first; the reference
+  implementation, and the fastest without lxml (C tree builder).
+- "expat": a streaming event parser that keeps only the current record, so
+  memory stays flat however large a logbook is; its Python callbacks make
+  it about a third slower than etree (see bench/bench_parse.py).
+- "lxml": streams with lxml.etree.iterparse at about the speed of etree;
+  used by default when lxml is installed.
 """
 
+import functools
+import glob
+import hashlib
 import logging
+import mmap
+import os
+import pickle
 import re
+import tempfile
+import unicodedata
 import xml.etree.ElementTree as ET
-from typing import Optional
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from xml.parsers import expat
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # Optional, the expat backend is used instead
+    lxml_etree = None
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the output of a cached function changes, to invalidate
+# existing cache files.
+CACHE_VERSION = 2
+# Cache files of earlier versions, keyed by the source's absolute path
+LEGACY_CACHE_FILE_RE = re.compile(r"-[0-9a-f]{20}\.pickle$")
+
+
+def _default_cache_dir() -> Path:
+    if os.environ.get("EFA_CACHE_DIR"):
+        return Path(os.environ["EFA_CACHE_DIR"])
+    xdg = os.environ.get("XDG_CACHE_HOME")
+    return (Path(xdg) if xdg else Path.home() / ".cache") / "efaviewer"
+
+
+_cache_dir: Optional[Path] = _default_cache_dir()
+
+
+def set_cache_dir(cache_dir: Optional[str]):
+    """Set the cache directory (default $EFA_CACHE_DIR or ~/.cache/efaviewer); None disables caching."""
+    global _cache_dir
+    _cache_dir = Path(cache_dir) if cache_dir is not None else None
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_cached(path: str, kind: str, build: Callable[[str], Any]) -> Any:
+    """Return build(path), cached on disk per (kind, file name).
+
+    A cache file stores the source's path, size, mtime and SHA-256 followed
+    by the pickled result. It is used as is when path, size and mtime match;
+    otherwise the content hash decides, so touching a file costs a hash but
+    not a reparse. Any change in content replaces the cache entry.
+
+    Entries are keyed by the file name, not the directory: backups are
+    unpacked to a new temporary directory for every import, and each of
+    their files (boats.efa2boats, 2024.efa2logbook, ...) keeps a single
+    entry that is reused as long as its content does not change. Size and
+    mtime alone are not trusted for a file at another path, as two
+    different files of one name can share them (zip archives store mtimes
+    to 2 seconds).
+    """
+    if _cache_dir is None:
+        return build(path)
+
+    real_path = os.path.realpath(path)
+    st = os.stat(real_path)
+    cache_file = _cache_dir / f"{kind}-{Path(real_path).name}.pickle"
+
+    content_hash = None
+    try:
+        with open(cache_file, "rb") as f:
+            header = pickle.load(f)
+            if header["version"] == CACHE_VERSION:
+                if (header["path"] == real_path and header["size"] == st.st_size
+                        and header["mtime"] == st.st_mtime_ns):
+                    return pickle.load(f)
+                content_hash = _file_hash(real_path)
+                if header["hash"] == content_hash:
+                    data = pickle.load(f)
+                    if header["path"] == real_path:  # Touched: refresh the fast path
+                        _write_cache(cache_file, real_path, content_hash, st, data)
+                    return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:  # Corrupt or incompatible cache file: rebuild it
+        logger.debug(f"Ignoring cache file {cache_file}: {e}")
+
+    data = build(path)
+    _write_cache(cache_file, real_path, content_hash or _file_hash(real_path), st, data)
+    _remove_legacy_cache_files(kind)
+    return data
+
+
+def _remove_legacy_cache_files(kind: str):
+    """Remove the path-keyed cache files of a kind left by earlier versions."""
+    for cache_file in _cache_dir.glob(f"{kind}-*.pickle"):
+        if LEGACY_CACHE_FILE_RE.search(cache_file.name):
+            try:
+                cache_file.unlink()
+            except OSError as e:
+                logger.debug(f"Could not remove cache file {cache_file}: {e}")
+
+
+def _write_cache(cache_file: Path, real_path: str, content_hash: str, st: os.stat_result, data: Any):
+    header = {"version": CACHE_VERSION, "path": real_path, "size": st.st_size, "mtime": st.st_mtime_ns,
+              "hash": content_hash}
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_file.parent, prefix=cache_file.name)
+    except OSError as e:
+        logger.debug(f"Could not write cache file {cache_file}: {e}")
+        return
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_file)
+    except Exception as e:
+        logger.debug(f"Could not write cache file {cache_file}: {e}")
+        os.unlink(tmp)
+
+
+def cached(parse: Callable[[str], Any]) -> Callable[[str], Any]:
+    """Decorator caching a file-parsing function with load_cached()."""
+    @functools.wraps(parse)
+    def wrapper(xml_file):
+        if not isinstance(xml_file, (str, os.PathLike)):
+            return parse(xml_file)
+        return load_cached(xml_file, parse.__name__, parse)
+    return wrapper
+
+
+# Child tag -> text of one <record>; None for empty elements, missing keys
+# for absent ones (like Element.find(tag).text).
+Record = Dict[str, Optional[str]]
+XmlSource = Union[str, os.PathLike, IO[bytes]]
+
+# Bytes fed to the expat parser at a time
+EXPAT_BLOCK_SIZE = 1 << 16
+
+
+def element_record(element) -> Record:
+    """Return the fields of an ElementTree (or lxml) <record> element as a Record."""
+    record = {}
+    for child in element:
+        if isinstance(child.tag, str):  # Skip lxml comments and processing instructions
+            record.setdefault(child.tag, child.text)
+    return record
+
+
+def _etree_records(xml_file: XmlSource) -> Iterator[Record]:
+    for element in ET.parse(xml_file).getroot().findall(".//record"):
+        yield element_record(element)
+
+
+def _expat_records(xml_file: XmlSource) -> Iterator[Record]:
+    records: List[Record] = []
+    record: Optional[Record] = None
+    field: Optional[str] = None
+    text: List[str] = []
+    depth = 0  # element depth below the current <record>
+
+    def start(tag, attrs):
+        nonlocal record, field, depth
+        if record is None:
+            if tag == "record":
+                record, depth = {}, 0
+            return
+        depth += 1
+        if depth == 1:
+            field = tag
+            text.clear()
+        else:
+            field = None  # Text after a nested element is not the field's text
+
+    def end(tag):
+        nonlocal record, field, depth
+        if record is None:
+            return
+        if depth == 0:
+            records.append(record)
+            record = None
+            return
+        if depth == 1 and tag not in record:
+            record[tag] = "".join(text) or None
+        field = None
+        depth -= 1
+
+    def data(chunk):
+        if field is not None:
+            text.append(chunk)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = data
+
+    f = open(xml_file, "rb") if isinstance(xml_file, (str, os.PathLike)) else xml_file
+    try:
+        for block in iter(lambda: f.read(EXPAT_BLOCK_SIZE), b""):
+            parser.Parse(block, False)
+            yield from records
+            records.clear()
+        parser.Parse(b"", True)
+        yield from records
+    finally:
+        if f is not xml_file:
+            f.close()
+
+
+def _lxml_records(xml_file: XmlSource) -> Iterator[Record]:
+    for _, element in lxml_etree.iterparse(xml_file, events=("end",), tag="record", huge_tree=True):
+        yield element_record(element)
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+XML_BACKENDS: Dict[str, Callable[[XmlSource], Iterator[Record]]] = {
+    "etree": _etree_records,
+    "expat": _expat_records,
+}
+if lxml_etree is not None:
+    XML_BACKENDS["lxml"] = _lxml_records
+
+_xml_backend = "lxml" if lxml_etree is not None else "etree"
+
+# Raised by iter_records() and the parse functions on malformed (e.g. half-written) XML
+XML_ERRORS: Tuple[type, ...] = (ET.ParseError, expat.ExpatError)
+if lxml_etree is not None:
+    XML_ERRORS += (lxml_etree.XMLSyntaxError,)
+
+
+def set_xml_backend(backend: str):
+    """Select the XML backend of iter_records() (default lxml if installed, else etree)."""
+    global _xml_backend
+    if backend not in XML_BACKENDS:
+        raise ValueError(f"Unknown or unavailable XML backend: {backend} (available: {', '.join(XML_BACKENDS)})")
+    _xml_backend = backend
+
+
+def iter_records(xml_file: XmlSource, backend: Optional[str] = None) -> Iterator[Record]:
+    """Yield the <record> elements of an EFA file as {child tag: text} dicts.
+
+    All backends agree: the first of repeated child tags wins, empty
+    elements map to None, and absent ones are missing from the dict.
+    """
+    return XML_BACKENDS[backend or _xml_backend](xml_file)
+
 
 def parse_distance(distance_str: str) -> Optional[int]:
     """Parse distance string like '8 km', '10.5 km' and return rounded km as integer."""
@@ -29,31 +297,29 @@ def parse_seats(seats_str: str) -> int:
     return int(match.group(1)) if match else 0
 
 
+@cached
 def parse_boats(xml_file: str) -> dict:
     """Parse boats.efa2boats and return {variant_id: boat_data} dict.
 
     Each boat variant gets an ID of the form '{uuid}-v{n}'.
     Boat data keys: id, oid, name, size, rig, cox, and optionally suffix.
     """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
     boats = {}
 
-    for record in root.findall(".//record"):
-        boat_id = record.find("Id").text
-        name = record.find("Name").text
-        name_affix = record.find("NameAffix")
+    for record in iter_records(xml_file):
+        boat_id = record["Id"]
+        name = record["Name"]
 
-        type_seats = record.find("TypeSeats").text.split(";")
-        type_rigging = record.find("TypeRigging").text.split(";")
-        type_coxing = record.find("TypeCoxing").text.split(";")
+        type_seats = record["TypeSeats"].split(";")
+        type_rigging = record["TypeRigging"].split(";")
+        type_coxing = record["TypeCoxing"].split(";")
 
         if len(type_seats) != len(type_rigging) or len(type_seats) != len(type_coxing):
             logger.warning(f"Boat {name} ({boat_id}) has inconsistent variant counts: skipping")
             continue
 
         n_variants = len(type_seats)
-        last_variant = int(record.find("LastVariant").text)
+        last_variant = int(record["LastVariant"])
         if n_variants != last_variant:
             logger.warning(f"Boat {name} ({boat_id}) has {n_variants} variants but LastVariant={last_variant}: using {n_variants}")
 
@@ -67,31 +333,27 @@ def parse_boats(xml_file: str) -> dict:
                 "rig": type_rigging[variant - 1].lower(),
                 "cox": type_coxing[variant - 1].lower(),
             }
-            if name_affix is not None:
-                boat_data["suffix"] = name_affix.text
+            if "NameAffix" in record:
+                boat_data["suffix"] = record["NameAffix"]
             boats[variant_id] = boat_data
 
     return boats
 
 
+@cached
 def parse_persons(xml_file: str) -> dict:
     """Parse persons.efa2persons and return {person_id: person_data} dict.
 
     Person data keys: id, sex, and optionally fn, ln, del, hid.
     fn/ln are omitted when None (not all records have both names).
     """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
     persons = {}
 
-    for record in root.findall(".//record"):
-        person_id = record.find("Id").text
-        first_name_elem = record.find("FirstName")
-        last_name_elem = record.find("LastName")
-        gender = record.find("Gender").text
-
-        last_name = last_name_elem.text if last_name_elem is not None else None
-        first_name = first_name_elem.text if first_name_elem is not None else None
+    for record in iter_records(xml_file):
+        person_id = record["Id"]
+        first_name = record.get("FirstName")
+        last_name = record.get("LastName")
+        gender = record["Gender"]
 
         if last_name and last_name.startswith("archiveID:"):
             continue
@@ -101,8 +363,8 @@ def parse_persons(xml_file: str) -> dict:
             "sex": 'm' if gender.lower() == 'male' else 'f' if gender.lower() == 'female' else 'u',
             # Unclear what these mean in EFA since persons with these flags
             # still appear in logbooks.
-            "del": record.find("Deleted") is not None,
-            "hid": record.find("Invisible") is not None,
+            "del": "Deleted" in record,
+            "hid": "Invisible" in record,
         }
         if first_name:
             person_data["fn"] = first_name
@@ -114,32 +376,235 @@ def parse_persons(xml_file: str) -> dict:
     return persons
 
 
+@cached
 def parse_destinations(xml_file: str) -> dict:
     """Parse destinations.efa2destinations and return {dest_id: dest_data} dict.
 
     Destination data keys: id, name, and optionally dist.
     """
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
     destinations = {}
 
-    for record in root.findall(".//record"):
-        dest_id = record.find("Id").text
-        name = record.find("Name").text
+    for record in iter_records(xml_file):
+        dest_id = record["Id"]
         dest_data = {
             "id": dest_id,
-            "name": name,
+            "name": record["Name"],
         }
-        distance_elem = record.find("Distance")
-        if distance_elem is not None:
-            dest_data["dist"] = parse_distance(distance_elem.text)
+        if "Distance" in record:
+            dest_data["dist"] = parse_distance(record["Distance"])
         destinations[dest_id] = dest_data
 
     return destinations
 
 
+RECORD_RE = re.compile(rb"<record\b.*?</record>", re.S)
+ENTRY_ID_RE = re.compile(rb"<EntryId>\s*([^<]*?)\s*</EntryId>")
+DATE_RE = re.compile(rb"<Date>\s*([^<]*?)\s*</Date>")
+
+# (EntryId, date ordinal or 0 if unparseable, start offset, end offset)
+LogbookIndexItem = Tuple[str, int, int, int]
+
+
+def parse_date_ordinal(date_str: str) -> int:
+    """Parse a DD.MM.YYYY (or ISO YYYY-MM-DD) date into a proleptic ordinal; 0 if invalid."""
+    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(date_str.strip(), fmt).toordinal()
+        except ValueError:
+            pass
+    return 0
+
+
+def build_logbook_index(xml_file: str) -> List[LogbookIndexItem]:
+    """Scan a logbook for record byte ranges, without parsing the XML.
+
+    Returns one (EntryId, date ordinal, start, end) tuple per record, in file
+    order. Records can then be read individually with read_logbook_records().
+    """
+    index = []
+    with open(xml_file, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return index
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for match in RECORD_RE.finditer(data):
+                record = match.group(0)
+                entry_id = ENTRY_ID_RE.search(record)
+                date_match = DATE_RE.search(record)
+                index.append((
+                    entry_id.group(1).decode("utf-8") if entry_id else "",
+                    parse_date_ordinal(date_match.group(1).decode("utf-8")) if date_match else 0,
+                    match.start(),
+                    match.end(),
+                ))
+    return index
+
+
+def logbook_index(xml_file: str) -> List[LogbookIndexItem]:
+    """Return the (cached) record index of a logbook, see build_logbook_index()."""
+    return load_cached(xml_file, "logbook_index", build_logbook_index)
+
+
+def read_logbook_records(xml_file: str, items: Sequence[LogbookIndexItem]) -> Iterator[ET.Element]:
+    """Parse only the given records of a logbook, using their byte ranges."""
+    with open(xml_file, "rb") as f:
+        for _, _, start, end in items:
+            f.seek(start)
+            yield ET.fromstring(f.read(end - start))
+
+
+def iter_logbook_records(xml_file: str) -> Iterator[ET.Element]:
+    """Stream the records of a logbook; stops parsing when the caller stops iterating."""
+    with open(xml_file, "rb") as f:
+        for _, elem in ET.iterparse(f, events=("end",)):
+            if elem.tag == "record":
+                yield elem
+                elem.clear()
+
+
+def expand_globs(patterns: Sequence[str]) -> List[str]:
+    """Expand glob patterns to file names, keeping non-matching literal paths that exist."""
+    files = []
+    for pattern in patterns:
+        matches = glob.glob(pattern)
+        if matches:
+            files.extend(sorted(matches))
+        else:
+            # If no glob matches, try as literal filename
+            if Path(pattern).exists():
+                files.append(pattern)
+            else:
+                logger.warning(f"No files found matching pattern: {pattern}")
+    return files
+
+
 def format_person_name(first_name: Optional[str], last_name: Optional[str]) -> str:
     """Format person name for display."""
     if first_name and last_name:
         return f"{first_name} {last_name}"
     return last_name or first_name or "Unknown"
+
+
+def normalize_name(name: str) -> str:
+    """Normalize name for comparison (lowercase, remove accents, extra spaces)"""
+    normalized = unicodedata.normalize('NFD', name.lower().strip())
+    # Remove combining characters (accents)
+    normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
+    # Normalize whitespace
+    normalized = ' '.join(normalized.split())
+    return normalized
+
+
+class PersonNameIndex:
+    """Hash index from normalized person names to person IDs.
+
+    Each person is indexed under its normalized full name (see
+    normalize_name) and under a token-order-insensitive key, so that
+    "Meier Anna" finds "Anna Meier". Lookups are two dict probes; a name
+    only resolves if it maps to exactly one person.
+    """
+
+    def __init__(self, persons: dict):
+        self.by_name = {}
+        self.by_tokens = {}
+        for person_id, person in persons.items():
+            name = format_person_name(person.get("fn"), person.get("ln"))
+            full, tokens = self.keys(name)
+            self.by_name.setdefault(full, set()).add(person_id)
+            self.by_tokens.setdefault(tokens, set()).add(person_id)
+
+    @staticmethod
+    def keys(name: str) -> Tuple[str, str]:
+        """Return the (full name, sorted tokens) keys of a name."""
+        full = normalize_name(name.replace(",", " "))
+        return full, " ".join(sorted(full.split()))
+
+    def match(self, name: str) -> Tuple[Optional[str], str]:
+        """Return (person_id, reason) for a free-text name.
+
+        reason is "exact" or "reordered" for a match, and "ambiguous" or
+        "unknown" (with person_id None) otherwise.
+        """
+        full, tokens = self.keys(name)
+        for key, index, reason in ((full, self.by_name, "exact"), (tokens, self.by_tokens, "reordered")):
+            candidates = index.get(key)
+            if candidates:
+                if len(candidates) > 1:
+                    return None, "ambiguous"
+                return next(iter(candidates)), reason
+        return None, "unknown"
+
+
+def levenshtein_distance(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+    """Calculate Levenshtein distance between two strings.
+
+    If max_distance is given, gives up as soon as the distance is known
+    to exceed it and returns max_distance + 1.
+    """
+    if len(s1) < len(s2):
+        return levenshtein_distance(s2, s1, max_distance)
+
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        # Row minima never decrease, so the distance is at least this
+        if max_distance is not None and min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+
+    return previous_row[-1]
+
+
+class SimilarNameIndex:
+    """Symmetric-delete index for finding names within a small edit distance.
+
+    Every (normalized) name is indexed under all strings obtained by deleting
+    up to max_distance of its characters. Two names within edit distance d
+    share such a deletion variant with at most d deletions on each side, so
+    the names sharing a variant are a complete candidate set; only those are
+    compared with levenshtein_distance() instead of all pairs.
+    """
+
+    def __init__(self, names: Sequence[str], max_distance: int = 2):
+        self.names = list(names)
+        self.max_distance = max_distance
+        self.variants = {}
+        for i, name in enumerate(self.names):
+            for variant in self.deletions(name, max_distance):
+                self.variants.setdefault(variant, []).append(i)
+
+    @staticmethod
+    def deletions(name: str, depth: int) -> set:
+        """Return name and all strings obtained by deleting up to depth characters."""
+        variants = frontier = {name}
+        for _ in range(min(depth, len(name))):
+            frontier = {w[:k] + w[k + 1:] for w in frontier for k in range(len(w))}
+            variants = variants | frontier
+        return variants
+
+    def similar(self, i: int, threshold: int) -> List[Tuple[int, int]]:
+        """Return (j, distance) of the other names within threshold of name i, by j."""
+        if threshold > self.max_distance:
+            raise ValueError(f"threshold {threshold} exceeds the index's max_distance {self.max_distance}")
+        name = self.names[i]
+        candidates = set()
+        for variant in self.deletions(name, threshold):
+            candidates.update(self.variants.get(variant, ()))
+        candidates.discard(i)
+        result = []
+        for j in sorted(candidates):
+            other = self.names[j]
+            # The edit distance is at least the difference in length
+            if abs(len(name) - len(other)) > threshold:
+                continue
+            distance = levenshtein_distance(name, other, threshold)
+            if distance <= threshold:
+                result.append((j, distance))
+        return result
@@ -0,0 +1,107 @@
+"""
+Versioned publishing of exports for the viewer.
+
+With efa_importer.py --versioned, every export goes into a new directory
+versions/<version>/ and each file gets a content hash in its name
+(logbooks.json -> logbooks.3f2a9c01b7de.json, plus .json.gz). Once all files
+are written, the pointer manifest current.json is replaced atomically:
+
+    {"version": "20240615T000012",
+     "files": {"logbooks.json": "versions/20240615T000012/logbooks.3f2a9c01b7de.json", ...},
+     "deltas": {...}}   # delta feed manifest (efa_delta), if enabled
+
+Readers never see a partially written export: they either get the old
+pointer, whose files still exist, or the new one. Versioned files never
+change, so they can be served with "Cache-Control: public, max-age=31536000,
+immutable"; only current.json needs to be revalidated. Old versions beyond
+the newest KEEP_VERSIONS are pruned.
+"""
+
+import json
+import logging
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POINTER = "current.json"
+VERSIONS_DIR = "versions"
+KEEP_VERSIONS = 3
+HASH_LENGTH = 12
+
+
+def load_pointer(output_dir: str) -> Optional[dict]:
+    path = Path(output_dir) / POINTER
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve(output_dir: str, filename: str) -> Path:
+    """Return the current path of an export file such as "boats.json.gz".
+
+    Follows current.json if there is one, and falls back to the unversioned
+    layout (files directly in output_dir) otherwise.
+    """
+    return pointer_path(output_dir, load_pointer(output_dir), filename)
+
+
+def pointer_path(output_dir: str, pointer: Optional[dict], filename: str) -> Path:
+    """Return the path of an export file in the version named by pointer (see resolve()).
+
+    Readers of several files use this with one pointer, so that they do not
+    mix two versions when an export is published in between.
+    """
+    if pointer is None:
+        return Path(output_dir) / filename
+    base, gz, _ = filename.partition(".gz")
+    return Path(output_dir) / (pointer["files"][base] + gz)
+
+
+def new_version_dir(output_dir: str) -> Tuple[str, Path]:
+    """Create and return (version, path) of a directory for a new export."""
+    versions = Path(output_dir) / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%dT%H%M%S")
+    candidate, n = version, 1
+    while (versions / candidate).exists():
+        n += 1
+        candidate = f"{version}-{n}"
+    path = versions / candidate
+    path.mkdir()
+    return candidate, path
+
+
+def hashed_name(filename: str, digest: str) -> str:
+    """Return e.g. "boats.<hash>.json" for "boats.json"."""
+    stem, _, ext = filename.rpartition(".")
+    return f"{stem}.{digest[:HASH_LENGTH]}.{ext}"
+
+
+def publish(output_dir: str, version: str, files: Dict[str, str], deltas: Optional[dict] = None) -> dict:
+    """Switch current.json to a completely written version."""
+    pointer = {"version": version, "files": files}
+    if deltas is not None:
+        pointer["deltas"] = deltas
+    path = Path(output_dir) / POINTER
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, indent=2)
+    tmp.replace(path)
+    logger.info(f"Published version {version}")
+    return pointer
+
+
+def prune(output_dir: str, keep: int = KEEP_VERSIONS):
+    """Remove all but the newest keep versions; the current one is always kept."""
+    pointer = load_pointer(output_dir)
+    current = pointer["version"] if pointer else None
+    versions = sorted((p for p in (Path(output_dir) / VERSIONS_DIR).iterdir() if p.is_dir()),
+                      key=lambda p: p.stat().st_mtime_ns)
+    for path in versions[:max(len(versions) - keep, 0)]:
+        if path.name != current:
+            shutil.rmtree(path)
+            logger.info(f"Pruned version {path.name}")
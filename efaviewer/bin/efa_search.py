@@ -0,0 +1,199 @@
+"""
+Inverted token index for logbook full-text search.
+
+The importer tokenizes boat, crew and destination names and entry comments
+(accent-folded and lowercased, see normalize_name) and maps every token to
+the sorted list of logbook entry indexes it occurs in. Terms are stored in
+sorted order so that prefix queries are a binary search plus a union of the
+matching posting lists; posting lists are delta-encoded to keep search.json
+small.
+
+A query term that tokenizes to several words (a quoted phrase such as
+"urs steiner", or a word like o'brien) must also match as a phrase: its words
+in this order within one of the indexed fields (boat, a single crew member,
+destination or comment), the last one as a prefix. The index only narrows
+down the candidates for these; the phrase is checked against the entry's
+fields (entry_texts, phrase_in).
+
+The same index is consumed by the viewer (worker.js) and by SearchIndex below.
+"""
+
+import bisect
+import gzip
+import json
+import re
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from efa_parser import normalize_name
+
+INDEX_VERSION = 1
+
+TOKEN_RE = re.compile(r"\w+")
+# Same splitting rules as extractTerms() in app.js.
+QUERY_TERM_RE = re.compile(r"\"[^\"]*\"|'[^']*'|\S+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into normalized (lowercase, accent-free) word tokens."""
+    if not text:
+        return []
+    return TOKEN_RE.findall(normalize_name(text))
+
+
+def encode_postings(postings: Iterable[int]) -> List[int]:
+    """Delta-encode a sorted list of entry indexes."""
+    encoded, prev = [], 0
+    for value in postings:
+        encoded.append(value - prev)
+        prev = value
+    return encoded
+
+
+def decode_postings(encoded: Iterable[int]) -> List[int]:
+    """Inverse of encode_postings()."""
+    postings, value = [], 0
+    for delta in encoded:
+        value += delta
+        postings.append(value)
+    return postings
+
+
+def build_search_index(logbooks: Iterable[dict], boats: dict, persons: dict, destinations: dict) -> dict:
+    """Build the search index for exported logbook entries.
+
+    Posting lists refer to positions in the logbooks sequence as exported.
+    Tokens of each boat, person and destination are computed once and reused
+    for every entry that references them.
+    """
+    entity_tokens: Dict[str, List[str]] = {}
+
+    def tokens_for(entity_id: Optional[str], entities: dict, fields: tuple) -> List[str]:
+        if entity_id is None:
+            return []
+        tokens = entity_tokens.get(entity_id)
+        if tokens is None:
+            entity = entities.get(entity_id, {})
+            tokens = []
+            for field in fields:
+                tokens.extend(tokenize(entity.get(field)))
+            entity_tokens[entity_id] = tokens
+        return tokens
+
+    postings: Dict[str, List[int]] = defaultdict(list)
+    for i, entry in enumerate(logbooks):
+        tokens = set(tokens_for(entry.get("boat"), boats, ("name", "suffix")))
+        for person_id in entry.get("crew", ()):
+            tokens.update(tokens_for(person_id, persons, ("fn", "ln")))
+        tokens.update(tokens_for(entry.get("dest"), destinations, ("name",)))
+        tokens.update(tokenize(entry.get("note")))
+        for token in tokens:
+            postings[token].append(i)
+
+    terms = sorted(postings)
+    return {
+        "version": INDEX_VERSION,
+        "terms": terms,
+        "postings": [encode_postings(postings[term]) for term in terms],
+    }
+
+
+def entry_texts(entry: dict, boats: dict, persons: dict, destinations: dict) -> List[str]:
+    """Return the texts of an exported logbook entry that phrases are matched in.
+
+    These are the fields build_search_index() tokenizes: boat, each crew
+    member, destination and comment.
+    """
+    texts = []
+    boat = boats.get(entry.get("boat"))
+    if boat:
+        texts.append(" ".join(boat[field] for field in ("name", "suffix") if boat.get(field)))
+    for person_id in entry.get("crew", ()):
+        person = persons.get(person_id)
+        if person:
+            texts.append(" ".join(person[field] for field in ("fn", "ln") if person.get(field)))
+    dest = destinations.get(entry.get("dest"))
+    if dest and dest.get("name"):
+        texts.append(dest["name"])
+    if entry.get("note"):
+        texts.append(entry["note"])
+    return texts
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """Split a query into terms (quoted phrases or words), each a token list."""
+    terms = []
+    for term in QUERY_TERM_RE.findall(query.strip()):
+        if len(term) >= 2 and term[0] == term[-1] and term[0] in "\"'":
+            term = term[1:-1]
+        tokens = tokenize(term)
+        if tokens:
+            terms.append(tokens)
+    return terms
+
+
+def phrase_in(phrase: List[str], text: str) -> bool:
+    """Return whether text contains the phrase tokens in order, the last one as a prefix."""
+    tokens = tokenize(text)
+    *words, last = phrase
+    for k in range(len(tokens) - len(phrase) + 1):
+        if tokens[k:k + len(words)] == words and tokens[k + len(words)].startswith(last):
+            return True
+    return False
+
+
+class SearchIndex:
+    """Query interface over an index produced by build_search_index()."""
+
+    def __init__(self, index: dict):
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported search index version: {index.get('version')}")
+        self.terms = index["terms"]
+        self._encoded = index["postings"]
+        self._decoded: Dict[int, List[int]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        """Load search.json or search.json.gz."""
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _postings(self, term_index: int) -> List[int]:
+        postings = self._decoded.get(term_index)
+        if postings is None:
+            postings = decode_postings(self._encoded[term_index])
+            self._decoded[term_index] = postings
+        return postings
+
+    def lookup_prefix(self, prefix: str) -> Set[int]:
+        """Return indexes of entries containing a token starting with prefix."""
+        result: Set[int] = set()
+        i = bisect.bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            result.update(self._postings(i))
+            i += 1
+        return result
+
+    def search(self, query: str, fields: Optional[Callable[[int], Iterable[str]]] = None) -> List[int]:
+        """Return sorted indexes of entries matching every token of the query.
+
+        With fields (entry index -> its texts, see entry_texts), multi-word
+        terms must also match as phrases (see phrase_in).
+        """
+        terms = parse_query(query)
+        tokens = [token for term in terms for token in term]
+        if not tokens:
+            return []
+        # Intersect starting from the most selective token.
+        candidates = sorted((self.lookup_prefix(token) for token in tokens), key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            if not result:
+                break
+            result = result & other
+        phrases = [term for term in terms if len(term) > 1]
+        if fields is not None and phrases:
+            result = {i for i in result
+                      if all(any(phrase_in(phrase, text) for text in fields(i)) for phrase in phrases)}
+        return sorted(result)
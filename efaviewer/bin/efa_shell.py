@@ -0,0 +1,331 @@
+"""
+Interactive shell for efa_viewer.py (efa_viewer.py --interactive).
+
+A data-cleaning session asks many questions of the same backup. Instead of
+rerunning efa_viewer.py, and reparsing everything, for each of them, the
+shell loads the reference data and the logbooks once and keeps the parsed
+records and the name-similarity indexes in memory:
+
+    efa> show --since 01.06.2024 --until 30.06.2024 -n 20
+    efa> names --pattern '^ann' --logbook
+    efa> similar --threshold 1
+    efa> reload
+
+reload checks the size and modification time of every loaded file and
+rereads only those that changed, plus logbooks that appeared or
+disappeared under the --logbook patterns. A file that cannot be read
+(e.g. still being written) is reported and its previously loaded version
+kept; the next reload tries it again. Name indexes are rebuilt on next use
+when the names they cover changed.
+
+similar --threshold is limited to MAX_THRESHOLD: the similarity index
+holds every deletion variant of each name, whose number grows with the
+length of the name to the power of the threshold.
+"""
+
+import argparse
+import cmd
+import os
+import re
+import shlex
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from efa_parser import XML_ERRORS, Record, SimilarNameIndex, expand_globs, iter_records, parse_date_ordinal
+from efa_viewer import EfaViewer, logbook_names, merge_logbook_names
+
+# (size, mtime in ns) of a file when it was loaded
+Signature = Tuple[int, int]
+
+# Errors reading one file, after which the shell keeps its previous version
+LOAD_ERRORS = XML_ERRORS + (OSError,)
+
+# Largest similar --threshold (see module docstring)
+MAX_THRESHOLD = 4
+
+
+class CommandAborted(Exception):
+    """Raised by CommandParser on --help or a usage error."""
+
+
+class CommandParser(argparse.ArgumentParser):
+    """ArgumentParser for shell commands: --help and errors return to the prompt."""
+
+    def exit(self, status=0, message=None):
+        if message:
+            print(message.rstrip())
+        raise CommandAborted()
+
+    def error(self, message):
+        self.exit(2, f"{self.prog}: error: {message}")
+
+
+def file_signature(path: str) -> Optional[Signature]:
+    """Return the signature of a file, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class LoadedLogbook:
+    """The parsed records of one logbook file, with their date ordinals and names."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signature = file_signature(path)
+        self.records: List[Record] = list(iter_records(path))
+        self.ordinals = [parse_date_ordinal(record.get("Date") or "") for record in self.records]
+        self.names = logbook_names(self.records)
+
+
+class EfaShell(cmd.Cmd):
+    intro = "EFA viewer shell. Type help or ? to list commands."
+    prompt = "efa> "
+
+    def __init__(self, viewer: EfaViewer, boats: str, persons: str, destinations: Optional[str] = None,
+                 logbook_patterns: Sequence[str] = (), similarity_threshold: int = 2):
+        super().__init__()
+        self.viewer = viewer
+        self.reference = {"boats": boats, "persons": persons, "destinations": destinations}
+        self.logbook_patterns = list(logbook_patterns)
+        self.similarity_threshold = similarity_threshold
+        self.signatures: Dict[str, Optional[Signature]] = {}
+        self.logbooks: Dict[str, LoadedLogbook] = {}
+        # Name lists and their similarity indexes, built on first use
+        self._names: Dict[str, List[Tuple[str, str]]] = {}
+        self._indexes: Dict[str, SimilarNameIndex] = {}
+        self.refresh()
+
+    ########################################################################
+    # Loading
+    ########################################################################
+
+    def _load_reference(self, kind: str, path: str):
+        loaders = {"boats": self.viewer.load_boats, "persons": self.viewer.load_persons,
+                   "destinations": self.viewer.load_destinations}
+        signature = file_signature(path)
+        loaders[kind](path)
+        self.signatures[path] = signature
+
+    def refresh(self) -> List[str]:
+        """(Re)load the files that are new or changed on disk; return their descriptions."""
+        start = time.perf_counter()
+        changed = []
+        for kind, path in self.reference.items():
+            if path is None:
+                continue
+            signature = file_signature(path)
+            if signature is None:
+                print(f"Warning: {path} not found, keeping the loaded {kind}")
+            elif signature != self.signatures.get(path):
+                try:
+                    self._load_reference(kind, path)
+                except LOAD_ERRORS as e:
+                    print(f"Warning: cannot read {path}, keeping the loaded {kind}: {e}")
+                    continue
+                changed.append(path)
+                if kind == "persons":
+                    self._invalidate("persons")
+
+        paths = expand_globs(self.logbook_patterns) if self.logbook_patterns else []
+        logbooks = {}
+        for path in paths:
+            loaded = self.logbooks.get(path)
+            if loaded is None or file_signature(path) != loaded.signature:
+                try:
+                    loaded = LoadedLogbook(path)
+                except LOAD_ERRORS as e:
+                    print(f"Warning: cannot read {path}, keeping the loaded version: {e}")
+                    if loaded is None:
+                        continue
+                else:
+                    changed.append(path)
+            logbooks[path] = loaded
+        changed += [f"{path} (removed)" for path in self.logbooks if path not in logbooks]
+        if list(logbooks) != list(self.logbooks) or any(path in changed for path in logbooks):
+            self._invalidate("logbook")
+        self.logbooks = logbooks
+
+        if changed:
+            entries = sum(len(logbook.records) for logbook in self.logbooks.values())
+            print(f"Loaded {len(self.viewer.boats)} boats, {len(self.viewer.persons)} persons, "
+                  f"{len(self.viewer.destinations)} destinations, {len(self.logbooks)} logbooks "
+                  f"({entries} entries) in {time.perf_counter() - start:.2f}s")
+        return changed
+
+    def _invalidate(self, source: str):
+        self._names.pop(source, None)
+        self._indexes.pop(source, None)
+
+    def names(self, source: str) -> List[Tuple[str, str]]:
+        """Return (id or name, name or first occurrence) pairs of person or logbook names."""
+        if source not in self._names:
+            if source == "persons":
+                self._names[source] = self.viewer._person_names()
+            else:
+                self._names[source] = merge_logbook_names(
+                    list(self.logbooks), [logbook.names for logbook in self.logbooks.values()])
+        return self._names[source]
+
+    def similar_index(self, source: str, threshold: int) -> SimilarNameIndex:
+        """Return the similarity index of a name list, covering at least threshold."""
+        index = self._indexes.get(source)
+        if index is None or index.max_distance < threshold:
+            # Person items are (id, name), logbook items (name, first occurrence)
+            names = [item[1] if source == "persons" else item[0] for item in self.names(source)]
+            index = self._indexes[source] = self.viewer.similar_name_index(names, threshold)
+        return index
+
+    ########################################################################
+    # Commands
+    ########################################################################
+
+    def _parse(self, parser: CommandParser, line: str) -> Optional[argparse.Namespace]:
+        try:
+            return parser.parse_args(shlex.split(line))
+        except ValueError as e:  # Unbalanced quotes
+            print(f"{parser.prog}: error: {e}")
+        except CommandAborted:
+            pass
+        return None
+
+    def _show_parser(self) -> CommandParser:
+        parser = CommandParser(prog="show", description="Show logbook entries with IDs resolved to names")
+        parser.add_argument("--since", help="Only entries on or after this date (DD.MM.YYYY or YYYY-MM-DD)")
+        parser.add_argument("--until", help="Only entries on or before this date (DD.MM.YYYY or YYYY-MM-DD)")
+        parser.add_argument("--entry", action="append", help="Only the entry with this EntryId (repeatable)")
+        parser.add_argument("--logbook", action="append",
+                            help="Only logbooks whose file name contains this (repeatable)")
+        parser.add_argument("--limit", "-n", type=int, help="Limit number of entries to display per logbook")
+        return parser
+
+    def do_show(self, line: str):
+        """show [--since DATE] [--until DATE] [--entry ID]... [--logbook NAME]... [-n N]: show logbook entries"""
+        parser = self._show_parser()
+        args = self._parse(parser, line)
+        if args is None:
+            return
+        for date_arg in ("since", "until"):
+            value = getattr(args, date_arg)
+            if value and not parse_date_ordinal(value):
+                print(f"show: error: --{date_arg}: invalid date '{value}' (expected DD.MM.YYYY or YYYY-MM-DD)")
+                return
+        if not self.logbooks:
+            print("No logbooks loaded (start with --logbook).")
+            return
+
+        # Entries with unparseable dates (ordinal 0) never match a date filter
+        first = parse_date_ordinal(args.since) if args.since else 1
+        last = parse_date_ordinal(args.until) if args.until else float("inf")
+        dated = bool(args.since or args.until)
+        wanted = set(args.entry) if args.entry else None
+        for path, logbook in self.logbooks.items():
+            name = Path(path).name
+            if args.logbook and not any(part in name for part in args.logbook):
+                continue
+            print(f"\n=== Logbook: {name} ===\n")
+            selected = [record for record, ordinal in zip(logbook.records, logbook.ordinals)
+                        if (first <= ordinal <= last or not dated)
+                        and (wanted is None or (record.get("EntryId") or "").strip() in wanted)]
+            if (dated or wanted) and not selected:
+                print("No matching entries.")
+            for record in selected[:args.limit] if args.limit else selected:
+                self.viewer._print_record(record)
+            if args.limit and len(selected) > args.limit:
+                print(f"... ({len(selected) - args.limit} more entries)")
+
+    def do_names(self, line: str):
+        """names [--pattern REGEX] [--logbook]: list person (or logbook) names matching a pattern"""
+        parser = CommandParser(prog="names", description="List names matching a regex pattern")
+        parser.add_argument("--pattern", default="", help="Regex pattern (case-insensitive; default: all names)")
+        parser.add_argument("--logbook", action="store_true", help="Names written in the logbooks instead of persons")
+        args = self._parse(parser, line)
+        if args is None:
+            return
+        try:
+            if args.logbook:
+                matches = self.viewer._find_logbook_names_by_pattern(self.names("logbook"), args.pattern)
+            else:
+                matches = self.viewer._find_names_by_pattern_generic(self.names("persons"), args.pattern)
+        except re.error as e:
+            print(f"names: error: invalid pattern: {e}")
+            return
+        if args.logbook:
+            for name, first_seen in sorted(matches):
+                print(f"  {name}")
+                print(f"    First seen: {first_seen}")
+        else:
+            for person_id, name in sorted(matches, key=lambda x: x[1]):
+                print(f"  {name} ({person_id[:8]}...)")
+        print(f"\nTotal matches: {len(matches)}")
+
+    def do_similar(self, line: str):
+        """similar [--threshold N] [--logbook]: list clusters of similar person (or logbook) names"""
+        parser = CommandParser(prog="similar", description="List clusters of similar names")
+        parser.add_argument("--threshold", type=int, default=self.similarity_threshold,
+                            help=f"Edit distance threshold (default: {self.similarity_threshold})")
+        parser.add_argument("--logbook", action="store_true", help="Names written in the logbooks instead of persons")
+        args = self._parse(parser, line)
+        if args is None:
+            return
+        if not 0 <= args.threshold <= MAX_THRESHOLD:
+            print(f"similar: error: --threshold must be between 0 and {MAX_THRESHOLD}")
+            return
+        source = "logbook" if args.logbook else "persons"
+        names = self.names(source)
+        index = self.similar_index(source, args.threshold)
+        if args.logbook:
+            clusters = self.viewer._find_similar_logbook_names(names, args.threshold, index)
+        else:
+            clusters = self.viewer._find_similar_names_generic(names, args.threshold, index)
+        if not clusters:
+            print("No similar name clusters found.")
+            return
+        for cluster_name, cluster in clusters.items():
+            print(f"{cluster_name.replace('_', ' ').title()}:")
+            for first, second, distance in sorted(cluster, key=lambda x: x[2]):
+                distance_info = f" (distance: {distance})" if distance > 0 else ""
+                if args.logbook:
+                    print(f"  • {first}{distance_info}")
+                    print(f"    First seen: {second}")
+                else:
+                    print(f"  • {second} ({first[:8]}...){distance_info}")
+            print()
+        print(f"Total clusters: {len(clusters)}")
+        print(f"Total names in clusters: {sum(len(cluster) for cluster in clusters.values())}")
+
+    def do_reload(self, line: str):
+        """reload: reread the files that changed on disk"""
+        changed = self.refresh()
+        if not changed:
+            print("No files changed.")
+        for description in changed:
+            print(f"  reloaded {description}")
+
+    def do_status(self, line: str):
+        """status: list the loaded files"""
+        for kind, path in self.reference.items():
+            if path:
+                print(f"  {kind}: {path}")
+        for path, logbook in self.logbooks.items():
+            print(f"  logbook: {path} ({len(logbook.records)} entries)")
+        for source, index in self._indexes.items():
+            print(f"  similarity index ({source}): {len(index.names)} names, "
+                  f"{len(index.variants)} variants, distance <= {index.max_distance}")
+
+    def do_quit(self, line: str):
+        """quit: leave the shell"""
+        return True
+
+    do_exit = do_quit
+
+    def do_EOF(self, line: str):
+        print()
+        return True
+
+    def emptyline(self):
+        # Do not repeat the last command
+        pass
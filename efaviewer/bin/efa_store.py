@@ -0,0 +1,142 @@
+"""
+Compact in-memory storage for imported EFA data.
+
+Logbook entries are kept column-wise in typed arrays rather than as one dict
+per entry. Strings that repeat across entries (entity UUIDs, dates, times,
+session types) are interned to integer handles; crews are stored as one flat
+array of person handles plus per-entry offsets. Dicts are only materialized
+at the edges (JSON export, iteration).
+"""
+
+from array import array
+from typing import Dict, Hashable, Iterator, List, Optional
+
+# Handle/value used for absent optional fields.
+NONE = -1
+
+
+class Interner:
+    """Bidirectional mapping between hashable values and dense integer handles."""
+
+    __slots__ = ("_handles", "_values")
+
+    def __init__(self):
+        self._handles: Dict[Hashable, int] = {}
+        self._values: List[Hashable] = []
+
+    def intern(self, value: Hashable) -> int:
+        """Return the handle of value, allocating one if needed."""
+        handle = self._handles.get(value)
+        if handle is None:
+            handle = len(self._values)
+            self._handles[value] = handle
+            self._values.append(value)
+        return handle
+
+    def lookup(self, value: Hashable) -> int:
+        """Return the handle of value, or NONE if it was never interned."""
+        return self._handles.get(value, NONE)
+
+    def __getitem__(self, handle: int) -> Hashable:
+        return self._values[handle]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class LogbookStore:
+    """Column-oriented logbook entries.
+
+    Accepts and yields entries in the dict format of logbooks.json (keys:
+    optional id, year, date, optional t0/t1/boat, crew, optional
+    cox/dest/dist/open/type/note). Entry IDs have the form "<logbook>:<EntryId>"
+    and are stored as an interned logbook name plus an integer.
+    Column arrays are public so that bulk consumers can work on handles
+    without materializing dicts.
+    """
+
+    __slots__ = ("strings", "logbook", "entry_no", "year", "date", "t0", "t1", "boat", "dest", "dist",
+                 "cox", "open", "type", "note", "crew_offsets", "crew_members")
+
+    def __init__(self, strings: Optional[Interner] = None):
+        self.strings = strings if strings is not None else Interner()
+        self.logbook = array("i")
+        self.entry_no = array("i")
+        self.year = array("i")
+        self.date = array("i")
+        self.t0 = array("i")
+        self.t1 = array("i")
+        self.boat = array("i")
+        self.dest = array("i")
+        self.dist = array("i")
+        self.cox = bytearray()
+        self.open = bytearray()
+        self.type = array("i")
+        self.note = array("i")
+        self.crew_offsets = array("I", [0])
+        self.crew_members = array("i")
+
+    def _handle(self, entry: dict, key: str) -> int:
+        return self.strings.intern(entry[key]) if key in entry else NONE
+
+    def append(self, entry: dict):
+        """Append an entry given as a logbooks.json dict."""
+        logbook, _, entry_no = entry.get("id", "").rpartition(":")
+        if entry_no.isdigit():
+            self.logbook.append(self.strings.intern(logbook))
+            self.entry_no.append(int(entry_no))
+        else:
+            self.logbook.append(NONE)
+            self.entry_no.append(NONE)
+        year = entry["year"]
+        self.year.append(NONE if year is None else year)
+        self.date.append(self.strings.intern(entry["date"]))
+        self.t0.append(self._handle(entry, "t0"))
+        self.t1.append(self._handle(entry, "t1"))
+        self.boat.append(self._handle(entry, "boat"))
+        self.dest.append(self._handle(entry, "dest"))
+        self.dist.append(entry.get("dist", NONE))
+        self.cox.append(1 if entry.get("cox") else 0)
+        self.open.append(1 if entry.get("open") else 0)
+        self.type.append(self._handle(entry, "type"))
+        self.note.append(self._handle(entry, "note"))
+        intern = self.strings.intern
+        self.crew_members.extend(intern(person_id) for person_id in entry.get("crew", ()))
+        self.crew_offsets.append(len(self.crew_members))
+
+    def crew(self, i: int) -> array:
+        """Return the person handles of entry i (cox first, if any)."""
+        return self.crew_members[self.crew_offsets[i]:self.crew_offsets[i + 1]]
+
+    def entry(self, i: int) -> dict:
+        """Materialize entry i as a logbooks.json dict."""
+        strings = self.strings
+        entry = {}
+        if self.logbook[i] != NONE:
+            entry["id"] = f"{strings[self.logbook[i]]}:{self.entry_no[i]}"
+        year = self.year[i]
+        entry["year"] = None if year == NONE else year
+        entry["date"] = strings[self.date[i]]
+        for key, column in (("t0", self.t0), ("t1", self.t1), ("boat", self.boat)):
+            if column[i] != NONE:
+                entry[key] = strings[column[i]]
+        entry["crew"] = [strings[h] for h in self.crew(i)]
+        if self.cox[i]:
+            entry["cox"] = True
+        if self.dest[i] != NONE:
+            entry["dest"] = strings[self.dest[i]]
+        if self.dist[i] != NONE:
+            entry["dist"] = self.dist[i]
+        if self.open[i]:
+            entry["open"] = True
+        for key, column in (("type", self.type), ("note", self.note)):
+            if column[i] != NONE:
+                entry[key] = strings[column[i]]
+        return entry
+
+    def __len__(self) -> int:
+        return len(self.date)
+
+    def __iter__(self) -> Iterator[dict]:
+        for i in range(len(self)):
+            yield self.entry(i)
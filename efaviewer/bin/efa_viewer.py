@@ -7,30 +7,90 @@ ID-to-name resolution, and basic editing capabilities.
 """
 
 import argparse
-import xml.etree.ElementTree as ET
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Set, Tuple
+from typing import Dict, Iterable, List, Optional, Any, Sequence, Set, Tuple, Union
 import re
 from collections import defaultdict
 
+from efa_dataset import EfaDataset, Query
 from efa_parser import (
-    parse_boats, parse_persons, parse_destinations, parse_distance,
-    format_person_name,
+    Record, SimilarNameIndex, parse_boats, parse_persons, parse_destinations, parse_distance,
+    format_person_name, normalize_name, set_cache_dir, element_record, iter_records, levenshtein_distance,
+    iter_logbook_records, logbook_index, parse_date_ordinal, read_logbook_records,
+    expand_globs,
 )
 
+# Name slots of a logbook record: crew names, then cox name
+NAME_SLOTS = [f"Crew{i}Name" for i in range(1, 20)] + ["CoxName"]
+
+
+def logbook_names(records: Iterable[Record]) -> List[Tuple[str, int, str]]:
+    """Extract names from logbook records as (name, date ordinal, source_info) tuples.
+
+    Each name is reported once, at its first occurrence.
+    """
+    names = []  # (name, date ordinal, source_info)
+    seen = set()  # To avoid duplicates
+
+    for record in records:
+        entry_id = record.get("EntryId")
+        date = record.get("Date")
+        ordinal = parse_date_ordinal(date or "")
+
+        for slot in NAME_SLOTS:
+            name = record.get(slot)
+            if name:
+                name = name.strip()
+                if name not in seen:
+                    names.append((name, ordinal, f"Entry {entry_id} ({date}) - {slot}"))
+                    seen.add(name)
+
+    return names
+
+
+def extract_logbook_names(logbook_file: str) -> List[Tuple[str, int, str]]:
+    """Extract names from one logbook file, see logbook_names().
+
+    This is a module-level function so that it can run in worker processes.
+    """
+    return logbook_names(iter_records(logbook_file))
+
+
+def merge_logbook_names(logbook_files: Sequence[str],
+                        results: Iterable[List[Tuple[str, int, str]]]) -> List[Tuple[str, str]]:
+    """Merge the names of several logbooks into (name, source_info) pairs.
+
+    A name found in several logbooks is reported with its earliest-dated
+    occurrence; names are returned in that order.
+    """
+    first_seen = {}  # name -> (sort key, source)
+    for file_index, names in enumerate(results):
+        source_file = Path(logbook_files[file_index]).name
+        for position, (name, ordinal, source) in enumerate(names):
+            # Undated entries sort last
+            key = (ordinal or float("inf"), file_index, position)
+            if name not in first_seen or key < first_seen[name][0]:
+                first_seen[name] = (key, f"{source} [{source_file}]")
+    return [(name, source) for name, (_, source) in sorted(first_seen.items(), key=lambda item: item[1][0])]
+
 
 class EfaViewer:
     def __init__(self):
         self.boats = {}
+        self.boats_by_oid = {}
         self.persons = {}
         self.destinations = {}
 
     def load_boats(self, boats_file: str):
         """Load boats from efa2boats file"""
         self.boats = parse_boats(boats_file)
-        # Also store by original ID for lookup
-        for variant_id, boat in list(self.boats.items()):
-            self.boats[boat["oid"]] = boat
+        # Also index by original ID for lookups without a variant. Kept
+        # separate so that self.boats holds each variant exactly once.
+        self.boats_by_oid = {}
+        for boat in self.boats.values():
+            self.boats_by_oid[boat["oid"]] = boat
 
     def load_persons(self, persons_file: str):
         """Load persons from efa2persons file"""
@@ -40,6 +100,13 @@ class EfaViewer:
         """Load destinations from efa2destinations file"""
         self.destinations = parse_destinations(destinations_file)
 
+    def load_export(self, dataset: EfaDataset):
+        """Load reference data from an efa_importer.py export"""
+        self.boats = dataset.boats
+        self.boats_by_oid = {boat["oid"]: boat for boat in self.boats.values() if "oid" in boat}
+        self.persons = dataset.persons
+        self.destinations = dataset.destinations
+
     def _resolve_boat_name(self, boat_id: str, variant: int = None) -> str:
         """Resolve boat ID to name"""
         if variant:
@@ -50,8 +117,8 @@ class EfaViewer:
                 rig = f" - {boat['rig'].title()}" if boat['rig'] != 'unknown' else ""
                 return f"{boat['name']}{suffix}{rig}"
 
-        if boat_id in self.boats:
-            boat = self.boats[boat_id]
+        boat = self.boats.get(boat_id) or self.boats_by_oid.get(boat_id)
+        if boat:
             suffix = f" ({boat['suffix']})" if 'suffix' in boat else ""
             rig = f" - {boat['rig'].title()}" if boat['rig'] != 'unknown' else ""
             return f"{boat['name']}{suffix}{rig}"
@@ -73,39 +140,29 @@ class EfaViewer:
             return f"{dest['name']}{distance_info}"
         return f"Unknown Destination ({dest_id})"
 
-    def _levenshtein_distance(self, s1: str, s2: str) -> int:
-        """Calculate Levenshtein distance between two strings"""
-        if len(s1) < len(s2):
-            return self._levenshtein_distance(s2, s1)
-
-        if len(s2) == 0:
-            return len(s1)
-
-        previous_row = list(range(len(s2) + 1))
-        for i, c1 in enumerate(s1):
-            current_row = [i + 1]
-            for j, c2 in enumerate(s2):
-                insertions = previous_row[j + 1] + 1
-                deletions = current_row[j] + 1
-                substitutions = previous_row[j] + (c1 != c2)
-                current_row.append(min(insertions, deletions, substitutions))
-            previous_row = current_row
-
-        return previous_row[-1]
+    def _levenshtein_distance(self, s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+        """Calculate Levenshtein distance between two strings (see efa_parser.levenshtein_distance)"""
+        return levenshtein_distance(s1, s2, max_distance)
 
     def _normalize_name(self, name: str) -> str:
         """Normalize name for comparison (lowercase, remove accents, extra spaces)"""
-        # Simple normalization - can be enhanced with unicode normalization
-        import unicodedata
-        normalized = unicodedata.normalize('NFD', name.lower().strip())
-        # Remove combining characters (accents)
-        normalized = ''.join(c for c in normalized if not unicodedata.combining(c))
-        # Normalize whitespace
-        normalized = ' '.join(normalized.split())
-        return normalized
-
-    def _find_similar_names_generic(self, name_items: List[Tuple[str, str]], threshold: int = 2) -> Dict[str, List[Tuple[str, str, int]]]:
-        """Generic method to find clusters of similar names"""
+        return normalize_name(name)
+
+    def similar_name_index(self, names: Sequence[str], threshold: int = 2) -> SimilarNameIndex:
+        """Build the similarity index over the normalized names"""
+        return SimilarNameIndex([self._normalize_name(name) for name in names], threshold)
+
+    def _find_similar_names_generic(self, name_items: List[Tuple[str, str]], threshold: int = 2,
+                                    index: Optional[SimilarNameIndex] = None) -> Dict[str, List[Tuple[str, str, int]]]:
+        """Generic method to find clusters of similar names.
+
+        Each not yet clustered name, in order, starts a cluster with all
+        other unclustered names within threshold. Candidates come from a
+        similarity index (built here unless a prebuilt one for name_items
+        with max_distance >= threshold is passed).
+        """
+        if index is None or index.max_distance < threshold:
+            index = self.similar_name_index([name for _, name in name_items], threshold)
         clusters = defaultdict(list)
         processed = set()
 
@@ -116,22 +173,24 @@ class EfaViewer:
             cluster = [(id1, name1, 0)]  # (id, name, distance)
             processed.add(id1)
 
-            norm_name1 = self._normalize_name(name1)
-
-            for j, (id2, name2) in enumerate(name_items):
-                if i != j and id2 not in processed:
-                    norm_name2 = self._normalize_name(name2)
-                    distance = self._levenshtein_distance(norm_name1, norm_name2)
-
-                    if distance <= threshold:
-                        cluster.append((id2, name2, distance))
-                        processed.add(id2)
+            for j, distance in index.similar(i, threshold):
+                id2, name2 = name_items[j]
+                if id2 not in processed:
+                    cluster.append((id2, name2, distance))
+                    processed.add(id2)
 
             if len(cluster) > 1:  # Only keep clusters with multiple names
                 clusters[f"cluster_{len(clusters)}"] = cluster
 
         return dict(clusters)
 
+    def _find_similar_logbook_names(self, names: List[Tuple[str, str]], threshold: int = 2,
+                                    index: Optional[SimilarNameIndex] = None) -> Dict[str, List[Tuple[str, str, int]]]:
+        """Find clusters of similar (name, source_info) logbook names, as (name, source_info, distance)"""
+        clusters = self._find_similar_names_generic([(source, name) for name, source in names], threshold, index)
+        return {key: [(name, source, distance) for source, name, distance in cluster]
+                for key, cluster in clusters.items()}
+
     def _find_names_by_pattern_generic(self, name_items: List[Tuple[str, str]], pattern: str) -> List[Tuple[str, str]]:
         """Generic method to find names matching a regex pattern"""
         regex = re.compile(pattern, re.IGNORECASE)
@@ -143,6 +202,11 @@ class EfaViewer:
 
         return matches
 
+    def _find_logbook_names_by_pattern(self, names: List[Tuple[str, str]], pattern: str) -> List[Tuple[str, str]]:
+        """Find (name, source_info) logbook names whose name matches a regex pattern"""
+        matches = self._find_names_by_pattern_generic([(source, name) for name, source in names], pattern)
+        return [(name, source) for source, name in matches]
+
     def _person_names(self) -> List[Tuple[str, str]]:
         """Return (person_id, full_name) pairs for all persons."""
         return [(pid, format_person_name(p.get("fn"), p.get("ln")))
@@ -156,49 +220,43 @@ class EfaViewer:
         """Find person names matching a regex pattern"""
         return self._find_names_by_pattern_generic(self._person_names(), pattern)
 
-    def extract_names_from_logbook(self, logbook_file: str) -> List[Tuple[str, str]]:
-        """Extract all names from logbook entries, returning (name, source_info) tuples"""
-        tree = ET.parse(logbook_file)
-        root = tree.getroot()
-
-        names = []  # (name, source_info)
-        seen = set()  # To avoid duplicates
-
-        for record in root.findall(".//record"):
-            entry_id = record.find("EntryId").text
-            date = record.find("Date").text
-
-            # Check crew names
-            for i in range(1, 20):
-                crew_name_elem = record.find(f"Crew{i}Name")
-                if crew_name_elem is not None and crew_name_elem.text:
-                    name = crew_name_elem.text.strip()
-                    if name not in seen:
-                        names.append((name, f"Entry {entry_id} ({date}) - Crew{i}Name"))
-                        seen.add(name)
-
-            # Check cox name
-            cox_name_elem = record.find("CoxName")
-            if cox_name_elem is not None and cox_name_elem.text:
-                name = cox_name_elem.text.strip()
-                if name not in seen:
-                    names.append((name, f"Entry {entry_id} ({date}) - CoxName"))
-                    seen.add(name)
+    def extract_names_from_logbook(self, logbook_files: Union[str, Sequence[str]],
+                                   jobs: Optional[int] = None) -> List[Tuple[str, str]]:
+        """Extract all names from logbook entries, returning (name, source_info) tuples.
+
+        Several logbooks are scanned in parallel worker processes (up to jobs,
+        default one per CPU). A name found in several logbooks is reported
+        with its earliest-dated occurrence.
+        """
+        if isinstance(logbook_files, str):
+            logbook_files = [logbook_files]
+        if len(logbook_files) == 1:
+            return [(name, source) for name, _, source in extract_logbook_names(logbook_files[0])]
+
+        if jobs == 1:
+            results = map(extract_logbook_names, logbook_files)
+        else:
+            executor = ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(logbook_files)))
+            with executor:
+                results = list(executor.map(extract_logbook_names, logbook_files))
 
-        return names
+        return merge_logbook_names(logbook_files, results)
 
-    def find_similar_logbook_names(self, logbook_file: str, threshold: int = 2) -> Dict[str, List[Tuple[str, str, int]]]:
+    def find_similar_logbook_names(self, logbook_files: Union[str, Sequence[str]], threshold: int = 2,
+                                   jobs: Optional[int] = None) -> Dict[str, List[Tuple[str, str, int]]]:
         """Find clusters of similar names from logbook entries"""
-        names = self.extract_names_from_logbook(logbook_file)
-        return self._find_similar_names_generic(names, threshold)
+        names = self.extract_names_from_logbook(logbook_files, jobs)
+        return self._find_similar_logbook_names(names, threshold)
 
-    def find_logbook_names_by_pattern(self, logbook_file: str, pattern: str) -> List[Tuple[str, str]]:
+    def find_logbook_names_by_pattern(self, logbook_files: Union[str, Sequence[str]], pattern: str,
+                                      jobs: Optional[int] = None) -> List[Tuple[str, str]]:
         """Find logbook names matching a regex pattern"""
-        names = self.extract_names_from_logbook(logbook_file)
-        return self._find_names_by_pattern_generic(names, pattern)
+        names = self.extract_names_from_logbook(logbook_files, jobs)
+        return self._find_logbook_names_by_pattern(names, pattern)
 
-    def print_name_analysis(self, similarity_threshold: int = 2, pattern: str = None, logbook_file: str = None):
-        """Print analysis of similar names and pattern matches from persons file and optionally logbook"""
+    def print_name_analysis(self, similarity_threshold: int = 2, pattern: str = None,
+                            logbook_files: Optional[Sequence[str]] = None, jobs: Optional[int] = None):
+        """Print analysis of similar names and pattern matches from persons file and optionally logbooks"""
         print("\n=== Name Analysis ===\n")
 
         # Analyze persons file
@@ -230,13 +288,18 @@ class EfaViewer:
             print(f"Total names in clusters: {total_similar}")
 
         # Analyze logbook if provided
-        if logbook_file:
-            print(f"\n=== LOGBOOK ANALYSIS ({Path(logbook_file).name}) ===")
+        if logbook_files:
+            if len(logbook_files) == 1:
+                print(f"\n=== LOGBOOK ANALYSIS ({Path(logbook_files[0]).name}) ===")
+            else:
+                print(f"\n=== LOGBOOK ANALYSIS ({len(logbook_files)} logbooks) ===")
+            # Scan the logbooks once for both the pattern and the cluster analysis
+            names = self.extract_names_from_logbook(logbook_files, jobs)
 
             if pattern:
                 print(f"Names matching pattern '{pattern}':")
                 print("-" * 40)
-                matches = self.find_logbook_names_by_pattern(logbook_file, pattern)
+                matches = self._find_logbook_names_by_pattern(names, pattern)
                 for name, source in sorted(matches, key=lambda x: x[0]):
                     print(f"  {name}")
                     print(f"    First seen: {source}")
@@ -244,7 +307,7 @@ class EfaViewer:
 
             print(f"Similar name clusters (edit distance ≤ {similarity_threshold}):")
             print("-" * 50)
-            clusters = self.find_similar_logbook_names(logbook_file, similarity_threshold)
+            clusters = self._find_similar_logbook_names(names, similarity_threshold)
 
             if not clusters:
                 print("No similar name clusters found.\n")
@@ -261,113 +324,215 @@ class EfaViewer:
                 total_similar = sum(len(cluster) for cluster in clusters.values())
                 print(f"Total names in clusters: {total_similar}")
 
-    def pretty_print_logbook(self, logbook_file: str, limit: int = None):
-        """Pretty print logbook entries with ID resolution"""
-        tree = ET.parse(logbook_file)
-        root = tree.getroot()
-
+    def _print_record(self, record: Record):
+        """Pretty print one logbook record with ID resolution"""
+        print(f"Entry {record.get('EntryId')} - {record.get('Date')}")
+        print("-" * 40)
+
+        # Boat information
+        if "BoatId" in record:
+            variant = int(record["BoatVariant"]) if "BoatVariant" in record else 1
+            boat_name = self._resolve_boat_name(record["BoatId"], variant)
+            print(f"  Boat: {boat_name}")
+
+        # Crew information
+        crew = []
+
+        # Check for cox
+        if "CoxId" in record:
+            cox_name = self._resolve_person_name(record["CoxId"])
+            crew.append(f"Cox: {cox_name}")
+
+        # Check for crew members
+        for j in range(1, 20):
+            if f"Crew{j}Id" in record:
+                crew_name = self._resolve_person_name(record[f"Crew{j}Id"])
+                crew.append(f"Crew{j}: {crew_name}")
+
+        if crew:
+            print(f"  Crew: {', '.join(crew)}")
+
+        # Times
+        if "StartTime" in record and "EndTime" in record:
+            start_time = record["StartTime"].split(":", 2)[:2]
+            end_time = record["EndTime"].split(":", 2)[:2]
+            print(f"  Time: {':'.join(start_time)} - {':'.join(end_time)}")
+
+        # Destination and distance
+        if "DestinationId" in record:
+            dest_name = self._resolve_destination_name(record["DestinationId"])
+            print(f"  Destination: {dest_name}")
+
+        if "Distance" in record:
+            print(f"  Distance: {record['Distance']}")
+
+        # Session type
+        if "SessionType" in record:
+            print(f"  Type: {record['SessionType']}")
+
+        # Comments
+        if "Comments" in record:
+            print(f"  Comments: {record['Comments']}")
+
+        print()
+
+    def _print_entry(self, entry: dict):
+        """Pretty print one exported logbook entry (logbooks.json format)"""
+        print(f"Entry {entry.get('id', '-')} - {entry['date']}")
+        print("-" * 40)
+        if "boat" in entry:
+            print(f"  Boat: {self._resolve_boat_name(entry['boat'])}")
+        crew = [self._resolve_person_name(person_id) for person_id in entry["crew"]]
+        if entry.get("cox") and crew:
+            crew[0] = f"Cox: {crew[0]}"
+        if crew:
+            print(f"  Crew: {', '.join(crew)}")
+        if "t0" in entry and "t1" in entry:
+            print(f"  Time: {entry['t0']} - {entry['t1']}")
+        if "dest" in entry:
+            print(f"  Destination: {self._resolve_destination_name(entry['dest'])}")
+        if "dist" in entry:
+            print(f"  Distance: {entry['dist']} km")
+        if "type" in entry:
+            print(f"  Type: {entry['type'].upper()}")
+        if entry.get("note"):
+            print(f"  Comments: {entry['note']}")
+        print()
+
+    def pretty_print_export(self, query: Query, limit: int = None):
+        """Pretty print the exported entries selected by a dataset query"""
+        total = 0
+        for entry in query.entries():
+            total += 1
+            if not limit or total <= limit:
+                self._print_entry(entry)
+        if total == 0:
+            print("No matching entries.")
+        elif limit and total > limit:
+            print(f"... ({total - limit} more entries)")
+
+    def pretty_print_logbooks(self, logbook_files: Sequence[str], limit: int = None, since: Optional[str] = None,
+                              until: Optional[str] = None, entry_ids: Optional[List[str]] = None):
+        """Pretty print several logbooks in turn (limit applies per logbook)"""
+        for logbook_file in logbook_files:
+            self.pretty_print_logbook(logbook_file, limit, since, until, entry_ids)
+
+    def pretty_print_logbook(self, logbook_file: str, limit: int = None, since: Optional[str] = None,
+                             until: Optional[str] = None, entry_ids: Optional[List[str]] = None):
+        """Pretty print logbook entries with ID resolution.
+
+        Without filters, records are streamed and parsing stops once limit
+        entries have been printed. With date or entry filters, the cached
+        record index (see efa_parser.logbook_index) selects the matching
+        records and only those are parsed.
+        """
         print(f"\n=== Logbook: {Path(logbook_file).name} ===\n")
 
-        entries = root.findall(".//record")
-        if limit:
-            entries = entries[:limit]
-
-        for i, record in enumerate(entries):
-            entry_id = record.find("EntryId").text
-            date = record.find("Date").text
-
-            print(f"Entry {entry_id} - {date}")
-            print("-" * 40)
-
-            # Boat information
-            boat_id_elem = record.find("BoatId")
-            boat_variant_elem = record.find("BoatVariant")
-
-            if boat_id_elem is not None:
-                boat_id = boat_id_elem.text
-                variant = int(boat_variant_elem.text) if boat_variant_elem is not None else 1
-                boat_name = self._resolve_boat_name(boat_id, variant)
-                print(f"  Boat: {boat_name}")
-
-            # Crew information
-            crew = []
-
-            # Check for cox
-            cox_id_elem = record.find("CoxId")
-            if cox_id_elem is not None:
-                cox_name = self._resolve_person_name(cox_id_elem.text)
-                crew.append(f"Cox: {cox_name}")
-
-            # Check for crew members
-            for j in range(1, 20):
-                crew_elem = record.find(f"Crew{j}Id")
-                if crew_elem is not None:
-                    crew_name = self._resolve_person_name(crew_elem.text)
-                    crew.append(f"Crew{j}: {crew_name}")
-
-            if crew:
-                print(f"  Crew: {', '.join(crew)}")
-
-            # Times
-            start_time_elem = record.find("StartTime")
-            end_time_elem = record.find("EndTime")
-            if start_time_elem is not None and end_time_elem is not None:
-                start_time = start_time_elem.text.split(":", 2)[:2]
-                end_time = end_time_elem.text.split(":", 2)[:2]
-                print(f"  Time: {':'.join(start_time)} - {':'.join(end_time)}")
-
-            # Destination and distance
-            dest_id_elem = record.find("DestinationId")
-            if dest_id_elem is not None:
-                dest_name = self._resolve_destination_name(dest_id_elem.text)
-                print(f"  Destination: {dest_name}")
-
-            distance_elem = record.find("Distance")
-            if distance_elem is not None:
-                print(f"  Distance: {distance_elem.text}")
-
-            # Session type
-            session_type_elem = record.find("SessionType")
-            if session_type_elem is not None:
-                print(f"  Type: {session_type_elem.text}")
-
-            # Comments
-            comments_elem = record.find("Comments")
-            if comments_elem is not None:
-                print(f"  Comments: {comments_elem.text}")
-
-            print()
-
-            if limit and i >= limit - 1:
-                break
+        if since or until or entry_ids:
+            # Entries with unparseable dates (ordinal 0) never match a date filter
+            first = parse_date_ordinal(since) if since else 1
+            last = parse_date_ordinal(until) if until else float("inf")
+            wanted = set(entry_ids) if entry_ids else None
+            selected = [item for item in logbook_index(logbook_file)
+                        if (first <= item[1] <= last or not (since or until))
+                        and (wanted is None or item[0] in wanted)]
+            if not selected:
+                print("No matching entries.")
+            for record in read_logbook_records(logbook_file, selected[:limit] if limit else selected):
+                self._print_record(element_record(record))
+            total_entries = len(selected)
+        else:
+            for i, record in enumerate(iter_logbook_records(logbook_file)):
+                if limit and i >= limit:
+                    break
+                self._print_record(element_record(record))
+            total_entries = len(logbook_index(logbook_file)) if limit else 0
 
-        total_entries = len(root.findall(".//record"))
         if limit and total_entries > limit:
             print(f"... ({total_entries - limit} more entries)")
 
 
 def main():
     parser = argparse.ArgumentParser(description="View and edit EFA XML files")
-    parser.add_argument("--boats", required=True, help="Boats file (boats.efa2boats)")
-    parser.add_argument("--persons", required=True, help="Persons file (persons.efa2persons)")
+    parser.add_argument("--boats", help="Boats file (boats.efa2boats)")
+    parser.add_argument("--persons", help="Persons file (persons.efa2persons)")
     parser.add_argument("--destinations", help="Destinations file (destinations.efa2destinations)")
 
-    parser.add_argument("--logbook", help="Logbook file(s) to process (supports globs like '*.efa2logbook')")
+    parser.add_argument("--logbook", nargs="+", help="Logbook file(s) to process (supports globs like '*.efa2logbook')")
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes for scanning several logbooks (default: one per CPU)")
     parser.add_argument("--analyze-names", action="store_true", help="Analyze person names for duplicates and patterns")
+    parser.add_argument("--interactive", "-i", action="store_true",
+                        help="Load the data once and start a command shell (show, names, similar, reload)")
 
     # Options for logbook viewing
-    parser.add_argument("--limit", "-n", type=int, help="Limit number of entries to display")
+    parser.add_argument("--limit", "-n", type=int, help="Limit number of entries to display per logbook")
+    parser.add_argument("--since", help="Only show entries on or after this date (DD.MM.YYYY or YYYY-MM-DD)")
+    parser.add_argument("--until", help="Only show entries on or before this date (DD.MM.YYYY or YYYY-MM-DD)")
+    parser.add_argument("--entry", action="append", help="Only show the entry with this EntryId (repeatable)")
+
+    # Options for viewing an export (efa_importer.py output) instead of XML
+    parser.add_argument("--export", help="Show entries of this efa_importer.py export directory")
+    parser.add_argument("--person", action="append", default=[],
+                        help="With --export: only entries with this person (name or ID, repeatable)")
+    parser.add_argument("--boat", help="With --export: only entries with this boat (name or ID)")
+    parser.add_argument("--destination", help="With --export: only entries to this destination (name or ID)")
 
     # Options for name analysis
     parser.add_argument("--similarity-threshold", type=int, default=2, help="Edit distance threshold for similar names (default: 2)")
     parser.add_argument("--pattern", help="Regex pattern to match person names")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the parsed reference-data cache")
 
     args = parser.parse_args()
 
+    for date_arg in ("since", "until"):
+        value = getattr(args, date_arg)
+        if value and not parse_date_ordinal(value):
+            parser.error(f"--{date_arg}: invalid date '{value}' (expected DD.MM.YYYY or YYYY-MM-DD)")
+
+    if args.export:
+        dataset = EfaDataset(args.export)
+        viewer = EfaViewer()
+        viewer.load_export(dataset)
+        query = dataset.query()
+        if args.since or args.until:
+            query = query.between(args.since, args.until)
+        try:
+            for kind, values in (("person", args.person), ("boat", [args.boat] if args.boat else []),
+                                 ("dest", [args.destination] if args.destination else [])):
+                for value in values:
+                    query = query.named(kind, value)
+        except ValueError as e:
+            parser.error(str(e))
+        viewer.pretty_print_export(query, args.limit)
+        return
+
+    if not args.boats or not args.persons:
+        parser.error("--boats and --persons are required unless --export is given")
+    if args.person or args.boat or args.destination:
+        parser.error("--person, --boat and --destination require --export")
+
+    if args.no_cache:
+        set_cache_dir(None)
+
+    if args.interactive:
+        # Imported here: efa_shell builds on this module
+        from efa_shell import EfaShell
+        shell = EfaShell(EfaViewer(), args.boats, args.persons, args.destinations, args.logbook or [],
+                         args.similarity_threshold)
+        try:
+            shell.cmdloop()
+        except KeyboardInterrupt:
+            print()
+        return
+
     # Require at least one action
     if not args.logbook and not args.analyze_names:
         parser.error("Must specify either --logbook (to view) or --analyze-names (to analyze names), or both")
 
+    logbook_files = expand_globs(args.logbook) if args.logbook else []
+    if args.logbook and not logbook_files:
+        parser.error("No logbook files found")
+
     viewer = EfaViewer()
 
     print("Loading reference data...")
@@ -383,9 +548,9 @@ def main():
 
     if args.analyze_names:
         # If logbook is also specified, include it in the analysis
-        viewer.print_name_analysis(args.similarity_threshold, args.pattern, args.logbook)
-    elif args.logbook:
-        viewer.pretty_print_logbook(args.logbook, args.limit)
+        viewer.print_name_analysis(args.similarity_threshold, args.pattern, logbook_files, args.jobs)
+    elif logbook_files:
+        viewer.pretty_print_logbooks(logbook_files, args.limit, args.since, args.until, args.entry)
 
 
 if __name__ == "__main__":
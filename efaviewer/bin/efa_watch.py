@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Watch a directory for new EFA backups and import them as they arrive.
+
+Replaces the cron-driven import-local.sh poll: a long-running process waits
+for efaBackup_*.zip files (via inotify if the optional inotify_simple
+package is installed, by polling the directory otherwise), waits until an
+upload has finished, and runs the importer in-process, so that Python
+startup and module imports are not paid per backup. Each backup is
+unpacked to a new temporary directory; the parsed reference-data cache
+(efa_parser) is keyed by file name, so reference files that did not change
+since the previous backup cost a hash instead of a parse.
+
+A backup counts as complete once its size and mtime have not changed for
+--settle seconds and it reads as a valid zip. Backups whose SHA-256 is
+listed in the state file (default: <output>/.imported.json) are skipped,
+so re-uploads and restarts do not re-import. Only successful imports are
+listed there: a backup that failed (corrupt zip, importer error) is tried
+again when it changes or after a restart. A backup that disappears before
+it could be read is skipped. Output files are renamed into place when
+complete (see EfaImporter.export_json).
+
+--once imports the newest backup if new and exits; import-local.sh runs it
+from cron, so that both modes share the state file.
+
+Arguments after -- are passed to efa_importer.py; --boats, --persons,
+--destinations, --logbooks and --timestamp are filled in from the backup.
+
+Example:
+  efa_watch.py --backups /home/efa/backups -- --output app/data --max-distance 500 --plain --deltas
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import efa_importer
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Optional; fall back to polling
+    INotify = None
+
+logger = logging.getLogger(__name__)
+
+BACKUP_RE = re.compile(r"efaBackup.*\.zip$")
+TIMESTAMP_RE = re.compile(r"(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})")
+STATE_FILE = ".imported.json"
+# Hash of the last import, as written by import-local.sh before it used --once
+LEGACY_STATE_FILE = ".last-import.sha256"
+
+
+def backup_timestamp(name: str) -> Optional[str]:
+    """Return the ISO 8601 timestamp in an efaBackup_YYYYMMDD_HHMMSS.zip name."""
+    match = TIMESTAMP_RE.search(name)
+    if not match:
+        return None
+    y, mo, d, h, mi, s = match.groups()
+    return f"{y}-{mo}-{d}T{h}:{mi}:{s}"
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class BackupWatcher:
+    def __init__(self, backups: str, importer_args: List[str], state_file: Optional[str] = None,
+                 settle: float = 5.0, interval: float = 10.0, logbooks: str = "*.efa2logbook"):
+        self.backups = Path(backups)
+        self.importer_args = importer_args
+        self.logbooks = logbooks
+        # Parse once up front so that bad importer arguments fail at startup.
+        self.output = self.importer_namespace({"boats": "", "persons": "", "destinations": "", "logbooks": ""}).output
+        self.state_file = Path(state_file or Path(self.output) / STATE_FILE)
+        self.settle = settle
+        self.interval = interval
+        self.state: Dict[str, dict] = {}
+        if self.state_file.exists():
+            with open(self.state_file, encoding="utf-8") as f:
+                self.state = json.load(f)
+        else:
+            legacy = Path(self.output) / LEGACY_STATE_FILE
+            if legacy.exists():
+                self.state[legacy.read_text().strip()] = {"file": LEGACY_STATE_FILE}
+        # name -> (size, mtime_ns, time first seen with these)
+        self.pending: Dict[str, tuple] = {}
+        # name -> (size, mtime_ns) of the version last processed or ignored
+        self.done: Dict[str, tuple] = {}
+
+    def importer_namespace(self, files: Dict[str, str]) -> argparse.Namespace:
+        argv = list(self.importer_args)
+        for option, value in files.items():
+            argv += [f"--{option}", value]
+        return efa_importer.build_parser().parse_args(argv)
+
+    def signature(self, name: str) -> Optional[tuple]:
+        try:
+            st = (self.backups / name).stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def backup_names(self) -> List[str]:
+        return sorted(name for name in os.listdir(self.backups) if BACKUP_RE.search(name))
+
+    def save_state(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        tmp.replace(self.state_file)
+
+    def is_complete(self, name: str) -> bool:
+        """Return whether an upload has settled; call repeatedly while it has not."""
+        signature = self.signature(name)
+        if signature is None:
+            self.pending.pop(name, None)
+            return False
+        now = time.monotonic()
+        seen = self.pending.get(name)
+        if seen is None or seen[:2] != signature:
+            self.pending[name] = signature + (now,)
+            return False
+        if now - seen[2] < self.settle:
+            return False
+        # An incomplete upload lacks the zip's central directory.
+        return zipfile.is_zipfile(self.backups / name)
+
+    def process(self, name: str) -> bool:
+        """Import a complete backup unless it was imported before. Returns whether it was imported."""
+        self.pending.pop(name, None)
+        self.done[name] = self.signature(name)
+        path = self.backups / name
+        try:
+            digest = file_sha256(path)
+            if digest in self.state:
+                logger.info(f"{name}: already imported (as {self.state[digest]['file']}), skipping")
+                return False
+            start = time.perf_counter()
+            status = self.import_backup(path)
+        except FileNotFoundError:
+            # Removed or renamed between the scan and the read
+            logger.warning(f"{name}: disappeared before it could be imported, skipping")
+            return False
+        seconds = round(time.perf_counter() - start, 2)
+        if status != 0:
+            logger.error(f"{name}: import failed after {seconds}s")
+            return False
+        self.state[digest] = {
+            "file": name,
+            "imported": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "seconds": seconds,
+        }
+        self.save_state()
+        logger.info(f"{name}: import done in {seconds}s")
+        return True
+
+    def import_backup(self, path: Path) -> int:
+        with tempfile.TemporaryDirectory(prefix="efa-watch-") as tmp:
+            unzip_start = time.perf_counter()
+            try:
+                with zipfile.ZipFile(path) as archive:
+                    boats = [n for n in archive.namelist() if n.endswith("/boats.efa2boats")]
+                    if not boats:
+                        logger.error(f"{path.name}: no boats.efa2boats in backup")
+                        return 1
+                    archive.extractall(tmp)
+            except FileNotFoundError:
+                raise
+            except Exception as e:  # CRC error, truncated member, disk full, ...
+                logger.error(f"{path.name}: cannot extract backup: {e}")
+                return 1
+            unzip_seconds = time.perf_counter() - unzip_start
+            data = Path(tmp) / Path(boats[0]).parent
+            files = {
+                "boats": str(data / "boats.efa2boats"),
+                "persons": str(data / "persons.efa2persons"),
+                "destinations": str(data / "destinations.efa2destinations"),
+                "logbooks": str(data / self.logbooks),
+            }
+            timestamp = backup_timestamp(path.name)
+            if timestamp and "--timestamp" not in self.importer_args:
+                files["timestamp"] = timestamp
+            args = self.importer_namespace(files)
+            if args.metrics:
+                args.phase_time.append(f"unzip={unzip_seconds}")
+            if args.no_cache:
+                efa_importer.set_cache_dir(None)
+            if args.xml_backend:
+                efa_importer.set_xml_backend(args.xml_backend)
+            try:
+                return efa_importer.run(args)
+            except Exception:
+                logger.exception(f"{path.name}: import failed")
+                return 1
+
+    def scan(self):
+        """Import every settled new or changed backup; keep waiting for the others."""
+        for name in self.backup_names():
+            if self.done.get(name) != self.signature(name) and self.is_complete(name):
+                self.process(name)
+
+    def run(self, once: bool = False) -> int:
+        """Watch for backups; with once, import the newest backup if new and return 1 on failure."""
+        names = self.backup_names()
+        # At startup only the newest backup matters; older ones are superseded.
+        for name in names[:-1]:
+            self.done[name] = self.signature(name)
+        if once:
+            if not names:
+                logger.error(f"No efaBackup_*.zip in {self.backups}")
+                return 1
+            if not zipfile.is_zipfile(self.backups / names[-1]):
+                logger.error(f"{names[-1]}: not a valid zip (upload still in progress?)")
+                return 1
+            if file_sha256(self.backups / names[-1]) in self.state:
+                logger.info(f"{names[-1]}: already imported")
+                return 0
+            return 0 if self.process(names[-1]) else 1
+
+        inotify = None
+        if INotify is not None:
+            inotify = INotify()
+            inotify.add_watch(str(self.backups), flags.CLOSE_WRITE | flags.MOVED_TO)
+            logger.info(f"Watching {self.backups} (inotify)")
+        else:
+            logger.info(f"Watching {self.backups} (polling every {self.interval}s)")
+
+        while True:
+            self.scan()
+            if inotify is not None:
+                # Wake up on writes, and at least every settle period while
+                # uploads are pending.
+                timeout = self.settle if self.pending else None
+                inotify.read(timeout=None if timeout is None else int(timeout * 1000), read_delay=100)
+            else:
+                time.sleep(min(self.interval, self.settle) if self.pending else self.interval)
+
+
+def main():
+    argv = sys.argv[1:]
+    importer_args: List[str] = []
+    if "--" in argv:
+        i = argv.index("--")
+        argv, importer_args = argv[:i], argv[i + 1:]
+
+    parser = argparse.ArgumentParser(description="Watch a directory for new EFA backups and import them",
+                                     epilog="Arguments after -- are passed to efa_importer.py")
+    parser.add_argument("--backups", required=True, help="Directory receiving efaBackup_*.zip uploads")
+    parser.add_argument("--state", help=f"File listing imported backup hashes (default: <output>/{STATE_FILE})")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="Seconds a backup must stay unchanged before it is imported (default: 5)")
+    parser.add_argument("--interval", type=float, default=10.0,
+                        help="Polling interval in seconds without inotify (default: 10)")
+    parser.add_argument("--logbooks", default="*.efa2logbook",
+                        help="Logbook files to import, as a glob inside the backup's club directory "
+                             "(default: *.efa2logbook)")
+    parser.add_argument("--once", action="store_true", help="Import the newest backup if new, then exit")
+    parser.add_argument("--verbose", "-v", action="count", default=0, help="Increase verbosity")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(levelname)s: %(message)s")
+    watcher = BackupWatcher(args.backups, importer_args, args.state, args.settle, args.interval, args.logbooks)
+    try:
+        return watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
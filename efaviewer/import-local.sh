@@ -4,30 +4,37 @@
 # into $EFA_BACKUPS; the VM cron runs this. For the developer remote-pull
 # workflow, use import.sh instead.
 #
+# Usage: import-local.sh [--watch]
+#   --watch  keep running and import each new backup as soon as its upload
+#            has finished (bin/efa_watch.py), instead of one run per cron tick
+#
 # Overridable (defaults suit the VM):
 #   EFA_BACKUPS  dir holding efaBackup_*.zip   (default /home/efa/backups)
-#   EFA_OUTDIR   JSON output dir               (default <script-dir>/app/data)
+#   EFA_OUTDIR   JSON output dir               (default <script-dir>/app/data);
+#                the previous export there is diffed into the delta feed
+#                (manifest.json, deltas/). Each export goes to a new
+#                versions/<version>/ dir with content-hashed names and is
+#                switched to via current.json; serve versions/ with
+#                "Cache-Control: public, max-age=31536000, immutable"
+#   EFA_METRICS  if set, write import phase timings/resource usage (JSON) here
+#   EFA_EVENTS   if set, append the changes as events to this event log dir
 set -euo pipefail
 
 here="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 backups="${EFA_BACKUPS:-/home/efa/backups}"
 outdir="${EFA_OUTDIR:-$here/app/data}"
-club=BelvoirRC
-
-name="$(ls "$backups" 2>/dev/null | grep -E 'efaBackup.*zip' | tail -1 || true)"
-[[ -n "$name" ]] || { echo "import-local.sh: no efaBackup_*.zip in $backups" >&2; exit 1; }
 
-tmp="$(mktemp -d)"
-trap 'rm -rf "$tmp"' EXIT
+metrics=()
+[[ -n "${EFA_METRICS:-}" ]] && metrics+=(--metrics "$EFA_METRICS")
+events=()
+[[ -n "${EFA_EVENTS:-}" ]] && events+=(--events "$EFA_EVENTS")
 
-unzip -q "$backups/$name" -d "$tmp"
-data="$tmp/data/$club"
+# Both modes go through bin/efa_watch.py so that they share its record of
+# imported backups (<outdir>/.imported.json); a cron run imports the newest
+# backup unless it was already imported.
+once=(--once)
+[[ "${1:-}" == "--watch" ]] && once=()
 
 mkdir -p "$outdir"
-python3 "$here/bin/efa_importer.py" --max-distance 500 \
-  --boats "$data/boats.efa2boats" \
-  --persons "$data/persons.efa2persons" \
-  --destinations "$data/destinations.efa2destinations" \
-  --logbooks "$data/20*.efa2logbook" \
-  --output "$outdir"
-gunzip -kf "$outdir"/*.gz
+exec python3 "$here/bin/efa_watch.py" "${once[@]}" --backups "$backups" --logbooks "20*.efa2logbook" -- \
+  --max-distance 500 --plain --deltas --versioned --output "$outdir" "${metrics[@]}" "${events[@]}"
@@ -0,0 +1,54 @@
+#!/bin/bash
+# Round-trip test for efa_exporter.py: import a synthetic EFA backup, export
+# the result back to an EFA backup, import that again, and check that nothing
+# was lost on the way.
+# Synthetic data only -- no real club/member data.
+set -euo pipefail
+
+here="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+repo="$(cd "$here/.." && pwd)"
+
+tmp="$(mktemp -d)"
+trap 'rm -rf "$tmp"' EXIT
+export EFA_CACHE_DIR="$tmp/cache"
+
+import() {
+  local data="$1/data/BelvoirRC"
+  python3 "$repo/bin/efa_importer.py" --max-distance 5000 \
+    --boats "$data/boats.efa2boats" \
+    --persons "$data/persons.efa2persons" \
+    --destinations "$data/destinations.efa2destinations" \
+    --logbooks "$data/*.efa2logbook" \
+    --output "$2" > /dev/null 2>&1
+}
+
+python3 "$repo/bench/make_backup.py" --preset small --entries-per-year 300 --former-ratio 0.1 \
+  "$tmp/original.zip" > /dev/null
+unzip -q "$tmp/original.zip" -d "$tmp/original"
+import "$tmp/original" "$tmp/out1"
+
+python3 "$repo/bin/efa_exporter.py" --input "$tmp/out1" --output "$tmp/exported.zip" > /dev/null 2>&1
+unzip -q "$tmp/exported.zip" -d "$tmp/exported"
+import "$tmp/exported" "$tmp/out2"
+
+python3 - "$tmp" "$repo/bin" <<'PY'
+import gzip, json, sys, pathlib
+tmp = pathlib.Path(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+from efa_parser import parse_boats, parse_destinations, parse_persons, set_cache_dir
+set_cache_dir(None)
+
+for parse, name in ((parse_boats, "boats.efa2boats"), (parse_persons, "persons.efa2persons"),
+                    (parse_destinations, "destinations.efa2destinations")):
+    original = parse(str(tmp / "original/data/BelvoirRC" / name))
+    exported = parse(str(tmp / "exported/data/BelvoirRC" / name))
+    assert original == exported, (name, [(v, exported.get(k)) for k, v in original.items() if v != exported.get(k)][:2])
+
+for name in ("boats", "persons", "destinations", "logbooks", "search"):
+    with gzip.open(tmp / "out1" / f"{name}.json.gz", "rt", encoding="utf-8") as f:
+        first = json.load(f)
+    with gzip.open(tmp / "out2" / f"{name}.json.gz", "rt", encoding="utf-8") as f:
+        second = json.load(f)
+    assert first == second, name
+print("OK: export to EFA and re-import is lossless")
+PY
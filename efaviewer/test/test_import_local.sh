@@ -9,6 +9,7 @@ repo="$(cd "$here/.." && pwd)"
 
 tmp="$(mktemp -d)"
 trap 'rm -rf "$tmp"' EXIT
+export EFA_CACHE_DIR="$tmp/cache"
 
 club="$tmp/src/data/BelvoirRC"
 mkdir -p "$club"
@@ -77,20 +78,24 @@ with zipfile.ZipFile(zippath, "w", zipfile.ZIP_DEFLATED) as z:
 PY
 
 out="$tmp/out"
+export EFA_EVENTS="$tmp/events"
 EFA_BACKUPS="$fromdir" EFA_OUTDIR="$out" "$repo/import-local.sh"
 
-for f in boats persons destinations logbooks; do
-  [[ -s "$out/$f.json" ]]    || { echo "FAIL: $f.json missing/empty" >&2; exit 1; }
-  [[ -s "$out/$f.json.gz" ]] || { echo "FAIL: $f.json.gz missing/empty" >&2; exit 1; }
-done
-
-python3 - "$out" <<'PY'
+python3 - "$out" "$repo/bin" <<'PY'
 import json, sys, pathlib
 out = pathlib.Path(sys.argv[1])
-boats = json.loads((out/"boats.json").read_text())
-persons = json.loads((out/"persons.json").read_text())
-dests = json.loads((out/"destinations.json").read_text())
-logs = json.loads((out/"logbooks.json").read_text())
+sys.path.insert(0, sys.argv[2])
+from efa_publish import load_pointer, resolve
+from efa_search import SearchIndex, build_search_index, entry_texts
+pointer = load_pointer(out)
+assert sorted(pointer["files"]) == [f"{f}.json" for f in ("boats", "crewpairs", "destinations", "logbooks", "occupancy", "persons", "search")], pointer
+for f in pointer["files"]:
+    for name in (f, f + ".gz"):
+        assert resolve(out, name).stat().st_size > 0, name
+boats = json.loads(resolve(out, "boats.json").read_text())
+persons = json.loads(resolve(out, "persons.json").read_text())
+dests = json.loads(resolve(out, "destinations.json").read_text())
+logs = json.loads(resolve(out, "logbooks.json").read_text())
 assert len(boats) == 1, boats
 assert len(persons) == 1, persons
 assert len(dests) == 1, dests
@@ -100,5 +105,337 @@ assert e["boat"] == "11111111-1111-1111-1111-111111111111-v1", e
 assert e["crew"] == ["22222222-2222-2222-2222-222222222222"], e
 assert e["dest"] == "33333333-3333-3333-3333-333333333333", e
 assert e["dist"] == 10, e
+search = SearchIndex.load(resolve(out, "search.json"))
+assert search.search("test rower") == [0], search.terms
+assert search.search("lak") == [0], search.terms
+assert search.search("nobody") == [], search.terms
+# Quoted phrases match words in order within one field
+by_id = lambda records: {record["id"]: record for record in records}
+fields = lambda i: entry_texts(logs[i], by_id(boats), by_id(persons), by_id(dests))
+assert search.search('"test row"', fields) == [0]
+assert search.search('"rower test"', fields) == []
+assert search.search('"rower test"') == [0]  # Without the fields, only the tokens are checked
+assert search.search('"boat test"', fields) == []
+# ... including the comment, which is indexed as well
+noted = [dict(e, note="Morgenrot über dem See")]
+noted_search = SearchIndex(build_search_index(noted, by_id(boats), by_id(persons), by_id(dests)))
+noted_fields = lambda i: entry_texts(noted[i], by_id(boats), by_id(persons), by_id(dests))
+assert noted_search.search('"uber dem s"', noted_fields) == [0]
+assert noted_search.search('"dem uber"', noted_fields) == []
 print("OK: import-local.sh produced valid JSON")
 PY
+
+# A newer backup with one more entry: the second run must publish a delta
+# that turns the first export into the second. out1 keeps the first export
+# unversioned, as a merge state.
+import_club() {
+  python3 "$repo/bin/efa_importer.py" --max-distance 500 --plain --deltas --output "$1" \
+    --boats "$club/boats.efa2boats" \
+    --persons "$club/persons.efa2persons" \
+    --destinations "$club/destinations.efa2destinations" \
+    --logbooks "$club/*.efa2logbook" > /dev/null 2>&1
+}
+import_club "$tmp/out1"
+python3 - "$club/2024.efa2logbook" <<'PY'
+import sys
+path = sys.argv[1]
+with open(path, encoding="utf-8") as f:
+    xml = f.read()
+xml = xml.replace("</data>", """  <record>
+    <EntryId>2</EntryId>
+    <Date>16.06.2024</Date>
+    <BoatName>Guest Boat</BoatName>
+    <Crew1Id>22222222-2222-2222-2222-222222222222</Crew1Id>
+    <DestinationId>33333333-3333-3333-3333-333333333333</DestinationId>
+    <Distance>10 km</Distance>
+  </record>
+</data>""")
+with open(path, "w", encoding="utf-8") as f:
+    f.write(xml)
+PY
+python3 - "$tmp/src" "$fromdir/efaBackup_20240616_000000.zip" <<'PY'
+import sys, zipfile, os
+src, zippath = sys.argv[1], sys.argv[2]
+with zipfile.ZipFile(zippath, "w", zipfile.ZIP_DEFLATED) as z:
+    for root, _, files in os.walk(src):
+        for f in files:
+            full = os.path.join(root, f)
+            z.write(full, os.path.relpath(full, src))
+PY
+EFA_BACKUPS="$fromdir" EFA_OUTDIR="$out" "$repo/import-local.sh"
+
+# Each run unpacks to a new temporary directory; the parsed reference files
+# still keep one cache entry each.
+python3 - "$EFA_CACHE_DIR" "$repo/bin" <<'PY'
+import os, sys, pathlib
+entries = sorted(p.name for p in pathlib.Path(sys.argv[1]).glob("*.pickle"))
+assert entries == ["parse_boats-boats.efa2boats.pickle", "parse_destinations-destinations.efa2destinations.pickle",
+                   "parse_persons-persons.efa2persons.pickle"], entries
+
+# A file of the same name, size and mtime elsewhere is not taken for the cached one.
+sys.path.insert(0, sys.argv[2])
+from efa_parser import load_cached
+tmp = pathlib.Path(sys.argv[1]).parent
+for name, text in (("a", "first"), ("b", "other")):
+    (tmp / name).mkdir()
+    (tmp / name / "same.txt").write_text(text)
+    os.utime(tmp / name / "same.txt", ns=(0, 0))
+read = lambda path: pathlib.Path(path).read_text()
+assert [load_cached(str(tmp / name / "same.txt"), "read", read) for name in "aba"] == ["first", "other", "first"]
+print("OK: reference-data cache keeps one entry per file")
+PY
+
+# The same backup again is recognized by its hash and not re-imported.
+EFA_BACKUPS="$fromdir" EFA_OUTDIR="$out" "$repo/import-local.sh" 2>&1 | grep -q "already imported" ||
+  { echo "FAIL: unchanged backup was imported again" >&2; exit 1; }
+
+# A newer backup that cannot be extracted fails the run without killing the
+# importer, and is not recorded as imported.
+python3 - "$fromdir/efaBackup_20240616_000000.zip" "$fromdir/efaBackup_20240617_000000.zip" <<'PY'
+import sys
+data = bytearray(open(sys.argv[1], "rb").read())
+data[100] ^= 0xFF  # inside the first member's compressed data: CRC error on extraction
+open(sys.argv[2], "wb").write(data)
+PY
+if EFA_BACKUPS="$fromdir" EFA_OUTDIR="$out" "$repo/import-local.sh" 2> "$tmp/corrupt.log"; then
+  echo "FAIL: corrupt backup imported" >&2; exit 1
+fi
+grep -q "cannot extract backup" "$tmp/corrupt.log" || { cat "$tmp/corrupt.log" >&2; exit 1; }
+grep -q "efaBackup_20240617_000000" "$out/.imported.json" && { echo "FAIL: failed import recorded" >&2; exit 1; }
+rm "$fromdir/efaBackup_20240617_000000.zip"
+
+python3 - "$tmp/out1" "$out" "$repo/bin" <<'PY'
+import json, sys, pathlib
+old, out = sys.argv[1], pathlib.Path(sys.argv[2])
+sys.path.insert(0, sys.argv[3])
+from efa_delta import apply_delta, load_delta, load_export
+manifest = json.loads((out/"manifest.json").read_text())
+assert manifest["version"] == 2 and manifest["base"] == 1, manifest
+[link] = manifest["deltas"]
+delta = load_delta(out, link["file"])
+assert [item["record"]["id"] for item in delta["changes"]["logbooks"]["added"]] == ["2024:2"], delta
+assert apply_delta(load_export(old), delta) == load_export(out)
+print("OK: delta feed reproduces the new export")
+
+# Without a previous export the chain starts anew and its deltas are deleted.
+import shutil
+from efa_delta import publish_delta
+reset = out.parent / "reset"
+shutil.copytree(out, reset)
+assert publish_delta(reset, None, load_export(reset)) == {"version": 3, "base": 3, "deltas": []}
+assert not list((reset / "deltas").iterdir())
+# So does it when an entry ID is used twice: a delta could not address the entries.
+dirty = load_export(reset)
+entry = next(entry for entry in dirty["logbooks"] if "id" in entry)
+dirty["logbooks"].append(dict(entry, dist=99))
+assert publish_delta(reset, load_export(reset), dirty) == {"version": 4, "base": 4, "deltas": []}
+from efa_delta import apply_changes
+try:
+    apply_changes(dirty["logbooks"], {"removed": [entry["id"]]})
+    raise AssertionError("duplicate entry IDs accepted")
+except ValueError:
+    pass
+
+from efa_publish import load_pointer
+pointer = load_pointer(out)
+assert pointer["deltas"] == manifest, pointer
+assert len(list((out/"versions").iterdir())) == 2
+
+from efa_events import EventLog, KINDS
+log = EventLog(out.parent / "events")
+events = list(log.read())
+assert [e["ts"] for e in events[-1:]] == ["2024-06-16T00:00:00"], events
+assert [(e["op"], e["kind"]) for e in events if e["ts"] == "2024-06-16T00:00:00"] == \
+    [("create", "boat"), ("create", "outing")], events
+state, _ = log.replay()
+export = load_export(out)
+for name, kind in KINDS.items():
+    assert list(state[kind].values()) == export[name], kind
+
+# An append cut short leaves half an event: replay skips it, the next append cuts it off.
+cut = EventLog(out.parent / "events-cut")
+shutil.copytree(log.path, cut.path, dirs_exist_ok=True)
+last_seq = cut.last_seq()
+with open(cut.segments()[-1], "a", encoding="utf-8") as f:
+    f.write('{"seq": %d, "ts": "2024-06-17T00:00:00", "op": "del' % (last_seq + 1))
+assert cut.replay() == (state, last_seq) and cut.last_seq() == last_seq
+assert cut.append([("delete", "boat", "b0", None)], "2024-06-17T00:00:00") == 1
+assert [e["seq"] for e in cut.read(after=last_seq)] == [last_seq + 1]
+print("OK: event log replays to the new export")
+PY
+
+# Merging the newer backup into the first export must give the second one,
+# derived files included.
+import_club "$tmp/out2"
+python3 "$repo/bin/efa_merge.py" --max-distance 500 --state "$tmp/out1" --conflicts "$tmp/conflicts.json" \
+  --boats "$club/boats.efa2boats" \
+  --persons "$club/persons.efa2persons" \
+  --destinations "$club/destinations.efa2destinations" \
+  --logbooks "$club/*.efa2logbook"
+python3 - "$tmp/out1" "$tmp/out2" "$out" "$tmp/conflicts.json" "$repo/bin" <<'PY'
+import gzip, json, sys, pathlib
+sys.path.insert(0, sys.argv[5])
+from efa_delta import load_delta, load_export
+merged, expected = pathlib.Path(sys.argv[1]), pathlib.Path(sys.argv[2])
+assert load_export(merged) == load_export(sys.argv[3])
+for path in expected.glob("*.json.gz"):
+    plain = path.with_suffix("")
+    assert gzip.decompress((merged / path.name).read_bytes()) == gzip.decompress(path.read_bytes()), path.name
+    assert (merged / plain.name).read_text() == plain.read_text(), plain.name
+assert not list(merged.glob("*.tmp")), list(merged.glob("*.tmp"))
+manifest = json.loads((merged / "manifest.json").read_text())
+[link] = manifest["deltas"]
+assert manifest["version"] == 2 and link["from"] == 1, manifest
+delta = load_delta(merged, link["file"])
+assert [item["record"]["id"] for item in delta["changes"]["logbooks"]["added"]] == ["2024:2"], delta
+result = json.load(open(sys.argv[4]))
+assert result["conflicts"] == [], result
+assert result["stats"]["logbooks"]["added"] == 1, result
+print("OK: merge reproduces the new export")
+
+# An entry added in the middle of the backup keeps its place, and the search
+# postings (entry positions) follow it.
+from efa_importer import EfaImporter
+from efa_merge import JsonState, merge
+from efa_search import SearchIndex
+def entry(no, note):
+    return {"id": f"2024:{no}", "year": 2024, "date": "2024-06-15", "crew": [], "note": note}
+def export(path, logbooks):
+    importer = EfaImporter(max_distance=0)
+    importer.load_collections({"boats": [], "persons": [], "destinations": [], "logbooks": logbooks})
+    importer.export_json(path, plain=True)
+    return importer.collections()
+before = [entry(1, "first"), entry(3, "third")]
+after = [entry(1, "first"), entry(2, "second"), entry(3, "third")]
+state_dir, fresh_dir = merged.parent / "order1", merged.parent / "order2"
+merge(JsonState(state_dir), export(state_dir, before))
+merge(JsonState(state_dir), export(fresh_dir, after))
+for name in ("logbooks.json", "search.json"):
+    assert (state_dir / name).read_text() == (fresh_dir / name).read_text(), name
+assert SearchIndex.load(state_dir / "search.json").search("second") == [1]
+print("OK: merge keeps the backup order")
+PY
+
+# Overlapping outings are flagged and counted in the occupancy tables.
+python3 - "$repo/bin" <<'PY'
+import sys
+sys.path.insert(0, sys.argv[1])
+from efa_intervals import build_occupancy, day_intervals, find_overlaps
+from efa_store import LogbookStore
+store = LogbookStore()
+for boat, crew, t0, t1 in (("b1", ["p1"], "08:00", "09:30"),
+                           ("b2", ["p2"], "09:00", "10:00"),
+                           ("b1", ["p3"], "09:15", "10:00"),   # b1 still out
+                           ("b3", ["p2"], "10:00", "11:00")):  # touches, no overlap
+    store.append({"year": 2024, "date": "15.06.2024", "t0": t0, "t1": t1, "boat": boat, "crew": crew})
+days = day_intervals(store)
+boat_overlaps, person_overlaps = find_overlaps(store, days)
+assert [(store.strings[h], i, j) for h, i, j in boat_overlaps] == [("b1", 0, 2)], boat_overlaps
+assert person_overlaps == [], person_overlaps
+# Two variants of one boat are the same hull.
+variants = LogbookStore()
+for boat, t0, t1 in (("b9-v1", "08:00", "09:00"), ("b9-v2", "08:30", "09:30"), ("b8-v2", "08:45", "09:15")):
+    variants.append({"year": 2024, "date": "15.06.2024", "t0": t0, "t1": t1, "boat": boat, "crew": []})
+oids = {"b9-v1": "b9", "b9-v2": "b9", "b8-v2": "b8"}
+overlaps, _ = find_overlaps(variants, day_intervals(variants), oids)
+assert [(variants.strings[h], i, j) for h, i, j in overlaps] == [("b9-v2", 0, 1)], overlaps
+assert find_overlaps(variants, day_intervals(variants)) == ([], []), "variant IDs compared without oids"
+occupancy = build_occupancy(store, days)
+table = occupancy["days"]
+assert table["date"] == ["15.06.2024"] and table["weekday"] == [5] and table["peak"] == [3], table
+assert table["first"] == [32] and table["slots"] == [[1, 1, 1, 1, 2, 3, 2, 2, 1, 1, 1, 1]], table
+assert occupancy["weekdays"]["peak"][5] == 3 and occupancy["weekdays"]["days"][5] == 1, occupancy
+print("OK: interval index finds overlaps and occupancy")
+PY
+
+# Crew pairs are counted once per outing and year, open outings left out.
+python3 - "$repo/bin" <<'PY'
+import sys
+sys.path.insert(0, sys.argv[1])
+from efa_crewpairs import build_crew_pairs
+from efa_store import LogbookStore
+store = LogbookStore()
+for year, crew, dist, extra in ((2023, ["p2", "p1"], 10, {}),
+                                (2024, ["p1", "p2", "p3"], 8, {}),
+                                (2024, ["p2", "p1"], 5, {}),
+                                (2024, ["p1", "p3"], 7, {"open": True})):
+    store.append({"year": year, "date": f"01.05.{year}", "crew": crew, "dist": dist, **extra})
+pairs = build_crew_pairs(store)
+assert pairs["persons"] == ["p1", "p2", "p3"], pairs
+edges = pairs["edges"]
+assert list(zip(edges["a"], edges["b"], edges["year"], edges["count"], edges["km"])) == \
+    [(0, 1, 2023, 1, 10), (0, 1, 2024, 2, 13), (0, 2, 2024, 1, 8), (1, 2, 2024, 1, 8)], edges
+print("OK: crew pairs edge list")
+PY
+
+# The NumPy export is valid .npy (checked without NumPy, and with it if installed).
+python3 - "$repo/bin" "$tmp/npy" <<'PY'
+import ast, struct, sys
+from array import array
+sys.path.insert(0, sys.argv[1])
+from efa_npy import export_npy
+from efa_store import LogbookStore
+store = LogbookStore()
+store.append({"year": 2024, "date": "15.06.2024", "t0": "08:30", "t1": "10:00", "boat": "b1",
+              "crew": ["p2", "p1"], "dest": "d1", "dist": 12})
+store.append({"year": 2024, "date": "16.06.2024", "crew": ["p1"], "dist": 5})
+export_npy(store, ["b0", "b1"], ["p1", "p2"], ["d1"], sys.argv[2])
+
+def read_npy(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data[:8] == b"\x93NUMPY\x01\x00", data[:8]
+    (length,) = struct.unpack("<H", data[8:10])
+    assert (10 + length) % 64 == 0 and data[9 + length:10 + length] == b"\n"
+    header = ast.literal_eval(data[10:10 + length].decode("latin1"))
+    typecode = {"<i2": "h", "<i4": "i", "<u4": "I"}[header["descr"]]
+    values = array(typecode, data[10 + length:])
+    assert header["shape"] == (len(values),) and not header["fortran_order"], header
+    return list(values)
+
+npy = sys.argv[2]
+assert read_npy(f"{npy}/day.npy") == [739052, 739053]
+assert read_npy(f"{npy}/t0.npy") == [510, -1] and read_npy(f"{npy}/t1.npy") == [600, -1]
+assert read_npy(f"{npy}/boat.npy") == [1, -1] and read_npy(f"{npy}/dest.npy") == [0, -1]
+assert read_npy(f"{npy}/dist.npy") == [12, 5]
+assert read_npy(f"{npy}/crew_offsets.npy") == [0, 2, 3] and read_npy(f"{npy}/crew_members.npy") == [1, 0, 0]
+try:
+    import numpy
+except ImportError:
+    numpy = None
+if numpy is not None:
+    from efa_npy import LogbookArrays
+    log = LogbookArrays(npy)
+    assert len(log) == 2 and list(log.crew(0)) == [1, 0] and int(log.dist.sum()) == 17
+    assert str(log.dates()[0]) == "2024-06-15"
+print("OK: NumPy export")
+PY
+
+# Dataset queries use the indexes and agree with a scan of the export.
+python3 - "$out" "$repo/bin" <<'PY'
+import sys
+sys.path.insert(0, sys.argv[2])
+from efa_dataset import EfaDataset
+dataset = EfaDataset(sys.argv[1])
+[person] = dataset.find("person", "test rower")
+assert dataset.query().person(person).count() == 2
+query = dataset.query().person(person).named("boat", "Guest Boat").between("16.06.2024", "2024-06-30")
+assert [entry["id"] for entry in query.entries()] == ["2024:2"], query.filters
+assert dataset.query().years(2024).group_by("dest") == {"33333333-3333-3333-3333-333333333333": [2, 20]}
+assert dataset.query().years(2023).count() == 0
+try:
+    dataset.query().named("boat", "Nonexistent")
+    raise AssertionError("unknown boat accepted")
+except ValueError:
+    pass
+
+# A dataset keeps reading the version that was current when it was opened.
+import json, pathlib, shutil
+copy = pathlib.Path(sys.argv[1]).parent / "pinned"
+shutil.copytree(sys.argv[1], copy)
+dataset = EfaDataset(str(copy))
+pointer = json.loads((copy / "current.json").read_text())
+(copy / "current.json").write_text(json.dumps(dict(pointer, files={k: "versions/gone/" + k for k in pointer["files"]})))
+assert dataset.query().person(person).count() == 2
+print("OK: dataset queries")
+PY
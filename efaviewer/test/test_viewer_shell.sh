@@ -0,0 +1,130 @@
+#!/bin/bash
+# Test for the interactive viewer shell (efa_viewer.py --interactive): its
+# commands must print what the one-shot viewer prints, the similarity index
+# must find the same clusters as comparing all pairs, and reload must reread
+# only the files that changed on disk.
+# Synthetic data only -- no real club/member data.
+set -euo pipefail
+
+here="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+repo="$(cd "$here/.." && pwd)"
+
+tmp="$(mktemp -d)"
+trap 'rm -rf "$tmp"' EXIT
+export EFA_CACHE_DIR="$tmp/cache"
+
+python3 "$repo/bench/make_backup.py" --preset small --entries-per-year 300 --former-ratio 0.1 \
+  "$tmp/backup.zip" > /dev/null
+unzip -q "$tmp/backup.zip" -d "$tmp/backup"
+
+python3 - "$tmp/backup/data/BelvoirRC" "$repo/bin" <<'PY'
+import contextlib, io, itertools, os, re, shlex, subprocess, sys, pathlib
+data = pathlib.Path(sys.argv[1])
+bin_dir = sys.argv[2]
+sys.path.insert(0, bin_dir)
+from efa_parser import levenshtein_distance, normalize_name
+from efa_shell import EfaShell
+from efa_viewer import EfaViewer
+
+reference = ["--boats", str(data / "boats.efa2boats"), "--persons", str(data / "persons.efa2persons"),
+             "--destinations", str(data / "destinations.efa2destinations")]
+logbooks = str(data / "*.efa2logbook")
+
+def run_shell(shell, line):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        shell.onecmd(line)
+    return out.getvalue()
+
+with contextlib.redirect_stdout(io.StringIO()):
+    shell = EfaShell(EfaViewer(), str(data / "boats.efa2boats"), str(data / "persons.efa2persons"),
+                     str(data / "destinations.efa2destinations"), [logbooks])
+years = sorted(p.name.split(".")[0] for p in data.glob("*.efa2logbook"))
+
+# show prints what efa_viewer.py --logbook prints
+for args in (["--limit", "5"], ["--since", f"01.06.{years[-1]}", "--until", f"15.06.{years[-1]}"],
+             ["--entry", "3", "--entry", "17"], ["--since", "01.01.1990", "--until", "31.12.1990", "-n", "2"]):
+    cli = subprocess.run([sys.executable, f"{bin_dir}/efa_viewer.py", *reference, "--logbook", logbooks, *args],
+                         capture_output=True, text=True, check=True).stdout
+    cli = cli[cli.index("\n\n") + 1:]  # Skip the "Loading"/"Loaded" lines
+    assert run_shell(shell, "show " + " ".join(args)) == cli, args
+assert "=== Logbook" not in run_shell(shell, "show --logbook nosuchyear")
+assert "error" in run_shell(shell, "show --since yesterday")
+assert "error" in run_shell(shell, "show --bogus")
+assert "error" in run_shell(shell, "names --pattern '('")
+
+# The symmetric-delete index finds the clusters of the all-pairs comparison
+def brute_force(items, threshold):
+    normalized = [normalize_name(name) for _, name in items]
+    threshold_distance = lambda i, j: levenshtein_distance(normalized[i], normalized[j], threshold)
+    clusters, processed = [], set()
+    for i, (id1, name1) in enumerate(items):
+        if id1 in processed:
+            continue
+        cluster = [(id1, name1, 0)]
+        processed.add(id1)
+        for j, (id2, name2) in enumerate(items):
+            if i != j and id2 not in processed:
+                distance = threshold_distance(i, j)
+                if distance <= threshold:
+                    cluster.append((id2, name2, distance))
+                    processed.add(id2)
+        if len(cluster) > 1:
+            clusters.append(cluster)
+    return clusters
+
+viewer = shell.viewer
+for source in ("persons", "logbook"):
+    items = shell.names(source)
+    assert items, source
+    for threshold in (3, 0, 1, 2):
+        index = shell.similar_index(source, threshold)
+        if source == "persons":
+            clusters = viewer._find_similar_names_generic(items, threshold, index)
+            expected = brute_force(items, threshold)
+        else:
+            # Logbook names are clustered by name, not by where they were first seen
+            clusters = viewer._find_similar_logbook_names(items, threshold, index)
+            expected = [[(name, source, d) for source, name, d in cluster]
+                        for cluster in brute_force([(source, name) for name, source in items], threshold)]
+        assert list(clusters.values()) == expected, (source, threshold)
+        assert clusters, (source, threshold)
+    assert shell.similar_index(source, 1).max_distance == 3  # Reused, not rebuilt
+assert "Total clusters" in run_shell(shell, "similar --threshold 1")
+# names --logbook matches the names written in the logbooks, not where they were first seen
+name, _ = max(shell.names("logbook"))
+output = run_shell(shell, f"names --pattern {shlex.quote('^' + re.escape(name) + '$')} --logbook")
+assert f"  {name}\n" in output and "Total matches: 0" not in output, output
+assert "Total matches: 0" in run_shell(shell, "names --pattern '^Entry ' --logbook")
+
+# reload rereads only changed, new and removed files
+assert "No files changed." in run_shell(shell, "reload")
+first, second, last = (str(data / f"{year}.efa2logbook") for year in years)
+kept = shell.logbooks[second]
+text = pathlib.Path(first).read_text(encoding="utf-8")
+pathlib.Path(first).write_text(text.replace("<EntryId>1</EntryId>", "<EntryId>100001</EntryId>", 1), encoding="utf-8")
+os.remove(last)
+output = run_shell(shell, "reload")
+assert f"reloaded {first}\n" in output and f"reloaded {last} (removed)" in output, output
+assert second not in output and "persons.efa2persons" not in output, output
+assert shell.logbooks[second] is kept and list(shell.logbooks) == [first, second]
+assert "Entry 100001 -" in run_shell(shell, "show --entry 100001")
+assert "No files changed." in run_shell(shell, "reload")
+
+# A half-written file is reported; the loaded version stays until it is complete
+complete = pathlib.Path(first).read_text(encoding="utf-8")
+loaded, persons = shell.logbooks[first], shell.viewer.persons
+pathlib.Path(first).write_text(complete[:len(complete) // 2], encoding="utf-8")
+persons_file = data / "persons.efa2persons"
+persons_text = persons_file.read_text(encoding="utf-8")
+persons_file.write_text(persons_text[:len(persons_text) // 2], encoding="utf-8")
+output = run_shell(shell, "reload")
+assert f"Warning: cannot read {first}" in output and f"Warning: cannot read {persons_file}" in output, output
+assert shell.logbooks[first] is loaded and shell.viewer.persons is persons
+pathlib.Path(first).write_text(complete, encoding="utf-8")
+persons_file.write_text(persons_text, encoding="utf-8")
+output = run_shell(shell, "reload")
+assert f"reloaded {first}\n" in output and f"reloaded {persons_file}\n" in output, output
+assert "error" in run_shell(shell, "similar --threshold 99")
+print("OK: viewer shell")
+PY
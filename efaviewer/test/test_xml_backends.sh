@@ -0,0 +1,93 @@
+#!/bin/bash
+# Parity test for the XML backends of efa_parser: every backend must yield
+# the same records as the ElementTree reference, and importing a synthetic
+# backup must give identical boats, persons, destinations and logbook
+# entries with each of them.
+# Synthetic data only -- no real club/member data.
+set -euo pipefail
+
+here="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+repo="$(cd "$here/.." && pwd)"
+
+tmp="$(mktemp -d)"
+trap 'rm -rf "$tmp"' EXIT
+export EFA_CACHE_DIR="$tmp/cache"
+
+python3 "$repo/bench/make_backup.py" --preset small --entries-per-year 300 --former-ratio 0.1 \
+  "$tmp/backup.zip" > /dev/null
+unzip -q "$tmp/backup.zip" -d "$tmp/backup"
+data="$tmp/backup/data/BelvoirRC"
+
+backends="$(python3 -c "import sys; sys.path.insert(0, '$repo/bin'); from efa_parser import XML_BACKENDS; print(*XML_BACKENDS)")"
+for backend in $backends; do
+  python3 "$repo/bin/efa_importer.py" --max-distance 5000 --no-cache --xml-backend "$backend" \
+    --boats "$data/boats.efa2boats" \
+    --persons "$data/persons.efa2persons" \
+    --destinations "$data/destinations.efa2destinations" \
+    --logbooks "$data/*.efa2logbook" \
+    --output "$tmp/out-$backend" > /dev/null 2>&1
+done
+
+python3 - "$tmp" "$repo/bin" $backends <<'PY'
+import gzip, io, json, sys, pathlib
+tmp = pathlib.Path(sys.argv[1])
+sys.path.insert(0, sys.argv[2])
+backends = sys.argv[3:]
+import efa_parser
+from efa_parser import iter_records, parse_boats, parse_destinations, parse_persons, set_cache_dir, set_xml_backend
+set_cache_dir(None)
+assert "etree" in backends and "expat" in backends, backends
+
+# Edge cases: entities, CDATA, empty and self-closing elements, whitespace,
+# comments, repeated and nested tags, non-ASCII text split across blocks.
+edge = """<?xml version="1.0" encoding="UTF-8"?>
+<efa><!-- header --><header><type>Logbook</type></header>
+<data>
+<record><EntryId>1</EntryId><Comments>Fish &amp; chips &lt;3 &#228;</Comments><Open/><Empty></Empty></record>
+<record>
+  <EntryId> 2 </EntryId>
+  <Comments><![CDATA[<raw> & text]]></Comments><!-- c -->
+  <Crew1Name>Zoë Åström</Crew1Name><Crew1Name>second</Crew1Name>
+  <Nested>before<inner>x</inner>after</Nested>
+</record>
+<record><Space> </Space></record>
+</data></efa>
+""".encode("utf-8")
+reference = list(iter_records(io.BytesIO(edge), "etree"))
+assert reference[0] == {"EntryId": "1", "Comments": "Fish & chips <3 ä", "Open": None, "Empty": None}, reference[0]
+assert reference[1]["Crew1Name"] == "Zoë Åström" and reference[1]["Nested"] == "before", reference[1]
+efa_parser.EXPAT_BLOCK_SIZE = 7
+for backend in backends:
+    assert list(iter_records(io.BytesIO(edge), backend)) == reference, backend
+efa_parser.EXPAT_BLOCK_SIZE = 1 << 16
+
+data = tmp / "backup/data/BelvoirRC"
+for name in sorted(p.name for p in data.iterdir()):
+    reference = list(iter_records(str(data / name), "etree"))
+    assert reference, name
+    for backend in backends:
+        assert list(iter_records(str(data / name), backend)) == reference, (backend, name)
+
+for parse, name in ((parse_boats, "boats.efa2boats"), (parse_persons, "persons.efa2persons"),
+                    (parse_destinations, "destinations.efa2destinations")):
+    results = {}
+    for backend in backends:
+        set_xml_backend(backend)
+        results[backend] = parse(str(data / name))
+    assert all(result == results["etree"] for result in results.values()), name
+
+for name in ("boats", "persons", "destinations", "logbooks"):
+    exports = {}
+    for backend in backends:
+        with gzip.open(tmp / f"out-{backend}" / f"{name}.json.gz", "rt", encoding="utf-8") as f:
+            exports[backend] = json.load(f)
+    assert exports["etree"], name
+    assert all(export == exports["etree"] for export in exports.values()), name
+
+try:
+    set_xml_backend("sax")
+    raise AssertionError("unknown backend accepted")
+except ValueError:
+    pass
+print(f"OK: XML backends agree ({', '.join(backends)})")
+PY
@@ -4,9 +4,8 @@ import csv
 import sys
 
 # pylint: disable=redefined-outer-name
-def find_fastest_interval(csv_file, target_distance):
-    '''Returns position and duration of fastest interval of distance in file.'''
-    # Read the CSV file
+def read_log(csv_file):
+    '''Returns the (index, time, distance) rows of a log CSV file.'''
     with open(csv_file, mode='r', encoding="utf-8") as f:
         reader = csv.reader(f)
         data, header = [], True
@@ -18,6 +17,16 @@ def find_fastest_interval(csv_file, target_distance):
             time = float(row[1])
             distance = float(row[2])
             data.append((index, time, distance))
+    return data
+
+def format_time(seconds):
+    '''Formats seconds as m:ss.s.'''
+    minutes = int(seconds/60)
+    return f"{minutes}:{seconds - minutes * 60:04.1f}"
+
+def find_fastest_interval(csv_file, target_distance):
+    '''Returns position and duration of fastest interval of distance in file.'''
+    data = read_log(csv_file)
 
     min_time, min_interval = float('inf'), (None, None)
     l = len(data)
@@ -43,9 +52,7 @@ if __name__ == "__main__":
     interval, elapsed = find_fastest_interval(csv_file, target_distance)
     if interval[0] is not None:
         pace = elapsed/(interval[1]-interval[0])*500
-        pm = int(pace/60)
-        ps = pace - pm * 60
         print(f"Fastest interval: {interval[0]:.1f}m - {interval[1]:.1f}m, "
-              f"time={elapsed:.1f}s, pace={pm}:{ps:04.1f}")
+              f"time={elapsed:.1f}s, pace={format_time(pace)}")
     else:
         print("No valid interval found.")
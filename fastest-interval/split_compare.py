@@ -0,0 +1,114 @@
+#!/opt/homebrew/bin/python3
+'''Compare Concept2 pieces split by split on a common distance grid.
+
+Each log's (time, distance) trace is resampled onto the same distances
+(every split meters) by linear interpolation, so pieces from different
+sessions or athletes line up split by split. For all logs at once this
+gives per-split times, cumulative deltas against a reference piece, and
+the "ghost": the best time of any log for each split.
+
+Needs NumPy (pip install -r requirements.txt).
+'''
+import sys
+
+import numpy as np
+
+from fastest_interval import format_time, read_log
+
+# pylint: disable=redefined-outer-name
+def load_trace(csv_file):
+    '''Returns times and distances of a log, from the start of the piece.'''
+    rows = read_log(csv_file)
+    if not rows:
+        raise ValueError(f"{csv_file}: log has no samples")
+    data = np.array([(time, distance) for _, time, distance in rows])
+    times, distances = data[:, 0] - data[0, 0], data[:, 1] - data[0, 1]
+    # Distance must increase for interpolation; keep the first sample of
+    # each distance (when the rower got there) and drop backward jitter.
+    distances, first = np.unique(np.maximum.accumulate(distances), return_index=True)
+    return times[first], distances
+
+def distance_grid(split, distance):
+    '''Returns 0, split, 2*split, ..., distance.'''
+    grid = np.arange(0, distance, split, dtype=float)
+    return np.append(grid, float(distance))
+
+def resample(traces, grid):
+    '''Returns the time at which each trace reaches each grid distance.
+
+    One row per trace; NaN where a trace ends before the grid distance.
+    '''
+    times = np.full((len(traces), len(grid)), np.nan)
+    for k, (trace_times, trace_distances) in enumerate(traces):
+        reached = grid <= trace_distances[-1]
+        times[k, reached] = np.interp(grid[reached], trace_distances, trace_times)
+    return times
+
+def compare(traces, split, distance=None, reference=0):
+    '''Compares traces split by split.
+
+    distance defaults to the whole splits of the shortest piece (or all of
+    it if shorter than a split). Returns a dict with the grid,
+    cumulative times (logs x grid), split times (logs x splits), cumulative
+    deltas against the reference log (positive: behind), and the ghost's
+    split times, cumulative times and the log each ghost split comes from.
+    A split that no log completes (beyond the longest piece) has no ghost:
+    its ghost time is NaN and its log -1.
+    '''
+    if distance is None:
+        distance = min(trace_distances[-1] for _, trace_distances in traces)
+        distance = distance // split * split or distance
+    grid = distance_grid(split, distance)
+    cumulative = resample(traces, grid)
+    splits = np.diff(cumulative, axis=1)
+    deltas = cumulative - cumulative[reference]
+    complete = ~np.isnan(splits)
+    ghost_from = np.where(complete, splits, np.inf).argmin(axis=0)
+    ghost_from[~complete.any(axis=0)] = -1
+    ghost_splits = np.where(ghost_from >= 0, splits[ghost_from, np.arange(splits.shape[1])], np.nan)
+    return {
+        'grid': grid,
+        'cumulative': cumulative,
+        'splits': splits,
+        'deltas': deltas,
+        'ghost_splits': ghost_splits,
+        'ghost_cumulative': np.concatenate(([0.0], np.cumsum(ghost_splits))),
+        'ghost_from': ghost_from,
+    }
+
+def print_comparison(names, result, reference):
+    '''Prints split times with pace per 500m and deltas to the reference.'''
+    grid, splits, deltas = result['grid'], result['splits'], result['deltas']
+    print(f"{'split':>12}  " + "  ".join(f"{name[:22]:>22}" for name in names) + f"  {'ghost':>14}")
+    for s in range(splits.shape[1]):
+        cells = []
+        for k in range(len(names)):
+            if np.isnan(splits[k, s]):
+                cells.append(f"{'-':>22}")
+                continue
+            pace = splits[k, s] / (grid[s + 1] - grid[s]) * 500
+            delta = '' if k == reference else f" {deltas[k, s + 1]:+6.1f}"
+            cells.append(f"{format_time(splits[k, s]) + ' (' + format_time(pace) + ')' + delta:>22}")
+        ghost_from = result['ghost_from'][s]
+        ghost = f"{format_time(result['ghost_splits'][s])} #{ghost_from + 1}" if ghost_from >= 0 else '-'
+        print(f"{grid[s]:5.0f}-{grid[s + 1]:5.0f}m  " + "  ".join(cells) + f"  {ghost:>14}")
+    totals = [format_time(t) if not np.isnan(t) else '-' for t in result['cumulative'][:, -1]]
+    ghost_total = result['ghost_cumulative'][-1]
+    print(f"{'total':>12}  " + "  ".join(f"{t:>22}" for t in totals)
+          + f"  {format_time(ghost_total) if not np.isnan(ghost_total) else '-':>14}")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("Usage: split_compare.py <split_distance> <reference_csv> <csv_file>...")
+        print("Split times (pace/500m) and deltas to the first log; ghost = best split of any log.")
+        sys.exit(1)
+
+    split = float(sys.argv[1])
+    csv_files = sys.argv[2:]
+    try:
+        traces = [load_trace(csv_file) for csv_file in csv_files]
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    result = compare(traces, split)
+    print_comparison(csv_files, result, 0)
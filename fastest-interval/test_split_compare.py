@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests for split_compare.py, on synthetic traces.
+
+Run: python3 -m unittest discover -s fastest-interval  (from repo root)
+"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import split_compare as sc
+
+
+def trace(speeds):
+    '''Returns times and distances of a piece rowed at speeds[k] m/s over the k-th 500m.
+
+    Samples are 500/3 m apart, so the 250m split points are interpolated.
+    '''
+    distances = np.linspace(0, 500 * len(speeds), 3 * len(speeds) + 1)
+    segment = np.minimum(distances // 500, len(speeds) - 1).astype(int)
+    starts = np.concatenate(([0.0], np.cumsum(500 / np.array(speeds, dtype=float))))[segment]
+    times = starts + (distances - segment * 500) / np.array(speeds, dtype=float)[segment]
+    return times, distances
+
+
+class CompareTest(unittest.TestCase):
+    def setUp(self):
+        self.even = trace([5, 5])          # 100s per 500m
+        self.negative = trace([4, 6.25])   # 125s, then 80s
+        self.short = trace([10])           # 50s, ends at 500m
+
+    def test_split_times_and_deltas(self):
+        result = sc.compare([self.even, self.negative], 250)
+        np.testing.assert_allclose(result['grid'], [0, 250, 500, 750, 1000])
+        np.testing.assert_allclose(result['splits'], [[50, 50, 50, 50], [62.5, 62.5, 40, 40]])
+        np.testing.assert_allclose(result['deltas'], [[0, 0, 0, 0, 0], [0, 12.5, 25, 15, 5]])
+
+    def test_ghost_takes_best_split_of_any_log(self):
+        result = sc.compare([self.even, self.negative], 250)
+        self.assertEqual(result['ghost_from'].tolist(), [0, 0, 1, 1])
+        np.testing.assert_allclose(result['ghost_splits'], [50, 50, 40, 40])
+        np.testing.assert_allclose(result['ghost_cumulative'], [0, 50, 100, 140, 180])
+
+    def test_default_distance_is_shortest_piece(self):
+        result = sc.compare([self.even, self.short], 250)
+        np.testing.assert_allclose(result['grid'], [0, 250, 500])
+        self.assertEqual(result['ghost_from'].tolist(), [1, 1])
+
+    def test_shorter_piece_is_nan_past_its_end(self):
+        result = sc.compare([self.even, self.short], 250, distance=1000)
+        self.assertTrue(np.isnan(result['splits'][1, 2:]).all())
+        self.assertEqual(result['ghost_from'].tolist(), [1, 1, 0, 0])
+        np.testing.assert_allclose(result['ghost_cumulative'], [0, 25, 50, 100, 150])
+
+    def test_no_ghost_beyond_the_longest_piece(self):
+        result = sc.compare([self.short], 250, distance=1000)
+        self.assertEqual(result['ghost_from'].tolist(), [0, 0, -1, -1])
+        np.testing.assert_allclose(result['ghost_splits'], [25, 25, np.nan, np.nan])
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            sc.print_comparison(['short'], result, 0)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[3].endswith(' -') and lines[-1].endswith(' -'), lines)
+
+
+class LoadTraceTest(unittest.TestCase):
+    def write_log(self, rows):
+        f = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        self.addCleanup(os.unlink, f.name)
+        with f:
+            f.write("Number,Time (seconds),Distance (meters)\n")
+            f.writelines(f"{i},{t},{d}\n" for i, (t, d) in enumerate(rows))
+        return f.name
+
+    def test_relative_to_start_without_backward_jitter(self):
+        times, distances = sc.load_trace(self.write_log([(3, 10), (4, 14), (5, 13), (6, 20)]))
+        self.assertEqual(times.tolist(), [0, 1, 3])
+        self.assertEqual(distances.tolist(), [0, 4, 10])
+
+    def test_empty_log_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "no samples"):
+            sc.load_trace(self.write_log([]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,11 @@
 
 For each raw/pc-YYYY.pdf:
   * use the PDF text layer (pdftotext -layout) when present;
-  * otherwise OCR the page (pdftoppm @300dpi + tesseract, psm 6).
+  * otherwise OCR the first page (pdftoppm @300dpi + tesseract, psm 6).
+Scanned PDFs are OCRed in one batch: their first pages are rendered in
+parallel and passed to a single tesseract run through a list file (or to
+one in-process engine if the tesserocr bindings are installed), so the
+language model is loaded once rather than once per year.
 The result is written to raw-extract.tsv (tab-separated: year, raw_club, points)
 and is committed so that normalization (build_history.py) is reproducible
 without re-running OCR.
@@ -21,6 +25,12 @@ import re
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tesserocr  # optional: OCR in-process instead of running tesseract
+except ImportError:
+    tesserocr = None
 
 RAW_DIR = os.path.join(os.path.dirname(__file__), "raw")
 OUT = os.path.join(os.path.dirname(__file__), "raw-extract.tsv")
@@ -76,29 +86,65 @@ def pdf_text(path):
     ).stdout
 
 
-def ocr_text(path):
+def render_first_page(path, base):
+    subprocess.run(["pdftoppm", "-r", str(OCR_DPI), "-png", "-f", "1", "-l", "1",
+                    "-singlefile", path, base],
+                   check=True, capture_output=True)
+    return base + ".png"
+
+
+def split_pages(output, n):
+    """Split batched tesseract output into n page texts.
+
+    tesseract ends every page with a form feed (page_separator).
+    """
+    pages = output.split("\f")
+    if len(pages) < n:
+        raise RuntimeError(f"tesseract returned {len(pages)} pages for {n} images")
+    return pages[:n]
+
+
+def ocr_texts(paths):
+    """OCR the first page of each PDF, in one batch."""
+    if not paths:
+        return []
     with tempfile.TemporaryDirectory() as tmp:
-        base = os.path.join(tmp, "page")
-        subprocess.run(["pdftoppm", "-r", str(OCR_DPI), "-png", path, base],
-                       check=True, capture_output=True)
-        png = sorted(f for f in os.listdir(tmp) if f.endswith(".png"))[0]
-        return subprocess.run(
-            ["tesseract", os.path.join(tmp, png), "-", "--psm", "6",
+        bases = [os.path.join(tmp, f"page-{i:03d}") for i in range(len(paths))]
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            pngs = list(pool.map(render_first_page, paths, bases))
+        if tesserocr is not None:
+            with tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_BLOCK) as api:
+                api.SetVariable("preserve_interword_spaces", "1")
+                texts = []
+                for png in pngs:
+                    api.SetImageFile(png)
+                    texts.append(api.GetUTF8Text())
+                return texts
+        listing = os.path.join(tmp, "pages.txt")
+        with open(listing, "w") as fh:
+            fh.write("".join(png + "\n" for png in pngs))
+        output = subprocess.run(
+            ["tesseract", listing, "-", "--psm", "6",
              "-c", "preserve_interword_spaces=1"],
             capture_output=True, text=True, check=True,
         ).stdout
+    return split_pages(output, len(paths))
 
 
 def main():
-    rows = []
+    pdfs = []
     for fn in sorted(os.listdir(RAW_DIR)):
         m = re.match(r"pc-(\d{4})\.pdf$", fn)
-        if not m:
-            continue
-        year, path = m.group(1), os.path.join(RAW_DIR, fn)
-        text = pdf_text(path)
-        if not text.strip():
-            text = ocr_text(path)
+        if m:
+            pdfs.append((m.group(1), fn, os.path.join(RAW_DIR, fn)))
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        texts = list(pool.map(pdf_text, [path for _, _, path in pdfs]))
+    scanned = [i for i, text in enumerate(texts) if not text.strip()]
+    for i, text in zip(scanned, ocr_texts([pdfs[i][2] for i in scanned])):
+        texts[i] = text
+
+    rows = []
+    for (year, fn, _), text in zip(pdfs, texts):
         recs = parse_text(text)
         if not recs:
             print(f"WARNING: no records parsed for {fn}", file=sys.stderr)
@@ -9,6 +9,7 @@ import os
 import unittest
 
 import build_history as bh
+import extract_raw
 
 HERE = os.path.dirname(__file__)
 PDE_CSV = os.path.join(HERE, os.pardir, "pde", "pde-history.csv")
@@ -112,5 +113,25 @@ class TestCommittedCsvInSync(unittest.TestCase):
                          "pc-history.csv is stale; re-run build_history.py")
 
 
+class TestBatchedOcrSplit(unittest.TestCase):
+    PAGE = "1.  SC Luzern   60 Punkte\n2.  RC Baden   45 Punkte\n"
+
+    def test_pages_split_on_form_feed(self):
+        output = self.PAGE + "\f" + "\f" + "3. Basler RC 12 Punkte\n\f"
+        pages = extract_raw.split_pages(output, 3)
+        self.assertEqual(pages, [self.PAGE, "", "3. Basler RC 12 Punkte\n"])
+
+    def test_short_output_is_an_error(self):
+        with self.assertRaises(RuntimeError):
+            extract_raw.split_pages(self.PAGE + "\f", 3)
+
+    def test_split_page_parses_like_single_run(self):
+        """A single tesseract run ends the page with a form feed; parse_text ignores it."""
+        [page] = extract_raw.split_pages(self.PAGE + "\f", 1)
+        self.assertEqual(extract_raw.parse_text(page),
+                         extract_raw.parse_text(self.PAGE + "\f"))
+        self.assertEqual(extract_raw.parse_text(page), [("SC Luzern", 60), ("RC Baden", 45)])
+
+
 if __name__ == "__main__":
     unittest.main()